@@ -0,0 +1 @@
+# Briques actuarielles partagées par les pages Streamlit.
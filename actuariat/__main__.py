@@ -0,0 +1,5 @@
+import sys
+
+from actuariat.cli import main
+
+sys.exit(main())
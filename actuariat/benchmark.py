@@ -0,0 +1,242 @@
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+from joblib import Parallel, delayed
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import PoissonRegressor
+from sklearn.metrics import mean_absolute_error, mean_poisson_deviance, mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+
+from actuariat.cache import get_or_compute, lru_cache
+
+FEATURES = ["VehPower", "VehAge", "DrivAge"]
+MODELS = ["GLM Poisson", "Random Forest", "Gradient Boosting", "GLM statsmodels"]
+
+# Plancher des prédictions pour la déviance de Poisson (une forêt peut prédire 0)
+_MIN_PREDICTION = 1e-6
+
+_RESULTATS = lru_cache(maxsize=8)
+
+
+# Enveloppe statsmodels au format fit/predict de scikit-learn
+class StatsmodelsPoisson:
+    def fit(self, X, y, sample_weight=None):
+        self.result_ = sm.GLM(y, sm.add_constant(X, has_constant="add"), family=sm.families.Poisson(),
+                              var_weights=sample_weight).fit()
+        return self
+
+    def predict(self, X):
+        return self.result_.predict(sm.add_constant(X, has_constant="add"))
+
+
+# Les modèles sont construits dans les workers à partir de leur nom (les
+# fabriques ne sont pas toutes sérialisables).
+def make_model(name, random_state=42):
+    if name == "GLM Poisson":
+        return PoissonRegressor(alpha=1e-4, max_iter=300)
+    if name == "Random Forest":
+        return RandomForestRegressor(n_estimators=100, random_state=random_state, n_jobs=1)
+    if name == "Gradient Boosting":
+        return HistGradientBoostingRegressor(loss="poisson", random_state=random_state)
+    if name == "GLM statsmodels":
+        return StatsmodelsPoisson()
+    raise ValueError(f"Modèle inconnu : {name}")
+
+
+# Courbe de Lorenz : contrats triés par fréquence prédite croissante, part
+# cumulée de l'exposition en abscisse, part cumulée des sinistres en ordonnée.
+def lorenz_curve(claims, predicted, exposure):
+    order = np.argsort(predicted, kind="stable")
+    cum_exposure = np.concatenate([[0.0], np.cumsum(exposure[order])])
+    cum_claims = np.concatenate([[0.0], np.cumsum(claims[order])])
+    return cum_exposure / cum_exposure[-1], cum_claims / cum_claims[-1]
+
+
+def gini_index(claims, predicted, exposure):
+    x, y = lorenz_curve(claims, predicted, exposure)
+    return 1.0 - 2.0 * np.trapz(y, x)
+
+
+def actuarial_scores(y_true, y_pred, exposure):
+    y_pred = np.maximum(y_pred, _MIN_PREDICTION)
+    return {
+        "MAE": mean_absolute_error(y_true, y_pred),
+        "RMSE": mean_squared_error(y_true, y_pred, squared=False),
+        "R²": r2_score(y_true, y_pred),
+        "Déviance Poisson": mean_poisson_deviance(y_true, y_pred, sample_weight=exposure),
+        "Gini": gini_index(y_true * exposure, y_pred, exposure),
+    }
+
+
+# Un pli pour un modèle : temps d'ajustement et de prédiction, pic mémoire
+# (allocations suivies par tracemalloc) et scores sur le pli de test.
+def _run_fold(name, fold, X_train, y_train, w_train, X_test, y_test, w_test):
+    model = make_model(name)
+    tracemalloc.start()
+    start = time.perf_counter()
+    model.fit(X_train, y_train, sample_weight=w_train)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    predict_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"Modèle": name, "Pli": fold, "Ajustement (s)": fit_time, "Prédiction (s)": predict_time,
+            "Pic mémoire (Mo)": peak / 1e6, **actuarial_scores(y_test, y_pred, w_test)}
+
+
+def _cross_validate(df, models, n_splits, n_jobs, features, seed):
+    X = df[features].to_numpy(dtype=float)
+    exposure = df["Exposure"].to_numpy(dtype=float)
+    y = df["ClaimNb"].to_numpy(dtype=float) / exposure
+    folds = KFold(n_splits=n_splits, shuffle=True, random_state=seed).split(X)
+    tasks = [
+        delayed(_run_fold)(name, k, X[train], y[train], exposure[train], X[test], y[test], exposure[test])
+        for k, (train, test) in enumerate(folds, start=1)
+        for name in models
+    ]
+    return pd.DataFrame(Parallel(n_jobs=n_jobs)(tasks))
+
+
+# Validation croisée en k plis de plusieurs modèles (fréquence pondérée par
+# l'exposition à l'entraînement comme à l'évaluation), les couples (modèle, pli)
+# étant répartis sur n_jobs processus. Résultats mis en cache par jeu de
+# données et configuration (n_jobs n'en fait pas partie).
+def run_benchmark(df, fingerprint, models=MODELS, n_splits=5, n_jobs=-1, features=FEATURES, seed=42):
+    key = (fingerprint, tuple(models), n_splits, tuple(features), seed)
+    return get_or_compute(_RESULTATS, key, lambda: _cross_validate(df, list(models), n_splits, n_jobs,
+                                                                   list(features), seed))
+
+
+# Moyenne et écart-type par modèle sur les plis
+def summarize(results):
+    metrics = results.drop(columns=["Pli"]).groupby("Modèle", sort=False)
+    return metrics.mean().join(metrics.std(), rsuffix=" (σ)")
+
+
+def available_cpus():
+    return os.cpu_count() or 1
+
+
+# Valeurs de n_jobs acceptées par joblib (0 est refusé) : -1 = tous les cœurs
+def n_jobs_choices():
+    return [-1] + list(range(1, available_cpus() + 1))
+
+
+def n_jobs_label(n_jobs):
+    return "Tous les cœurs" if n_jobs == -1 else str(n_jobs)
+
+
+# Strate de chaque ligne : contrat sinistré ou non, croisé avec les facteurs
+# fournis (s'ils sont présents).
+def _strata(df, strata=("Area",)):
+    keys = [(df["ClaimNb"].to_numpy() > 0).astype(np.int64)]
+    for col in strata:
+        if col in df.columns:
+            keys.append(pd.factorize(df[col])[0].astype(np.int64))
+    _, groups = np.unique(np.column_stack(keys), axis=0, return_inverse=True)
+    return groups.ravel()
+
+
+# Tirage de n positions avec un quota proportionnel par strate
+def _draw(groups, n, seed):
+    if n >= len(groups):
+        return np.arange(len(groups))
+    rng = np.random.default_rng(seed)
+    # Rang aléatoire de chaque ligne au sein de sa strate
+    order = np.lexsort((rng.random(len(groups)), groups))
+    counts = np.bincount(groups)
+    quotas = np.floor(counts * n / len(groups)).astype(np.int64)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(len(groups)) - np.repeat(starts, counts)
+    return np.sort(order[rank < np.repeat(quotas, counts)])
+
+
+# Tirage stratifié de n lignes : seules les positions sont tirées, les colonnes
+# utiles sont extraites ensuite pour ces lignes uniquement.
+def stratified_sample(df, n, seed=42, strata=("Area",)):
+    return _draw(_strata(df, strata), n, seed)
+
+
+def _subsample_task(name, sample_size, X_train, y_train, w_train, X_test, y_test, w_test):
+    row = _run_fold(name, sample_size, X_train, y_train, w_train, X_test, y_test, w_test)
+    row["Taille échantillon"] = row.pop("Pli")
+    return row
+
+
+# Courbe d'apprentissage : chaque modèle est entraîné, avec l'exposition comme
+# poids, sur des échantillons stratifiés de taille croissante (doublée à chaque
+# étape) et évalué sur un même échantillon de test. Un modèle s'arrête dès que
+# sa déviance varie de moins de `tolerance` (relatif) entre deux étapes.
+# L'échantillon de test est réduit pour laisser au moins start_size lignes
+# d'entraînement.
+def _learning_curve(df, models=MODELS, start_size=5_000, max_size=200_000, test_size=50_000,
+                   tolerance=0.01, n_jobs=-1, features=FEATURES, seed=42):
+    test_size = min(test_size, len(df) - start_size)
+    if test_size < 1:
+        raise ValueError(f"Portefeuille trop petit ({len(df):,} contrats) pour un échantillon initial de "
+                         f"{start_size:,} contrats et un échantillon de test.")
+    features = list(features)
+    groups = _strata(df)
+    test = _draw(groups, test_size, seed + 1)
+    pool = np.setdiff1d(np.arange(len(df)), test)
+    sizes = []
+    size = start_size
+    while size < min(max_size, len(pool)):
+        sizes.append(size)
+        size *= 2
+    sizes.append(min(max_size, len(pool)))
+
+    def columns(rows):
+        part = df.iloc[rows]
+        exposure = part["Exposure"].to_numpy(dtype=float)
+        return part[features].to_numpy(dtype=float), part["ClaimNb"].to_numpy(dtype=float) / exposure, exposure
+
+    X_test, y_test, w_test = columns(test)
+    active = list(models)
+    previous = {}
+    rows = []
+    elapsed = {name: 0.0 for name in models}
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for size in sizes:
+            if not active:
+                break
+            X_train, y_train, w_train = columns(pool[_draw(groups[pool], size, seed)])
+            step = parallel(delayed(_subsample_task)(name, size, X_train, y_train, w_train, X_test, y_test, w_test)
+                            for name in active)
+            for row in step:
+                name = row["Modèle"]
+                elapsed[name] += row["Ajustement (s)"] + row["Prédiction (s)"]
+                row["Temps cumulé (s)"] = elapsed[name]
+                before = previous.get(name)
+                row["Stabilisé"] = before is not None and abs(row["Déviance Poisson"] - before) <= tolerance * before
+                previous[name] = row["Déviance Poisson"]
+                rows.append(row)
+            active = [name for name in active if not any(r["Modèle"] == name and r["Stabilisé"] for r in step)]
+    return pd.DataFrame(rows)
+
+
+# Courbe d'apprentissage mise en cache comme le benchmark complet
+def learning_curve(df, fingerprint, models=MODELS, start_size=5_000, max_size=200_000, test_size=50_000,
+                   tolerance=0.01, n_jobs=-1, features=FEATURES, seed=42):
+    key = ("courbe", fingerprint, tuple(models), start_size, max_size, test_size, tolerance, tuple(features), seed)
+    return get_or_compute(_RESULTATS, key, lambda: _learning_curve(df, list(models), start_size, max_size, test_size,
+                                                                   tolerance, n_jobs, features, seed))
+
+
+# Temps nécessaire à chaque modèle pour atteindre sa meilleure déviance à
+# `tolerance` près, et taille d'échantillon correspondante.
+def time_to_accuracy(curve, tolerance=0.01):
+    rows = []
+    for name, steps in curve.groupby("Modèle", sort=False):
+        best = steps["Déviance Poisson"].min()
+        reached = steps[steps["Déviance Poisson"] <= best * (1 + tolerance)].iloc[0]
+        rows.append({"Modèle": name, "Déviance finale": steps["Déviance Poisson"].iloc[-1],
+                     "Gini final": steps["Gini"].iloc[-1], "Taille atteinte": int(reached["Taille échantillon"]),
+                     "Temps pour atteindre (s)": reached["Temps cumulé (s)"],
+                     "Arrêt anticipé": bool(steps["Stabilisé"].iloc[-1])})
+    return pd.DataFrame(rows).set_index("Modèle").sort_values("Déviance finale")
@@ -0,0 +1,171 @@
+import threading
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from actuariat.cache import get_or_compute, lru_cache
+from actuariat.irls import ConvergenceWarning, fit_irls, sparse_design
+from actuariat.modele import design_matrix
+
+# Bootstrap des GLM fréquence et coût. Chaque réplique tire un poids de
+# Poisson(1) par contrat (bootstrap de Poisson, équivalent au tirage avec
+# remise pour un portefeuille de grande taille) ; les sommes pondérées sont
+# agrégées par cellule tarifaire, ce qui donne exactement les coefficients
+# d'un ajustement contrat par contrat sur l'échantillon rééchantillonné.
+# Chaque réplique est réajustée par le moteur IRLS, démarré sur les
+# coefficients du modèle d'origine.
+DEFAULT_REPLICATES = 200
+CONFIDENCE = 0.95
+# Répliques par tâche envoyée aux processus : les données ne sont transmises
+# qu'une fois par bloc, et la progression reste assez fine.
+REPLICATES_PER_TASK = 10
+
+_DONNEES = lru_cache(maxsize=4)
+
+
+@dataclass(frozen=True)
+class BootstrapData:
+    cells: pd.DataFrame
+    X_freq: object
+    X_cout: object
+    cell_ids: np.ndarray
+    claims: np.ndarray
+    exposure: np.ndarray
+    claimant_rows: np.ndarray
+    severity: np.ndarray
+
+
+# Mêmes contrats que les ajustements de actuariat.glm : Exposure > 0 pour la
+# fréquence, ClaimNb > 0 pour le coût (sinistré même sans exposition).
+# Un contrat non exposé ne compte que dans le coût.
+def _prepare(df, model_freq, model_cout):
+    features = list(dict.fromkeys(model_freq.features + model_cout.features))
+    rows = df[(df["Exposure"] > 0) | (df["ClaimNb"] > 0)]
+    grouped = rows.groupby(features, observed=True, sort=True)
+    ids = grouped.ngroup().to_numpy()
+    cells = grouped.size().reset_index()[features]
+    valid = ids >= 0
+    claims = rows["ClaimNb"].to_numpy(dtype=float)[valid]
+    exposure = rows["Exposure"].to_numpy(dtype=float)[valid]
+    claimant_rows = np.flatnonzero(claims > 0)
+    amount = rows["ClaimAmount"].to_numpy(dtype=float)[valid]
+    return BootstrapData(
+        cells=cells,
+        X_freq=sparse_design(cells, model_freq.layout),
+        X_cout=sparse_design(cells, model_cout.layout),
+        cell_ids=ids[valid],
+        claims=np.where(exposure > 0, claims, 0.0),
+        exposure=np.maximum(exposure, 0.0),
+        claimant_rows=claimant_rows,
+        severity=amount[claimant_rows] / claims[claimant_rows],
+    )
+
+
+# Données du bootstrap (cellules et plans d'expérience) préparées une fois
+# par jeu de données et par couple de modèles.
+def prepare_bootstrap(df, model_freq, model_cout):
+    key = (model_freq.cache_key, model_cout.cache_key)
+    return get_or_compute(_DONNEES, key, lambda: _prepare(df, model_freq, model_cout))
+
+
+# Une réplique : poids de Poisson, sommes par cellule, deux ajustements IRLS.
+# Un contrat sinistré garde le même poids dans les deux modèles. Renvoie None
+# si une modalité disparaît de l'échantillon (plan singulier) ou si un
+# ajustement ne converge pas.
+def _replicate(data, start_freq, start_cout, seed):
+    rng = np.random.default_rng(seed)
+    n_cells = len(data.cells)
+    weights = rng.poisson(1.0, size=len(data.cell_ids)).astype(float)
+    claims = np.bincount(data.cell_ids, weights=weights * data.claims, minlength=n_cells)
+    exposure = np.bincount(data.cell_ids, weights=weights * data.exposure, minlength=n_cells)
+    claimant_ids = data.cell_ids[data.claimant_rows]
+    claimant_weights = weights[data.claimant_rows]
+    count = np.bincount(claimant_ids, weights=claimant_weights, minlength=n_cells)
+    total = np.bincount(claimant_ids, weights=claimant_weights * data.severity, minlength=n_cells)
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            kept = exposure > 0
+            freq = fit_irls(data.X_freq[kept], claims[kept], "poisson", offset=np.log(exposure[kept]),
+                            start_params=start_freq)
+            kept = count > 0
+            cout = fit_irls(data.X_cout[kept], total[kept] / count[kept], "gamma", weights=count[kept],
+                            start_params=start_cout)
+    except np.linalg.LinAlgError:
+        return None
+    if not (freq.converged and cout.converged):
+        return None
+    return freq.params, cout.params
+
+
+def _replicate_block(data, start_freq, start_cout, seeds):
+    return [_replicate(data, start_freq, start_cout, seed) for seed in seeds]
+
+
+# Répliques calculées par blocs dans des processus joblib (les boucles IRLS
+# tiennent le GIL : des threads ne les parallélisent pas) ; le générateur
+# renvoie, à chaque bloc terminé, (répliques terminées, coefficients
+# fréquence, coefficients coût). L'arrêt (événement `cancel` ou fermeture du
+# générateur, par exemple quand Streamlit interrompt le script) abandonne les
+# blocs non démarrés.
+def iter_bootstrap(data, model_freq, model_cout, n_replicates=DEFAULT_REPLICATES, n_jobs=-1, seed=42,
+                   cancel=None):
+    cancel = cancel or threading.Event()
+    streams = np.random.SeedSequence(seed).spawn(n_replicates)
+    blocks = [streams[start:start + REPLICATES_PER_TASK] for start in range(0, n_replicates, REPLICATES_PER_TASK)]
+    results = Parallel(n_jobs=n_jobs, return_as="generator_unordered")(
+        delayed(_replicate_block)(data, model_freq.params, model_cout.params, block) for block in blocks)
+    freq_draws, cout_draws = [], []
+    completed = 0
+    try:
+        for block in results:
+            if cancel.is_set():
+                break
+            completed += len(block)
+            for result in block:
+                if result is not None:
+                    freq_draws.append(result[0])
+                    cout_draws.append(result[1])
+            yield completed, np.array(freq_draws), np.array(cout_draws)
+    finally:
+        cancel.set()
+        # joblib signale les blocs abandonnés : l'arrêt est ici voulu
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            results.close()
+
+
+def _percentiles(draws, level):
+    alpha = (1.0 - level) / 2.0
+    return np.quantile(draws, alpha, axis=0), np.quantile(draws, 1.0 - alpha, axis=0)
+
+
+# Intervalles percentiles des relativités exp(β) (hors constante)
+def relativity_intervals(model, draws, level=CONFIDENCE):
+    low, high = _percentiles(np.exp(draws), level)
+    table = pd.DataFrame({
+        "Coefficient": model.columns,
+        "Relativité": np.exp(model.params),
+        "Borne basse": low,
+        "Borne haute": high,
+        "Écart-type bootstrap (log)": draws.std(axis=0, ddof=1) if len(draws) > 1 else np.nan,
+        "Écart-type asymptotique (log)": model.bse,
+    })
+    return table.iloc[1:].reset_index(drop=True)
+
+
+# Intervalles percentiles de la prime pure annuelle de chaque cellule observée
+def premium_intervals(data, model_freq, model_cout, freq_draws, cout_draws, level=CONFIDENCE):
+    X_freq = design_matrix(data.cells, model_freq.layout)
+    X_cout = design_matrix(data.cells, model_cout.layout)
+    draws = np.exp(X_freq @ freq_draws.T + X_cout @ cout_draws.T)
+    low, high = _percentiles(draws.T, level)
+    return data.cells.assign(**{
+        "Prime pure": np.exp(X_freq @ model_freq.params + X_cout @ model_cout.params),
+        "Borne basse": low,
+        "Borne haute": high,
+    })
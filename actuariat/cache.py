@@ -0,0 +1,38 @@
+import threading
+
+from cachetools import LRUCache
+
+# Les caches sont partagés entre les sessions Streamlit (un thread par rerun),
+# d'où le verrou autour des accès.
+_LOCK = threading.RLock()
+
+
+def lru_cache(maxsize=8):
+    return LRUCache(maxsize=maxsize)
+
+
+def get_or_compute(cache, key, compute):
+    with _LOCK:
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+    value = compute()
+    with _LOCK:
+        cache[key] = value
+    return value
+
+
+def lookup(cache, key, default=None):
+    with _LOCK:
+        return cache.get(key, default)
+
+
+def discard(cache, key):
+    with _LOCK:
+        cache.pop(key, None)
+
+
+def store(cache, key, value):
+    with _LOCK:
+        cache[key] = value
@@ -0,0 +1,168 @@
+import argparse
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from joblib import Parallel, delayed
+
+from actuariat.glm import ENGINES, RATING_FACTORS, fit_frequency, fit_severity
+from actuariat.ingestion import DEFAULT_CHUNKSIZE, read_csv_chunked, read_parquet_batched
+from actuariat.portefeuille import build_portfolio
+from actuariat.schema import apply_schema, missing_values
+from actuariat.segmentation import ACTIONS, TIERS, segment_portfolio
+from actuariat.sinistres import DEFAULT_SEED, DISTRIBUTIONS, SeverityConfig, enrich_with_claim_amount
+from actuariat.tarification import price_batch
+
+# Chaîne de tarification complète hors Streamlit, pour les traitements de nuit :
+#   python -m actuariat portefeuille.csv -o resultats.parquet
+# Étapes : lecture (CSV, Parquet ou table SQL), enrichissement ClaimAmount,
+# ajustement des GLM fréquence et coût, tarification de tous les contrats par
+# blocs répartis sur plusieurs processus, segmentation par rentabilité des
+# contrats sinistrés (comme la page Optimisation du portefeuille), écriture.
+# La durée de chaque étape est affichée sur la sortie d'erreur.
+
+
+@contextmanager
+def _stage(name, timings):
+    start = time.perf_counter()
+    yield
+    timings[name] = time.perf_counter() - start
+    print(f"[{name}] {timings[name]:.2f} s", file=sys.stderr, flush=True)
+
+
+def _is_url(source):
+    return "://" in source
+
+
+def load(source, table=None, columns=None, chunksize=DEFAULT_CHUNKSIZE, regions=None, areas=None):
+    if _is_url(source):
+        from sqlalchemy.engine import make_url
+        from actuariat.sql import get_engine, read_table, reflect_table
+
+        if not table:
+            raise ValueError("--table est obligatoire pour une source SQL.")
+        engine = get_engine(make_url(source))
+        return read_table(engine, reflect_table(engine, table), columns, chunksize=chunksize,
+                          regions=regions, areas=areas)
+    if regions or areas:
+        raise ValueError("Les filtres --regions / --areas ne s'appliquent qu'aux sources SQL.")
+    suffix = Path(source).suffix.lower()
+    if suffix == ".csv":
+        return read_csv_chunked(source, chunksize=chunksize, columns=columns)
+    if suffix == ".parquet":
+        return read_parquet_batched(source, chunksize=chunksize, columns=columns)
+    raise ValueError(f"Format d'entrée non pris en charge : {suffix or source}")
+
+
+# Tarification par blocs de contrats, un bloc par tâche
+def score(df, model_freq, model_cout, chunksize=DEFAULT_CHUNKSIZE, n_jobs=1):
+    features = list(dict.fromkeys(model_freq.features + model_cout.features + ["Exposure"]))
+    chunks = Parallel(n_jobs=n_jobs)(
+        delayed(price_batch)(df[features].iloc[start:start + chunksize], model_freq, model_cout)
+        for start in range(0, len(df), chunksize)
+    )
+    return pd.concat(chunks) if chunks else price_batch(df[features], model_freq, model_cout)
+
+
+# Écriture par blocs : groupes de lignes Parquet ou ajouts successifs au CSV
+def write(df, path, chunksize=DEFAULT_CHUNKSIZE):
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        for start in range(0, max(len(df), 1), chunksize):
+            df.iloc[start:start + chunksize].to_csv(path, mode="w" if start == 0 else "a", header=start == 0,
+                                                    index=False)
+        return
+    if path.suffix.lower() != ".parquet":
+        raise ValueError(f"Format de sortie non pris en charge : {path.suffix or path}")
+    # Schéma déduit de toutes les valeurs : sur un cadre vide, les colonnes
+    # texte (object) seraient typées null et le premier bloc serait refusé.
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for start in range(0, len(df), chunksize):
+            writer.write_table(pa.Table.from_pandas(df.iloc[start:start + chunksize], schema=schema,
+                                                    preserve_index=False))
+
+
+def run(args):
+    timings = {}
+    with _stage("lecture", timings):
+        df = load(args.source, args.table, args.columns, args.chunksize, args.regions, args.areas)
+    print(f"  {len(df):,} contrats, {df.shape[1]} colonnes", file=sys.stderr)
+
+    with _stage("enrichissement", timings):
+        config = SeverityConfig(distribution=args.distribution, shape=args.shape)
+        df, simulation = enrich_with_claim_amount(df, config, args.seed)
+        portefeuille = build_portfolio(apply_schema(df), simulation=simulation)
+    if simulation is not None:
+        print(f"  ClaimAmount simulé (graine {args.seed})", file=sys.stderr)
+    for col, count in missing_values(portefeuille.data).items():
+        print(f"  {col} : {count:,} valeurs manquantes", file=sys.stderr)
+
+    with _stage("ajustement GLM", timings):
+        options = dict(features=args.features, engine=args.engine, aggregate=args.aggregate)
+        model_freq = fit_frequency(portefeuille.data, portefeuille.fingerprint, **options)
+        model_cout = fit_severity(portefeuille.data, portefeuille.fingerprint, **options)
+
+    with _stage("tarification", timings):
+        result = pd.concat([portefeuille.data, score(portefeuille.data, model_freq, model_cout,
+                                                     args.chunksize, args.n_jobs)], axis=1)
+
+    with _stage("segmentation", timings):
+        thresholds, labels = TIERS[args.tiers]
+        columns = ["Sinistralite_pure"] + ([args.premium_column] if args.premium_column else [])
+        segments = segment_portfolio(portefeuille.claimants[columns], thresholds, labels, args.premium_column,
+                                     args.seed)
+        result = result.join(segments[["Prime_commerciale", "Rentabilite", "Segment"]])
+        summary = segments.groupby("Segment", observed=False)["Rentabilite"].agg(["count", "mean"])
+        summary["Recommandation"] = summary.index.astype(str).map(ACTIONS)
+
+    with _stage("écriture", timings):
+        write(result, args.output, args.chunksize)
+
+    print(summary.rename(columns={"count": "Nb contrats", "mean": "Rentabilité moyenne"}).to_string(),
+          file=sys.stderr)
+    print(f"Total : {sum(timings.values()):.2f} s — {len(result):,} contrats écrits dans {args.output}",
+          file=sys.stderr)
+    return result
+
+
+def _list(text):
+    return [item.strip() for item in text.split(",") if item.strip()]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m actuariat",
+                                     description="Tarification et segmentation d'un portefeuille en mode batch.")
+    parser.add_argument("source", help="fichier .csv / .parquet, ou URL SQLAlchemy (avec --table)")
+    parser.add_argument("-o", "--output", required=True, help="fichier de sortie .parquet ou .csv")
+    parser.add_argument("--table", help="table à lire pour une source SQL")
+    parser.add_argument("--columns", type=_list, help="colonnes à lire, séparées par des virgules")
+    parser.add_argument("--regions", type=_list, help="filtre Region (source SQL)")
+    parser.add_argument("--areas", type=_list, help="filtre Area (source SQL)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help="taille des blocs de lecture, de tarification et d'écriture")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help="graine de simulation de ClaimAmount et de la prime commerciale")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="gamma", help="loi du coût simulé")
+    parser.add_argument("--shape", type=float, default=SeverityConfig.shape, help="paramètre de forme du coût simulé")
+    parser.add_argument("--features", type=_list, default=RATING_FACTORS, help="facteurs tarifaires des GLM")
+    parser.add_argument("--engine", choices=ENGINES, default="irls", help="moteur d'ajustement des GLM")
+    parser.add_argument("--aggregate", action="store_true", help="ajustement sur les cellules tarifaires")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="processus de tarification (-1 = tous les cœurs)")
+    parser.add_argument("--tiers", type=int, choices=sorted(TIERS), default=3, help="nombre de niveaux de rentabilité")
+    parser.add_argument("--premium-column", help="colonne de prime commerciale (simulée sinon)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        run(args)
+    except (ValueError, OSError) as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return 1
+    return 0
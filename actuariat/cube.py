@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from actuariat.cache import get_or_compute, lru_cache
+from actuariat.portefeuille import DERIVED_COLUMNS
+
+# Cube d'agrégats du tableau de bord : une ligne par combinaison observée des
+# dimensions, avec les sommes et effectifs nécessaires pour recalculer
+# exactement les indicateurs de n'importe quel filtre sur ces dimensions.
+DIMENSIONS = ["Region", "VehBrand", "VehPower", "Area", "DrivAgeBand"]
+AGE_BAND_WIDTH = 5
+TOTALS = ["ClaimNb", "Exposure", "ClaimAmount"]
+
+_CUBES = lru_cache(maxsize=8)
+
+
+# Tranche d'âge de 5 ans, repérée par sa borne basse
+def age_bands(drivage, width=AGE_BAND_WIDTH):
+    return (np.floor(drivage.to_numpy(dtype=float) / width) * width).astype(float)
+
+
+# Pour les moyennes par contrat (Frequence, Cout_moyen, Sinistralite_pure), la
+# somme et le nombre de valeurs renseignées : moyenne = somme / effectif.
+def _build_cube(df):
+    data = df[["Region", "VehBrand", "VehPower", "Area"] + TOTALS + DERIVED_COLUMNS].assign(
+        DrivAgeBand=age_bands(df["DrivAge"]))
+    grouped = data.groupby(DIMENSIONS, observed=True, dropna=False, sort=False)
+    aggregations = {"Contrats": ("ClaimNb", "size")}
+    aggregations.update({col: (col, "sum") for col in TOTALS})
+    for col in DERIVED_COLUMNS:
+        aggregations[f"{col}_somme"] = (col, "sum")
+        aggregations[f"{col}_n"] = (col, "count")
+    return grouped.agg(**aggregations).reset_index()
+
+
+# Cube calculé une fois par jeu de données (clé : empreinte du portefeuille)
+def build_cube(portefeuille):
+    return get_or_compute(_CUBES, portefeuille.fingerprint, lambda: _build_cube(portefeuille.data))
+
+
+# Cube déjà calculé ailleurs (par la base de données, voir actuariat.sql),
+# enregistré pour le portefeuille chargé avec les mêmes filtres.
+def register_cube(fingerprint, cube):
+    return get_or_compute(_CUBES, fingerprint, lambda: cube)
+
+
+# Cellules du cube (ou lignes de la réserve de points du nuage) retenues par
+# les filtres du tableau de bord
+def filter_cube(cube, regions, brands, power_range):
+    mask = (cube["Region"].isin(regions) & cube["VehBrand"].isin(brands)
+            & cube["VehPower"].between(power_range[0], power_range[1]))
+    return cube[mask]
+
+
+# Moyennes par contrat des colonnes dérivées sur un ensemble de cellules
+def kpis(cells):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = {col: cells[f"{col}_somme"].sum() / cells[f"{col}_n"].sum() for col in DERIVED_COLUMNS}
+    return {"Contrats": int(cells["Contrats"].sum()), **means}
+
+
+# Moyenne par contrat d'une colonne dérivée, ventilée selon une dimension
+def mean_by(cells, by, column):
+    grouped = cells.groupby(by, observed=True)[[f"{column}_somme", f"{column}_n"]].sum()
+    return (grouped[f"{column}_somme"] / grouped[f"{column}_n"]).rename(column).reset_index()
+
+
+# Nombre de contrats par tranche d'âge du conducteur
+def age_distribution(cells):
+    counts = cells.groupby("DrivAgeBand")["Contrats"].sum().sort_index()
+    labels = [f"{int(low)}-{int(low) + AGE_BAND_WIDTH - 1}" for low in counts.index]
+    return pd.DataFrame({"Tranche d'âge": labels, "Contrats": counts.to_numpy()})
@@ -0,0 +1,184 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from actuariat.cache import get_or_compute, lookup, lru_cache, store
+from actuariat.irls import fit_irls, fit_statistics, format_summary, sparse_design
+from actuariat.modele import FittedGLM, design_columns, design_layout, design_matrix, formula
+from actuariat.registre import load_model, save_model
+
+RATING_FACTORS = ["VehPower", "Area"]
+ENGINES = ["statsmodels", "irls"]
+ENGINE_LABELS = {"statsmodels": "statsmodels (dense)", "irls": "IRLS interne (creux)"}
+
+# Modèles ajustés, indexés par (empreinte des données, formule, famille, moteur).
+_MODELES = lru_cache(maxsize=16)
+
+# Derniers coefficients par (formule, famille, colonnes) : point de départ du
+# moteur IRLS lors du réajustement sur des données voisines.
+_WARM_STARTS = lru_cache(maxsize=32)
+
+
+def _check_missing(data, message):
+    if data.isnull().values.any():
+        raise ValueError(message)
+
+
+# Les facteurs étant catégoriels (ou constants par cellule), la vraisemblance
+# se factorise par cellule tarifaire : l'ajustement sur les données agrégées
+# donne exactement les mêmes coefficients.
+#  - fréquence : sommes de ClaimNb et d'Exposure, offset log(exposition totale)
+#  - coût : moyenne des coûts moyens par contrat, pondérée par le nombre de
+#    contrats sinistrés de la cellule
+# La dispersion, les écarts-types, la déviance et l'AIC de l'ajustement par
+# cellule ne sont en revanche pas ceux du modèle par contrat : ils sont
+# recalculés au niveau contrat (voir _policy_level).
+def _prepare_frequency(df, features, aggregate=False):
+    data = df.loc[df["Exposure"] > 0, features + ["ClaimNb", "Exposure"]]
+    _check_missing(data, "Des valeurs manquantes détectées dans les variables du modèle.")
+    if aggregate:
+        data = data.groupby(features, observed=True, sort=False).agg(
+            ClaimNb=("ClaimNb", "sum"), Exposure=("Exposure", "sum")).reset_index()
+    y = data["ClaimNb"].astype(float)
+    offset = np.log(data["Exposure"].astype(float))
+    return data, y, offset, None
+
+
+def _prepare_severity(df, features, aggregate=False):
+    data = df.loc[df["ClaimNb"] > 0, features + ["ClaimNb", "ClaimAmount"]]
+    _check_missing(data, "Des valeurs manquantes dans les données du modèle de coût.")
+    y = (data["ClaimAmount"] / data["ClaimNb"]).astype(float).rename("Cout_moyen")
+    if not aggregate:
+        return data, y, None, None
+    cells = data[features].assign(Cout_moyen=y).groupby(features, observed=True, sort=False).agg(
+        Cout_moyen=("Cout_moyen", "mean"), Contrats=("Cout_moyen", "size")).reset_index()
+    return cells, cells["Cout_moyen"], None, cells["Contrats"].astype(float)
+
+
+# statsmodels n'est importé qu'au moment d'ajuster : charger un modèle du
+# registre et tarifer n'en ont pas besoin.
+def _fit_statsmodels(family, data, layout, y, offset, weights=None):
+    import statsmodels.api as sm
+
+    X = pd.DataFrame(design_matrix(data, layout), columns=design_columns(layout), index=data.index)
+    sm_family = sm.families.Poisson() if family == "poisson" else sm.families.Gamma(sm.families.links.Log())
+    result = sm.GLM(y, X, family=sm_family, offset=offset, var_weights=weights).fit()
+    return dict(params=np.asarray(result.params, dtype=float), bse=np.asarray(result.bse, dtype=float),
+                summary=str(result.summary()), nobs=int(result.nobs), deviance=float(result.deviance),
+                aic=float(result.aic), scale=float(result.scale))
+
+
+def _fit_irls(family, data, layout, y, offset, weights=None, start_params=None):
+    X = sparse_design(data, layout)
+    result = fit_irls(X, y.to_numpy(), family, offset=None if offset is None else offset.to_numpy(),
+                      weights=None if weights is None else weights.to_numpy(), start_params=start_params)
+    return dict(params=result.params, bse=result.bse, summary=format_summary(result, layout, y.name),
+                nobs=result.nobs, deviance=result.deviance, aic=result.aic, scale=result.scale)
+
+
+# Statistiques d'un ajustement agrégé ramenées au niveau contrat, à partir des
+# coefficients (identiques) et des données par contrat.
+def _policy_level(family, df, features, layout, fitted, cells, prepare):
+    data, y, offset, _ = prepare(df, features)
+    stats = fit_statistics(sparse_design(data, layout), y.to_numpy(), family, fitted["params"],
+                           offset=None if offset is None else offset.to_numpy())
+    note = (f"Coefficients ajustés sur {cells:,} cellules tarifaires agrégées (identiques à l'ajustement par "
+            "contrat) ; écarts-types, dispersion, déviance et AIC calculés au niveau contrat.\n")
+    return dict(params=fitted["params"], bse=stats.bse, nobs=stats.nobs, deviance=stats.deviance,
+                aic=stats.aic, scale=stats.scale,
+                summary=note + format_summary(stats, layout, y.name, method="cellules"))
+
+
+def _fit(df, features, family, engine, aggregate, fingerprint, model_formula):
+    prepare = _prepare_frequency if family == "poisson" else _prepare_severity
+    data, y, offset, weights = prepare(df, features, aggregate)
+    layout = design_layout(data, features)
+
+    if engine == "irls":
+        warm_key = (model_formula, family, tuple(design_columns(layout)))
+        fitted = _fit_irls(family, data, layout, y, offset, weights, start_params=lookup(_WARM_STARTS, warm_key))
+        store(_WARM_STARTS, warm_key, fitted["params"])
+    else:
+        fitted = _fit_statsmodels(family, data, layout, y, offset, weights)
+    if aggregate:
+        fitted = _policy_level(family, df, features, layout, fitted, len(data), prepare)
+    return FittedGLM(family=family, link="log", layout=layout, fingerprint=fingerprint,
+                     formula=model_formula, engine=engine, aggregate=aggregate, **fitted)
+
+
+# Recherche en mémoire (LRU), puis dans le registre sur disque, puis
+# ajustement ; un modèle ajusté est enregistré comme nouvelle version.
+def _cached_fit(df, fingerprint, features, family, target, engine, aggregate):
+    if engine not in ENGINES:
+        raise ValueError(f"Moteur GLM inconnu : {engine}")
+    features = list(features)
+    model_formula = formula(target, features)
+    key = (fingerprint, model_formula, family, engine, aggregate)
+
+    def compute():
+        model = load_model(key)
+        if model is None:
+            model = _fit(df, features, family, engine, aggregate, fingerprint, model_formula)
+            save_model(model, key)
+        return model
+    return get_or_compute(_MODELES, key, compute)
+
+
+# GLM fréquence (Poisson, offset log-exposition), ajusté une seule fois par jeu
+# de données et par formule ; aggregate=True ajuste sur les cellules tarifaires.
+def fit_frequency(df, fingerprint, features=RATING_FACTORS, engine="statsmodels", aggregate=False):
+    return _cached_fit(df, fingerprint, features, "poisson", "ClaimNb", engine, aggregate)
+
+
+# GLM coût moyen (Gamma, lien log) sur les contrats sinistrés.
+def fit_severity(df, fingerprint, features=RATING_FACTORS, engine="statsmodels", aggregate=False):
+    return _cached_fit(df, fingerprint, features, "gamma", "Cout_moyen", engine, aggregate)
+
+
+# Contrôle de l'ajustement agrégé : coefficients contrat par contrat et par
+# cellule, côte à côte.
+def compare_aggregate_fit(df, features=RATING_FACTORS, engine="statsmodels"):
+    rows = []
+    for family, label, prepare in [("poisson", "Fréquence", _prepare_frequency),
+                                   ("gamma", "Coût moyen", _prepare_severity)]:
+        fits = {}
+        for aggregate in (False, True):
+            data, y, offset, weights = prepare(df, list(features), aggregate)
+            layout = design_layout(data, list(features))
+            fit = _fit_irls if engine == "irls" else _fit_statsmodels
+            fits[aggregate] = (fit(family, data, layout, y, offset, weights)["params"], len(data))
+        for name, policy, cell in zip(design_columns(layout), fits[False][0], fits[True][0]):
+            rows.append({"Modèle": label, "Coefficient": name, "Par contrat": policy, "Par cellule": cell,
+                         "Écart": abs(policy - cell), "Lignes ajustées": f"{fits[False][1]:,} → {fits[True][1]:,}"})
+    return pd.DataFrame(rows)
+
+
+# Comparaison des deux moteurs, sans cache ni démarrage à chaud : temps
+# d'ajustement (construction du plan comprise), taille du plan d'expérience et
+# écart maximal entre coefficients.
+def benchmark_engines(df, features=RATING_FACTORS):
+    features = list(features)
+    rows = []
+    for family, label, prepare in [("poisson", "Fréquence (Poisson)", _prepare_frequency),
+                                   ("gamma", "Coût moyen (Gamma)", _prepare_severity)]:
+        data, y, offset, _ = prepare(df, features)
+        layout = design_layout(data, features)
+
+        start = time.perf_counter()
+        reference = _fit_statsmodels(family, data, layout, y, offset)
+        elapsed_sm = time.perf_counter() - start
+        dense_bytes = len(data) * len(design_columns(layout)) * 8
+
+        start = time.perf_counter()
+        fitted = _fit_irls(family, data, layout, y, offset)
+        elapsed_irls = time.perf_counter() - start
+        X = sparse_design(data, layout)
+        sparse_bytes = X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+
+        gap = float(np.max(np.abs(fitted["params"] - reference["params"])))
+        rows.append({"Modèle": label, "Moteur": "statsmodels (dense)", "Temps (s)": elapsed_sm,
+                     "Plan d'expérience (Mo)": dense_bytes / 1e6, "Écart max coefficients": 0.0})
+        rows.append({"Modèle": label, "Moteur": "IRLS (creux)", "Temps (s)": elapsed_irls,
+                     "Plan d'expérience (Mo)": sparse_bytes / 1e6, "Écart max coefficients": gap})
+    return pd.DataFrame(rows)
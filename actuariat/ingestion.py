@@ -0,0 +1,135 @@
+import pandas as pd
+import pyarrow.parquet as pq
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# Une colonne texte passe en 'category' si elle compte au plus cette part de
+# valeurs distinctes dans le premier bloc lu.
+CATEGORY_MAX_RATIO = 0.5
+
+
+# Colonnes texte peu variées : choisies une fois, sur le premier bloc, puis
+# imposées aux suivants pour que le type final ne dépende pas du découpage
+# (un dernier bloc de quelques lignes passerait sinon toute une colonne
+# d'identifiants en catégorie). Une colonne vide n'est pas retenue.
+def category_columns(chunk):
+    return {col for col in chunk.columns
+            if chunk[col].dtype == object and chunk[col].notna().any()
+            and chunk[col].nunique() <= max(1, len(chunk) * CATEGORY_MAX_RATIO)}
+
+
+# Réduction mémoire d'un bloc : entiers réduits au plus petit type possible,
+# colonnes texte `categorical` (par défaut, choisies sur ce bloc) converties
+# en catégories.
+def compact_chunk(chunk, categorical=None):
+    if categorical is None:
+        categorical = category_columns(chunk)
+    for col in chunk.columns:
+        s = chunk[col]
+        if pd.api.types.is_integer_dtype(s.dtype):
+            chunk[col] = pd.to_numeric(s, downcast="integer")
+        elif s.dtype == object and col in categorical:
+            chunk[col] = s.astype("category")
+    return chunk
+
+
+def _sorted_union(values):
+    try:
+        return sorted(values)
+    except TypeError:
+        return list(values)
+
+
+# Concaténation des blocs : les catégories de chaque colonne sont unifiées au
+# préalable, sinon pandas retomberait sur le type object.
+def concat_chunks(chunks):
+    if not chunks:
+        return pd.DataFrame()
+    cat_cols = {col for c in chunks for col in c.columns if isinstance(c[col].dtype, pd.CategoricalDtype)}
+    for col in cat_cols:
+        values = set()
+        for c in chunks:
+            s = c[col]
+            values.update(s.cat.categories if isinstance(s.dtype, pd.CategoricalDtype) else s.dropna().unique())
+        categories = _sorted_union(values)
+        for c in chunks:
+            c[col] = pd.Categorical(c[col], categories=categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+# Lecture des blocs un à un : seul le bloc compacté est conservé.
+# fraction(rows) estime l'avancement, ou vaut None s'il est inconnu.
+def _consume(chunks, progress, fraction=None):
+    kept = []
+    rows = 0
+    categorical = None
+    for chunk in chunks:
+        if categorical is None:
+            categorical = category_columns(chunk)
+        kept.append(compact_chunk(chunk, categorical))
+        rows += len(chunk)
+        if progress is not None:
+            progress(rows, fraction(rows) if fraction is not None else None)
+    return concat_chunks(kept)
+
+
+def _row_fraction(total_rows):
+    return (lambda rows: rows / total_rows) if total_rows else None
+
+
+def read_csv_chunked(source, chunksize=DEFAULT_CHUNKSIZE, progress=None, total_bytes=None, columns=None):
+    fraction = None
+    if total_bytes and hasattr(source, "tell"):
+        fraction = lambda rows: source.tell() / total_bytes
+    with pd.read_csv(source, chunksize=chunksize, usecols=columns) as reader:
+        return _consume(reader, progress, fraction)
+
+
+# Lecture Parquet par groupes de lignes, limitée aux colonnes demandées
+def read_parquet_batched(source, chunksize=DEFAULT_CHUNKSIZE, progress=None, columns=None):
+    parquet = pq.ParquetFile(source)
+    batches = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunksize, columns=columns))
+    return _consume(batches, progress, _row_fraction(parquet.metadata.num_rows))
+
+
+def read_excel_compact(source):
+    return compact_chunk(pd.read_excel(source))
+
+
+# stream_results demande un curseur côté serveur : sans lui, le pilote
+# rapatrie tout le résultat avant le premier bloc.
+def read_sql_chunked(query, connection, chunksize=DEFAULT_CHUNKSIZE, progress=None, total_rows=None):
+    connection = connection.execution_options(stream_results=True)
+    chunks = pd.read_sql(query, connection, chunksize=chunksize)
+    return _consume(chunks, progress, _row_fraction(total_rows))
+
+
+# Documents accumulés colonne par colonne (une liste par champ) puis convertis
+# en bloc : pas de liste de dictionnaires intermédiaire. Un champ absent d'un
+# document vaut None ; un champ apparu en cours de bloc est complété en amont.
+def _mongo_batches(cursor, batch_size, columns=None):
+    buffers = {col: [] for col in columns or []}
+    rows = 0
+    for document in cursor:
+        for col, values in buffers.items():
+            values.append(document.get(col))
+        if columns is None:
+            for col in document:
+                if col not in buffers and col != "_id":
+                    buffers[col] = [None] * rows + [document[col]]
+        rows += 1
+        if rows >= batch_size:
+            yield pd.DataFrame(buffers)
+            buffers = {col: [] for col in buffers}
+            rows = 0
+    if rows:
+        yield pd.DataFrame(buffers)
+
+
+# Lecture par lots d'un curseur MongoDB ; `projection` limite les champs
+# transmis par le serveur.
+def read_mongo_batched(collection, batch_size=DEFAULT_CHUNKSIZE, progress=None, total_rows=None,
+                       query=None, projection=None):
+    fields = None if projection is None else {**{col: 1 for col in projection}, "_id": 0}
+    cursor = collection.find(query or {}, fields, batch_size=min(batch_size, 10_000))
+    return _consume(_mongo_batches(cursor, batch_size, projection), progress, _row_fraction(total_rows))
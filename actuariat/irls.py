@@ -0,0 +1,204 @@
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy import special, stats
+
+from actuariat.modele import design_columns
+
+# Moteur GLM interne (lien log, familles Poisson et Gamma) par moindres carrés
+# itérativement repondérés sur un plan d'expérience creux. Les poids permettent
+# d'ajuster sur des statistiques groupées (une ligne par cellule tarifaire).
+
+FAMILIES = {"poisson": "Poisson", "gamma": "Gamma"}
+# Demi-pas successifs autorisés quand une itération augmente la déviance
+MAX_HALVINGS = 30
+
+
+class ConvergenceWarning(RuntimeWarning):
+    pass
+
+
+# Plan d'expérience CSR : constante, variables numériques et indicatrices des
+# modalités hors référence (même codage que modele.design_matrix).
+def sparse_design(df, layout):
+    n = len(df)
+    rows, cols, data = [np.arange(n)], [np.zeros(n, dtype=np.int64)], [np.ones(n)]
+    j = 1
+    for col, levels in layout:
+        if levels is None:
+            rows.append(np.arange(n))
+            cols.append(np.full(n, j, dtype=np.int64))
+            data.append(df[col].to_numpy(dtype=float))
+            j += 1
+        else:
+            codes = pd.Categorical(df[col], categories=list(levels)).codes
+            hit = np.flatnonzero(codes > 0)
+            rows.append(hit)
+            cols.append(j + codes[hit].astype(np.int64) - 1)
+            data.append(np.ones(len(hit)))
+            j += len(levels) - 1
+    return sp.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))), shape=(n, j))
+
+
+def _variance(family, mu):
+    return mu if family == "poisson" else mu ** 2
+
+
+def _deviance(family, y, mu, weights):
+    if family == "poisson":
+        term = np.where(y > 0, y * np.log(np.where(y > 0, y, 1.0) / mu), 0.0) - (y - mu)
+    else:
+        term = -np.log(y / mu) + (y - mu) / mu
+    return 2.0 * np.sum(weights * term)
+
+
+def _loglike(family, y, mu, weights, scale):
+    if family == "poisson":
+        return np.sum(weights * (y * np.log(mu) - mu - special.gammaln(y + 1)))
+    weight_scale = weights / scale
+    ratio = y / mu
+    return np.sum(weight_scale * np.log(weight_scale * ratio) - weight_scale * ratio
+                  - special.gammaln(weight_scale) - np.log(y))
+
+
+# X' W et X' W X (matrice p x p dense, p restant petit)
+def _weighted_cross(X, w):
+    XtW = (X.T @ sp.diags(w)) if sp.issparse(X) else X.T * w
+    xtwx = XtW @ X
+    return XtW, (xtwx.toarray() if sp.issparse(xtwx) else xtwx)
+
+
+@dataclass(frozen=True)
+class IRLSResult:
+    family: str
+    params: np.ndarray
+    bse: np.ndarray
+    scale: float
+    deviance: float
+    pearson_chi2: float
+    llf: float
+    aic: float
+    nobs: int
+    df_resid: int
+    iterations: int
+    converged: bool
+
+
+def fit_irls(X, y, family, offset=None, weights=None, start_params=None, tol=1e-8, max_iter=100):
+    y = np.asarray(y, dtype=float)
+    n, p = X.shape
+    offset = np.zeros(n) if offset is None else np.asarray(offset, dtype=float)
+    weights = np.ones(n) if weights is None else np.asarray(weights, dtype=float)
+
+    # Départ comme statsmodels, ou à chaud sur des coefficients connus s'ils
+    # font mieux que le modèle nul (moyenne constante)
+    mean = np.average(y, weights=weights)
+    beta = np.zeros(p)
+    mu = (y + mean) / 2.0
+    deviance = np.inf
+    if start_params is not None:
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            warm_mu = np.exp(X @ np.asarray(start_params, dtype=float) + offset)
+            warm_deviance = _deviance(family, y, warm_mu, weights)
+        if np.isfinite(warm_deviance) and warm_deviance <= _deviance(family, y, np.full(n, mean), weights):
+            beta, mu, deviance = np.asarray(start_params, dtype=float), warm_mu, warm_deviance
+    eta = np.log(mu)
+
+    converged = False
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        # Lien log : dmu/deta = mu, poids de travail mu² / V(mu)
+        w = weights * mu ** 2 / _variance(family, mu)
+        z = eta - offset + (y - mu) / mu
+        XtW, xtwx = _weighted_cross(X, w)
+        step = np.linalg.solve(xtwx, XtW @ z)
+        # Pas réduit de moitié tant que la déviance augmente (ou déborde)
+        for _ in range(MAX_HALVINGS):
+            with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+                eta = X @ step + offset
+                mu = np.exp(eta)
+                new_deviance = _deviance(family, y, mu, weights)
+            if np.isfinite(new_deviance) and new_deviance <= deviance:
+                break
+            step = (beta + step) / 2.0
+        else:
+            # Aucun pas ne fait baisser la déviance : arrêt sur les derniers coefficients
+            break
+        beta = step
+        if abs(new_deviance - deviance) <= tol * (abs(new_deviance) + 0.1):
+            deviance = new_deviance
+            converged = True
+            break
+        deviance = new_deviance
+
+    if not converged:
+        warnings.warn(f"IRLS {FAMILIES[family]} : pas de convergence en {max_iter} itérations "
+                      f"(déviance {deviance:.6g}).", ConvergenceWarning, stacklevel=2)
+    return fit_statistics(X, y, family, beta, offset, weights, iterations, converged)
+
+
+# Statistiques d'un ajustement à coefficients donnés : dispersion de Pearson,
+# écarts-types, déviance, log-vraisemblance et AIC. Sert aussi à ramener au
+# niveau contrat un ajustement réalisé sur des cellules agrégées.
+def fit_statistics(X, y, family, params, offset=None, weights=None, iterations=None, converged=None):
+    y = np.asarray(y, dtype=float)
+    n, p = X.shape
+    offset = np.zeros(n) if offset is None else np.asarray(offset, dtype=float)
+    weights = np.ones(n) if weights is None else np.asarray(weights, dtype=float)
+    mu = np.exp(X @ params + offset)
+    w = weights * mu ** 2 / _variance(family, mu)
+    _, xtwx = _weighted_cross(X, w)
+    df_resid = n - p
+    pearson_chi2 = float(np.sum(weights * (y - mu) ** 2 / _variance(family, mu)))
+    scale = 1.0 if family == "poisson" else pearson_chi2 / df_resid
+    bse = np.sqrt(np.diag(np.linalg.inv(xtwx)) * scale)
+    llf = float(_loglike(family, y, mu, weights, scale))
+    return IRLSResult(
+        family=family,
+        params=np.asarray(params, dtype=float),
+        bse=bse,
+        scale=scale,
+        deviance=float(_deviance(family, y, mu, weights)),
+        pearson_chi2=pearson_chi2,
+        llf=llf,
+        aic=-2 * llf + 2 * p,
+        nobs=n,
+        df_resid=df_resid,
+        iterations=iterations,
+        converged=converged,
+    )
+
+
+# Résumé texte au format de GLMResults.summary() pour les champs affichés par
+# les pages.
+def format_summary(result, layout, dep_variable, method="IRLS"):
+    columns = design_columns(layout)
+    z = result.params / result.bse
+    dist = stats.norm
+    pvalues = 2 * dist.sf(np.abs(z))
+    q = dist.ppf(0.975)
+    header = [
+        ("Dep. Variable:", dep_variable, "No. Observations:", result.nobs),
+        ("Model:", f"GLM ({method})", "Df Residuals:", result.df_resid),
+        ("Model Family:", FAMILIES[result.family], "Df Model:", len(columns) - 1),
+        ("Link Function:", "Log", "Scale:", f"{result.scale:.4f}"),
+        ("Method:", method, "Log-Likelihood:", f"{result.llf:.5g}"),
+        ("Converged:", "-" if result.converged is None else result.converged, "Deviance:", f"{result.deviance:.5g}"),
+        ("No. Iterations:", "-" if result.iterations is None else result.iterations, "Pearson chi2:",
+         f"{result.pearson_chi2:.3g}"),
+    ]
+    width = 78
+    lines = ["Generalized Linear Model Regression Results".center(width), "=" * width]
+    for left_label, left, right_label, right in header:
+        lines.append(f"{left_label:<20}{str(left):>18}   {right_label:<20}{str(right):>17}")
+    lines.append("=" * width)
+    lines.append(f"{'':<20}{'coef':>10}{'std err':>10}{'z':>10}{'P>|z|':>10}{'[0.025':>9}{'0.975]':>9}")
+    lines.append("-" * width)
+    for name, coef, se, zi, pv in zip(columns, result.params, result.bse, z, pvalues):
+        lines.append(f"{name[:20]:<20}{coef:>10.4f}{se:>10.3f}{zi:>10.3f}{pv:>10.3f}"
+                     f"{coef - q * se:>9.3f}{coef + q * se:>9.3f}")
+    lines.append("=" * width)
+    return "\n".join(lines)
@@ -0,0 +1,97 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Ce module ne dépend pas de statsmodels : un modèle ajusté se résume à ses
+# coefficients et à la description de son plan d'expérience, ce qui suffit
+# pour tarifer.
+
+
+def formula(target, features):
+    return f"{target} ~ {' + '.join(features)}"
+
+
+# Pour chaque variable : None si elle est numérique, sinon la liste ordonnée de
+# ses modalités observées. La première modalité sert de référence, comme avec
+# pd.get_dummies(..., drop_first=True).
+def design_layout(df, features):
+    layout = []
+    for col in features:
+        s = df[col]
+        if pd.api.types.is_numeric_dtype(s) and not isinstance(s.dtype, pd.CategoricalDtype):
+            layout.append((col, None))
+        else:
+            levels = pd.Categorical(s.dropna()).remove_unused_categories().categories
+            layout.append((col, tuple(levels.tolist())))
+    return tuple(layout)
+
+
+def design_columns(layout):
+    columns = ["const"]
+    for col, levels in layout:
+        if levels is None:
+            columns.append(col)
+        else:
+            columns.extend(f"{col}_{level}" for level in levels[1:])
+    return columns
+
+
+# Matrice dense (constante + indicatrices). Une modalité inconnue du modèle
+# retombe sur la référence, comme le reindex(fill_value=0) des pages.
+def design_matrix(df, layout):
+    n = len(df)
+    X = np.zeros((n, len(design_columns(layout))))
+    X[:, 0] = 1.0
+    j = 1
+    for col, levels in layout:
+        if levels is None:
+            X[:, j] = df[col].to_numpy(dtype=float)
+            j += 1
+        else:
+            codes = pd.Categorical(df[col], categories=list(levels)).codes
+            k = len(levels) - 1
+            X[:, j:j + k] = codes[:, None] == np.arange(1, k + 1)[None, :]
+            j += k
+    return X
+
+
+@dataclass(frozen=True)
+class FittedGLM:
+    family: str
+    link: str
+    layout: tuple
+    params: np.ndarray
+    bse: np.ndarray
+    summary: str
+    nobs: int
+    deviance: float
+    aic: float
+    scale: float
+    fingerprint: str
+    formula: str
+    engine: str = "statsmodels"
+    aggregate: bool = False
+
+    # Identifiant du modèle pour les caches qui en dépendent (grilles,
+    # simulations, bootstrap...) : données, formule, famille et options d'ajustement.
+    @property
+    def cache_key(self):
+        return (self.fingerprint, self.formula, self.family, self.engine, self.aggregate)
+
+    @property
+    def features(self):
+        return [col for col, _ in self.layout]
+
+    @property
+    def columns(self):
+        return design_columns(self.layout)
+
+    def coefficients(self):
+        return pd.Series(self.params, index=self.columns)
+
+    def predict(self, df, exposure=None):
+        eta = design_matrix(df, self.layout) @ self.params
+        if exposure is not None:
+            eta = eta + np.log(np.asarray(exposure, dtype=float))
+        return np.exp(eta)
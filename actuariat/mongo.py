@@ -0,0 +1,126 @@
+import atexit
+
+import pandas as pd
+from cachetools import LRUCache
+
+from actuariat.cache import get_or_compute
+from actuariat.cube import AGE_BAND_WIDTH, DIMENSIONS
+from actuariat.ingestion import DEFAULT_CHUNKSIZE, compact_chunk, read_mongo_batched
+
+# Accès MongoDB. Un client (et son pool de connexions) est conservé par profil
+# de connexion ; les lectures ne demandent que les champs utiles (projection)
+# et les documents retenus par les filtres Region / Area, et le cube du
+# tableau de bord est calculé par le serveur (pipeline $match / $group).
+SAMPLE_DOCUMENTS = 100
+SERVER_TIMEOUT_MS = 5_000
+
+
+# Un client évincé du cache ferme ses connexions
+class _ClientPool(LRUCache):
+    def popitem(self):
+        key, client = super().popitem()
+        client.close()
+        return key, client
+
+
+_CLIENTS = _ClientPool(maxsize=4)
+
+
+# pymongo n'est importé qu'à la connexion : les fonctions de lecture
+# acceptent toute collection compatible (mongomock par exemple).
+def get_client(host="localhost", port=27017, user=None, password=None):
+    from pymongo import MongoClient
+
+    key = (host, int(port), user or None, password or None)
+    return get_or_compute(_CLIENTS, key, lambda: MongoClient(host=host, port=int(port), username=user or None,
+                                                             password=password or None,
+                                                             serverSelectionTimeoutMS=SERVER_TIMEOUT_MS))
+
+
+# Fermeture des clients à l'arrêt du processus
+@atexit.register
+def close_clients():
+    while _CLIENTS:
+        _CLIENTS.popitem()
+
+
+# Champs présents dans un échantillon de documents (choix de la projection)
+def field_names(collection, sample=SAMPLE_DOCUMENTS):
+    names = {}
+    for document in collection.find({}, limit=sample):
+        names.update(dict.fromkeys(document))
+    names.pop("_id", None)
+    return list(names)
+
+
+def _match(regions=None, areas=None):
+    match = {}
+    if regions:
+        match["Region"] = {"$in": list(regions)}
+    if areas:
+        match["Area"] = {"$in": list(areas)}
+    return match
+
+
+def distinct_values(collection, field):
+    return sorted(value for value in collection.distinct(field) if value is not None)
+
+
+def count_documents(collection, **filters):
+    match = _match(**filters)
+    return collection.count_documents(match) if match else collection.estimated_document_count()
+
+
+def read_collection(collection, columns=None, batch_size=DEFAULT_CHUNKSIZE, progress=None, **filters):
+    total_rows = count_documents(collection, **filters) if progress is not None else None
+    return read_mongo_batched(collection, batch_size=batch_size, progress=progress, total_rows=total_rows,
+                              query=_match(**filters), projection=list(columns) if columns else None)
+
+
+# Sommes par cellule calculées par le serveur, mêmes colonnes que
+# actuariat.sql : les moyennes par contrat (Frequence, Cout_moyen,
+# Sinistralite_pure) ne portent que sur les documents où elles sont définies.
+def _cell_accumulators():
+    def defined(condition, value):
+        return {"$sum": {"$cond": [condition, value, 0]}}
+
+    exposed = {"$gt": ["$Exposure", 0]}
+    claimant = {"$gt": ["$ClaimNb", 0]}
+    return {
+        "Contrats": {"$sum": 1},
+        "ClaimNb": {"$sum": "$ClaimNb"},
+        "Exposure": {"$sum": "$Exposure"},
+        "ClaimAmount": {"$sum": "$ClaimAmount"},
+        "Frequence_somme": defined(exposed, {"$divide": ["$ClaimNb", "$Exposure"]}),
+        "Frequence_n": defined(exposed, 1),
+        "Cout_moyen_somme": defined(claimant, {"$divide": ["$ClaimAmount", "$ClaimNb"]}),
+        "Cout_moyen_n": defined(claimant, 1),
+        "Sinistralite_pure_somme": defined(exposed, {"$divide": ["$ClaimAmount", "$Exposure"]}),
+        "Sinistralite_pure_n": defined(exposed, 1),
+    }
+
+
+# Pipeline $match / $group / $project : une ligne par cellule, clés à plat
+def _read_grouped(collection, keys, **filters):
+    accumulators = _cell_accumulators()
+    pipeline = [
+        {"$match": _match(**filters)},
+        {"$group": {"_id": keys, **accumulators}},
+        {"$project": {"_id": 0, **{name: f"$_id.{name}" for name in keys}, **dict.fromkeys(accumulators, 1)}},
+    ]
+    cells = pd.DataFrame(list(collection.aggregate(pipeline, allowDiskUse=True)),
+                         columns=list(keys) + list(accumulators))
+    for name in accumulators:
+        counts = name == "Contrats" or name.endswith("_n")
+        cells[name] = cells[name].fillna(0).astype("int64" if counts else "float64")
+    return compact_chunk(cells)
+
+
+# Cube du tableau de bord calculé par le serveur, même format que
+# actuariat.cube.build_cube ; tranche d'âge : DrivAge - DrivAge mod 5.
+def read_cube(collection, **filters):
+    keys = {name: f"${name}" for name in DIMENSIONS if name != "DrivAgeBand"}
+    keys["DrivAgeBand"] = {"$subtract": ["$DrivAge", {"$mod": ["$DrivAge", AGE_BAND_WIDTH]}]}
+    cube = _read_grouped(collection, keys, **filters)
+    cube["DrivAgeBand"] = cube["DrivAgeBand"].astype(float)
+    return cube[DIMENSIONS + [col for col in cube.columns if col not in DIMENSIONS]]
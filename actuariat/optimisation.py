@@ -0,0 +1,132 @@
+import time
+
+import numpy as np
+
+from actuariat.cache import get_or_compute, lru_cache
+from actuariat.tarification import price_batch
+
+# Optimisation des ajustements tarifaires par cellule tarifaire. Le problème
+# est posé sur les cellules agrégées (une ligne par combinaison des facteurs
+# des GLM), sa taille ne dépend donc pas du nombre de contrats.
+#
+#   x_c        ajustement de la prime de la cellule c (0.05 = +5 %)
+#   r_c        rétention = 1 - élasticité × x_c (exposition conservée)
+#   objectif   min Σ w_c x_c², w_c = part de la prime actuelle (écarts pondérés)
+#   contrainte Σ L_c r_c ≤ S/P cible × Σ P_c (1 + x_c) r_c
+#   bornes     |x_c| ≤ variation maximale, avec élasticité × variation
+#              maximale < 1 pour que la rétention reste positive
+#
+# La contrainte s'écrit Σ m_c(x_c) ≥ 0 avec m_c concave, et l'objectif est
+# séparable : à multiplicateur λ fixé, chaque cellule a une solution explicite
+# (minimum d'un trinôme, ramené dans les bornes). Il reste à trouver λ par
+# dichotomie, la marge totale croissant avec λ. Tout est vectorisé sur les
+# cellules.
+
+MAX_ELASTICITY = 3.0
+
+_CELLULES = lru_cache(maxsize=8)
+
+
+# Plus grande élasticité (au dixième) laissant une rétention positive pour
+# toute hausse jusqu'à `max_change`.
+def max_elasticity(max_change, step=0.1, upper=MAX_ELASTICITY):
+    return min(upper, np.floor((1.0 / max_change - 1e-9) / step) * step)
+
+
+def _cell_features(model_freq, model_cout):
+    return list(dict.fromkeys(model_freq.features + model_cout.features))
+
+
+# Exposition, prime actuelle et charge attendue (prime pure GLM) par cellule.
+# La fréquence étant proportionnelle à l'exposition, la charge d'une cellule
+# se calcule sur son exposition totale.
+def _rating_cells(df, premium, model_freq, model_cout):
+    features = _cell_features(model_freq, model_cout)
+    cells = (df[features].assign(Exposure=df["Exposure"].to_numpy(dtype=float), Prime=np.asarray(premium, dtype=float))
+             .groupby(features, observed=True, sort=True)
+             .agg(Contrats=("Exposure", "size"), Exposure=("Exposure", "sum"), Prime=("Prime", "sum"))
+             .reset_index())
+    cells["Charge attendue"] = price_batch(cells, model_freq, model_cout)["Prime pure"].to_numpy()
+    return cells.rename(columns={"Exposure": "Exposition", "Prime": "Prime actuelle"})
+
+
+# Cellules mises en cache par (modèles, source de la prime) : seul ce calcul
+# parcourt les contrats.
+def rating_cells(df, premium, model_freq, model_cout, premium_key):
+    key = (model_freq.cache_key, model_cout.cache_key, premium_key)
+    return get_or_compute(_CELLULES, key, lambda: _rating_cells(df, premium, model_freq, model_cout))
+
+
+def _solve(weights, a, b, c, max_change, tol=1e-10, max_iter=200):
+    def adjustments(lam):
+        # min w x² - λ (c + b x - a x²) sur [-max_change, max_change]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = np.where(weights + lam * a > 0, lam * b / (2.0 * (weights + lam * a)), np.sign(b) * max_change)
+        return np.clip(x, -max_change, max_change)
+
+    def margin(x):
+        return float(np.sum(c + b * x - a * x ** 2))
+
+    x = np.zeros(len(weights))
+    if margin(x) >= 0:
+        return x, True, "Contrainte déjà respectée : aucun ajustement nécessaire."
+    high = 1.0
+    while margin(adjustments(high)) < 0:
+        high *= 2.0
+        if high > 1e15:
+            return adjustments(high), False, "S/P cible inatteignable avec la variation maximale autorisée."
+    low = 0.0
+    for _ in range(max_iter):
+        lam = (low + high) / 2.0
+        if margin(adjustments(lam)) < 0:
+            low = lam
+        else:
+            high = lam
+        if high - low <= tol * high:
+            break
+    return adjustments(high), True, "Solution optimale trouvée."
+
+
+def optimize_adjustments(cells, target_loss_ratio=0.7, max_change=0.15, elasticity=0.5):
+    # Au-delà, une hausse autorisée rendrait la rétention nulle ou négative :
+    # le modèle n'a plus de sens (exposition négative).
+    if elasticity * max_change >= 1.0:
+        raise ValueError(f"Élasticité × variation maximale = {elasticity * max_change:.2f} : elle doit rester "
+                         "inférieure à 1 pour que la rétention reste positive.")
+    start = time.perf_counter()
+    premium = cells["Prime actuelle"].to_numpy(dtype=float)
+    losses = cells["Charge attendue"].to_numpy(dtype=float)
+    weights = premium / premium.sum()
+
+    def retention(x):
+        return 1.0 - elasticity * x
+
+    # Marge de S/P par cellule : c + b x - a x² (≥ 0 au total si respectée)
+    a = target_loss_ratio * premium * elasticity
+    b = target_loss_ratio * premium * (1.0 - elasticity) + elasticity * losses
+    c = target_loss_ratio * premium - losses
+    x, success, message = _solve(weights, a, b, c, max_change)
+    r = retention(x)
+
+    proposal = cells.copy()
+    proposal["Ajustement (%)"] = 100 * x
+    proposal["Prime projetée"] = premium * (1.0 + x) * r
+    proposal["Rétention"] = r
+    with np.errstate(divide="ignore", invalid="ignore"):
+        proposal["S/P actuel"] = losses / premium
+        proposal["S/P projeté"] = losses * r / proposal["Prime projetée"]
+
+    kpis = {
+        "Cellules": len(cells),
+        "Prime actuelle": premium.sum(),
+        "Prime projetée": proposal["Prime projetée"].sum(),
+        "S/P actuel": losses.sum() / premium.sum(),
+        "S/P projeté": np.sum(losses * r) / proposal["Prime projetée"].sum(),
+        "Rétention (exposition)": np.average(r, weights=cells["Exposition"]),
+        "Ajustement moyen (%)": 100 * np.average(x, weights=weights),
+        "Contrainte respectée": bool(np.sum(c + b * x - a * x ** 2) >= -1e-6 * premium.sum()),
+        "Convergence": success,
+        "Message": message,
+        "Durée (s)": time.perf_counter() - start,
+    }
+    return proposal, kpis
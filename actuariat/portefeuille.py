@@ -0,0 +1,68 @@
+import hashlib
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+DERIVED_COLUMNS = ["Frequence", "Cout_moyen", "Sinistralite_pure"]
+
+
+# Empreinte du contenu d'un DataFrame (valeurs, colonnes, types) : sert de clé
+# aux caches de modèles et d'agrégats.
+def fingerprint(df):
+    h = hashlib.sha1()
+    h.update(repr((df.shape, list(df.columns), [str(t) for t in df.dtypes])).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+# Colonnes actuarielles calculées en une passe vectorisée, directement dans df.
+def add_derived_columns(df):
+    if not all(col in df.columns for col in ["ClaimNb", "Exposure", "ClaimAmount"]):
+        return df
+    claims = df["ClaimNb"].to_numpy(dtype=float)
+    exposure = df["Exposure"].to_numpy(dtype=float)
+    amount = df["ClaimAmount"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["Frequence"] = claims / exposure
+        df["Cout_moyen"] = np.where(claims > 0, amount / claims, np.nan)
+        df["Sinistralite_pure"] = amount / exposure
+    return df
+
+
+# Portefeuille enrichi partagé par les pages. Les pages le lisent sans le
+# copier ni le modifier : les sous-ensembles usuels sont calculés une seule
+# fois puis conservés sur l'objet. `simulation` décrit la simulation de
+# ClaimAmount (graine et configuration) quand la colonne a été simulée.
+@dataclass(frozen=True)
+class Portefeuille:
+    data: pd.DataFrame
+    fingerprint: str
+    simulation: dict = None
+
+    def has_columns(self, columns):
+        return all(col in self.data.columns for col in columns)
+
+    def missing_columns(self, columns):
+        return [col for col in columns if col not in self.data.columns]
+
+    # Contrats d'exposition strictement positive
+    @cached_property
+    def exposed(self):
+        mask = self.data["Exposure"] > 0
+        return self.data if mask.all() else self.data[mask]
+
+    # Contrats exposés et sinistrés (coût moyen défini)
+    @cached_property
+    def claimants(self):
+        exposed = self.exposed
+        return exposed[exposed["Cout_moyen"].notna()]
+
+
+# L'empreinte peut être fournie quand elle est déjà connue (snapshot).
+def build_portfolio(df, fp=None, simulation=None):
+    if fp is None:
+        fp = fingerprint(df)
+    add_derived_columns(df)
+    return Portefeuille(data=df, fingerprint=fp, simulation=simulation)
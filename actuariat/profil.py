@@ -0,0 +1,116 @@
+import io
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.figure import Figure
+
+from actuariat.cache import get_or_compute, lru_cache
+
+# Profil statistique des colonnes pour l'analyse exploratoire. Au-delà de
+# APPROX_ROWS lignes, quantiles et corrélations sont estimés sur un échantillon
+# et les nombres de valeurs distinctes par un croquis KMV.
+APPROX_ROWS = 1_000_000
+SAMPLE_ROWS = 200_000
+KMV_SIZE = 4096
+QUANTILES = [0.25, 0.5, 0.75]
+HISTOGRAM_BINS = 20
+
+_PROFILS = lru_cache(maxsize=16)
+_HEATMAPS = lru_cache(maxsize=16)
+
+
+# Nombre de valeurs distinctes estimé par les k plus petites empreintes
+# (K Minimum Values) : si la k-ième plus petite empreinte normalisée vaut h,
+# il y a environ (k - 1) / h valeurs distinctes. Exact sous k valeurs.
+def kmv_distinct(values, k=KMV_SIZE, chunksize=1_000_000):
+    smallest = np.array([], dtype=np.uint64)
+    for start in range(0, len(values), chunksize):
+        hashes = pd.util.hash_array(np.asarray(values[start:start + chunksize]))
+        # Seules les empreintes sous la k-ième plus petite déjà vue comptent
+        if len(smallest) == k:
+            hashes = hashes[hashes < smallest[-1]]
+        smallest = np.unique(np.concatenate([smallest, hashes]))[:k]
+    if len(smallest) < k:
+        return len(smallest)
+    return int(round((k - 1) / (float(smallest[-1]) / 2.0 ** 64)))
+
+
+def _sample(df, n, seed=42):
+    if len(df) <= n:
+        return df
+    rng = np.random.default_rng(seed)
+    return df.iloc[np.sort(rng.choice(len(df), size=n, replace=False))]
+
+
+# Statistiques par colonne numérique : agrégats exacts en un appel, quantiles
+# exacts ou estimés sur l'échantillon.
+def _numeric_profile(numeric, sample, approximate):
+    stats = numeric.agg(["count", "mean", "std", "min", "max"]).T
+    quantiles = (sample if approximate else numeric).quantile(QUANTILES).T
+    quantiles.columns = [f"{int(q * 100)}%" for q in QUANTILES]
+    stats = pd.concat([stats, quantiles], axis=1)[["count", "mean", "std", "min"] + list(quantiles.columns) + ["max"]]
+    if approximate:
+        stats["distinct (≈)"] = [kmv_distinct(numeric[col].dropna().to_numpy()) for col in numeric.columns]
+    else:
+        stats["distinct"] = numeric.nunique()
+    return stats
+
+
+# Fréquences des modalités : comptage des codes pour les catégories, sans
+# passer par value_counts colonne à colonne sur des chaînes.
+def _value_counts(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+        result = pd.Series(counts, index=series.cat.categories, name="count")
+        return result[result > 0].sort_values(ascending=False)
+    return series.value_counts()
+
+
+def _histogram(series, bins):
+    values = series.to_numpy(dtype=float)
+    counts, edges = np.histogram(values[np.isfinite(values)], bins=bins)
+    return pd.DataFrame({"Borne basse": edges[:-1], "Borne haute": edges[1:], "Effectif": counts})
+
+
+# totals_by : sommes des colonnes numériques par modalité de cette colonne
+def profile(df, histograms=(), totals_by=None, bins=HISTOGRAM_BINS, approximate=None):
+    if approximate is None:
+        approximate = len(df) > APPROX_ROWS
+    numeric = df.select_dtypes(include="number")
+    categorical = df.select_dtypes(include=["object", "category"])
+    sample = _sample(numeric, SAMPLE_ROWS) if approximate else numeric
+    return {
+        "lignes": len(df),
+        "approximatif": approximate,
+        "types": df.dtypes.astype(str).rename("type"),
+        "manquantes": df.isna().sum().rename("manquantes"),
+        "numeriques": _numeric_profile(numeric, sample, approximate),
+        "modalites": {col: _value_counts(categorical[col]) for col in categorical.columns},
+        "correlations": sample.corr(),
+        "histogrammes": {col: _histogram(df[col], bins) for col in histograms if col in df.columns},
+        "totaux": numeric.groupby(df[totals_by], observed=True).sum() if totals_by in df.columns else None,
+    }
+
+
+# Profil mis en cache par (empreinte du portefeuille, état des filtres) ; le
+# sous-ensemble filtré n'est construit qu'en cas d'absence du cache.
+def cached_profile(fingerprint, filters, select, histograms=(), totals_by=None):
+    key = (fingerprint, filters, tuple(histograms), totals_by)
+    return get_or_compute(_PROFILS, key, lambda: profile(select(), histograms, totals_by))
+
+
+# Heatmap des corrélations rendue une fois en PNG (figure matplotlib hors
+# pyplot, donc sans état global partagé entre sessions).
+def correlation_heatmap_png(correlations, key):
+    def render():
+        size = max(6, 0.6 * len(correlations))
+        fig = Figure(figsize=(size, size * 0.8))
+        ax = fig.subplots()
+        sns.heatmap(correlations, annot=True, fmt=".2f", cmap="Blues", ax=ax)
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=100)
+        return buffer.getvalue()
+    return get_or_compute(_HEATMAPS, key, render)
@@ -0,0 +1,112 @@
+import base64
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from html import escape
+
+from matplotlib.figure import Figure
+from xhtml2pdf import pisa
+
+from actuariat.cache import discard, get_or_compute, lookup, lru_cache
+from actuariat.cube import age_distribution, kpis, mean_by
+
+# Rapports PDF du tableau de bord, rendus dans un thread dédié. Le cache
+# conserve le Future de chaque rapport (clé : empreinte + filtres) : une
+# demande identique réutilise le rendu en cours ou déjà terminé.
+_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rapport")
+_RAPPORTS = lru_cache(maxsize=16)
+
+_STYLE = """
+<style>
+    body { font-family: Helvetica; font-size: 10pt; }
+    h1 { font-size: 18pt; }
+    table { border: 1px solid #999; padding: 2px; }
+    th { background-color: #dde6f0; }
+</style>
+"""
+
+
+# Graphique en barres encodé en PNG base64, intégrable dans le HTML
+def _bar_chart(labels, values, title, ylabel):
+    fig = Figure(figsize=(7, 3))
+    ax = fig.subplots()
+    ax.bar([str(label) for label in labels], values, color="#4a7ab5")
+    ax.set_title(title)
+    ax.set_ylabel(ylabel)
+    ax.tick_params(axis="x", labelrotation=45)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=110)
+    return f'<img src="data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}" width="600"/>'
+
+
+# Table de segments : effectifs, sinistres et moyennes par contrat
+def segment_table(cells, by):
+    grouped = cells.groupby(by, observed=True)[
+        ["Contrats", "ClaimNb", "Exposure", "ClaimAmount", "Frequence_somme", "Frequence_n",
+         "Cout_moyen_somme", "Cout_moyen_n", "Sinistralite_pure_somme", "Sinistralite_pure_n"]].sum()
+    table = grouped[["Contrats", "ClaimNb", "Exposure", "ClaimAmount"]].copy()
+    table["Fréquence moyenne"] = grouped["Frequence_somme"] / grouped["Frequence_n"]
+    table["Coût moyen"] = grouped["Cout_moyen_somme"] / grouped["Cout_moyen_n"]
+    table["Sinistralité pure"] = grouped["Sinistralite_pure_somme"] / grouped["Sinistralite_pure_n"]
+    return table.sort_values("Contrats", ascending=False)
+
+
+def report_html(cells, filters_label):
+    indicateurs = kpis(cells)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M")
+    area = mean_by(cells, "Area", "Frequence")
+    brand = mean_by(cells, "VehBrand", "Sinistralite_pure")
+    ages = age_distribution(cells)
+    tables = "".join(
+        f"<h3>Segments par {by}</h3>"
+        + segment_table(cells, by).to_html(float_format=lambda value: f"{value:,.3f}")
+        for by in ["Region", "Area", "VehBrand"]
+    )
+    return f"""
+    <html><head><meta charset="utf-8"/>{_STYLE}</head><body>
+    <h1>Rapport Actuariel - {now}</h1>
+    <p>Filtres : {escape(filters_label)}</p>
+    <h3>Indicateurs Clés</h3>
+    <ul>
+        <li>Fréquence moyenne : {indicateurs['Frequence']:.3f}</li>
+        <li>Coût moyen : {indicateurs['Cout_moyen']:.0f} €</li>
+        <li>Sinistralité pure : {indicateurs['Sinistralite_pure']:.0f} €</li>
+    </ul>
+    <p>Nombre de lignes : {indicateurs['Contrats']}</p>
+    <h3>Visualisations</h3>
+    {_bar_chart(area["Area"], area["Frequence"], "Fréquence moyenne par zone", "Fréquence")}
+    {_bar_chart(brand["VehBrand"], brand["Sinistralite_pure"], "Sinistralité pure par marque", "€")}
+    {_bar_chart(ages["Tranche d'âge"], ages["Contrats"], "Distribution de l'âge des conducteurs", "Contrats")}
+    <pdf:nextpage/>
+    {tables}
+    </body></html>
+    """
+
+
+# Conversion HTML > PDF en mémoire (aucun fichier temporaire)
+def render_pdf(html):
+    buffer = io.BytesIO()
+    status = pisa.CreatePDF(src=html, dest=buffer, encoding="utf-8")
+    if status.err:
+        raise RuntimeError(f"Échec de la génération du PDF ({status.err} erreur(s)).")
+    return buffer.getvalue()
+
+
+def _build_report(cells, filters_label):
+    return render_pdf(report_html(cells, filters_label))
+
+
+# Lance (ou retrouve) le rendu du rapport pour un jeu de données et un état
+# des filtres. Un rendu en échec est retiré du cache pour pouvoir être relancé.
+def submit_report(fingerprint, filters, cells, filters_label=""):
+    key = (fingerprint, filters)
+    future = lookup(_RAPPORTS, key)
+    if future is not None and future.done() and future.exception() is not None:
+        discard(_RAPPORTS, key)
+    return get_or_compute(_RAPPORTS, key, lambda: _EXECUTOR.submit(_build_report, cells.copy(), filters_label))
+
+
+# Rapport déjà demandé pour cette clé, sans en lancer un nouveau
+def pending_report(fingerprint, filters):
+    return lookup(_RAPPORTS, (fingerprint, filters))
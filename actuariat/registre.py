@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from actuariat.modele import FittedGLM
+
+# Registre local des GLM ajustés. Chaque modèle est identifié par la clé du
+# cache de actuariat.glm (empreinte des données, formule, famille, moteur,
+# ajustement agrégé) et enregistré par versions successives :
+#   .cache/modeles/<identifiant>/v0001.npz   coefficients et écarts-types
+#   .cache/modeles/<identifiant>/v0001.json  plan d'expérience, famille / lien,
+#                                            empreinte, métriques, résumé
+# Le chargement ne dépend que de numpy : pas d'import de statsmodels pour
+# tarifer avec un modèle enregistré.
+REGISTRY_DIR = Path(".cache") / "modeles"
+FORMAT_VERSION = 2
+
+
+def model_id(key):
+    return hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+
+
+def _versions(directory):
+    return sorted(int(path.stem[1:]) for path in directory.glob("v*.json"))
+
+
+def _write_atomic(path, write):
+    tmp = path.with_name(path.name + ".tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+# Le JSON est écrit en dernier : une version sans JSON n'est jamais lue.
+def save_model(model, key, registry=REGISTRY_DIR):
+    directory = Path(registry) / model_id(key)
+    directory.mkdir(parents=True, exist_ok=True)
+    versions = _versions(directory)
+    version = versions[-1] + 1 if versions else 1
+    stem = f"v{version:04d}"
+    metadata = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "key": [str(part) for part in key],
+        "family": model.family,
+        "link": model.link,
+        "formula": model.formula,
+        "fingerprint": model.fingerprint,
+        "engine": model.engine,
+        "aggregate": model.aggregate,
+        "layout": [[col, None if levels is None else list(levels)] for col, levels in model.layout],
+        "metrics": {"nobs": model.nobs, "deviance": model.deviance, "aic": model.aic, "scale": model.scale},
+        "summary": model.summary,
+    }
+
+    def write_arrays(tmp):
+        with open(tmp, "wb") as f:
+            np.savez(f, params=model.params, bse=model.bse)
+
+    def write_metadata(tmp):
+        tmp.write_text(json.dumps(metadata, ensure_ascii=False, default=_to_builtin), encoding="utf-8")
+
+    _write_atomic(directory / f"{stem}.npz", write_arrays)
+    _write_atomic(directory / f"{stem}.json", write_metadata)
+    return version
+
+
+def _to_builtin(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type non sérialisable : {type(value).__name__}")
+
+
+def _read_version(directory, version):
+    metadata = json.loads((directory / f"v{version:04d}.json").read_text(encoding="utf-8"))
+    with np.load(directory / f"v{version:04d}.npz") as arrays:
+        params, bse = arrays["params"], arrays["bse"]
+    layout = tuple((col, None if levels is None else tuple(levels)) for col, levels in metadata["layout"])
+    metrics = metadata["metrics"]
+    model = FittedGLM(family=metadata["family"], link=metadata["link"], layout=layout, params=params, bse=bse,
+                      summary=metadata["summary"], nobs=int(metrics["nobs"]), deviance=float(metrics["deviance"]),
+                      aic=float(metrics["aic"]), scale=float(metrics["scale"]),
+                      fingerprint=metadata["fingerprint"], formula=metadata["formula"],
+                      engine=metadata["engine"], aggregate=metadata["aggregate"])
+    return model, metadata
+
+
+# Dernière version enregistrée pour la clé (ou la version demandée), None si
+# le modèle est absent, illisible ou d'un format antérieur.
+def load_model(key, version=None, registry=REGISTRY_DIR):
+    directory = Path(registry) / model_id(key)
+    versions = _versions(directory) if directory.exists() else []
+    if not versions:
+        return None
+    try:
+        model, metadata = _read_version(directory, version or versions[-1])
+    except (OSError, ValueError, KeyError):
+        return None
+    return model if metadata.get("format") == FORMAT_VERSION else None
+
+
+# Une ligne par version enregistrée, la plus récente en premier
+def list_models(registry=REGISTRY_DIR):
+    rows = []
+    for path in Path(registry).glob("*/v*.json"):
+        try:
+            metadata = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        rows.append({"Identifiant": path.parent.name, "Version": metadata["version"],
+                     "Créé le": metadata["created"], "Famille": metadata["family"],
+                     "Formule": metadata["formula"], "Empreinte": metadata["fingerprint"],
+                     **{name.capitalize(): value for name, value in metadata["metrics"].items()}})
+    columns = ["Identifiant", "Version", "Créé le", "Famille", "Formule", "Empreinte", "Nobs", "Deviance", "Aic", "Scale"]
+    return pd.DataFrame(rows, columns=columns).sort_values("Créé le", ascending=False, ignore_index=True)
+
+
+def delete_model(identifier, registry=REGISTRY_DIR):
+    directory = Path(registry) / identifier
+    for path in directory.glob("v*"):
+        path.unlink(missing_ok=True)
+    if directory.exists():
+        directory.rmdir()
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from actuariat.cache import get_or_compute, lru_cache
+
+# Rendu des nuages de points volumineux : au-delà d'un budget de points, le
+# navigateur reçoit soit un échantillon stratifié, soit une grille de densité,
+# plutôt qu'un point par contrat. Les valeurs extrêmes sont toujours tracées.
+POINT_BUDGET = 20_000
+EXTREME_POINTS = 500
+DENSITY_BINS = 80
+RENDER_MODES = ["Échantillon stratifié", "Densité 2D"]
+# Réserve de points tirée une fois par jeu de données, dont une part des plus
+# grandes valeurs : les filtres ne parcourent que cette réserve.
+POOL_SIZE = 200_000
+POOL_EXTREMES = 20_000
+
+_RESERVES = lru_cache(maxsize=8)
+
+
+# Positions des k plus grandes valeurs de `column` (sinistres extrêmes)
+def _extreme_positions(df, column, k):
+    values = df[column].to_numpy(dtype=float)
+    k = min(k, int(np.isfinite(values).sum()))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    values = np.where(np.isfinite(values), values, -np.inf)
+    return np.argpartition(values, -k)[-k:]
+
+
+# Échantillon d'au plus `budget` lignes : les valeurs extrêmes de `keep_top`,
+# puis un tirage proportionnel dans chaque modalité de `stratify` (au moins
+# une ligne par modalité, pour que la légende reste complète).
+def downsample(df, budget=POINT_BUDGET, keep_top=None, stratify=None, extremes=EXTREME_POINTS, seed=42):
+    if len(df) <= budget:
+        return df
+    rng = np.random.default_rng(seed)
+    top = _extreme_positions(df, keep_top, min(extremes, budget // 2)) if keep_top else np.array([], dtype=np.int64)
+    rest = np.setdiff1d(np.arange(len(df)), top)
+    quota = budget - len(top)
+    if stratify is None:
+        drawn = rng.choice(rest, size=min(quota, len(rest)), replace=False)
+    else:
+        groups = pd.factorize(df[stratify].to_numpy()[rest], use_na_sentinel=False)[0]
+        # Clé aléatoire par ligne, triée au sein de chaque modalité
+        order = np.lexsort((rng.random(len(rest)), groups))
+        sorted_groups = groups[order]
+        rank = np.arange(len(order)) - np.searchsorted(sorted_groups, sorted_groups)
+        quotas = np.maximum(1, np.floor(np.bincount(groups) * quota / len(rest))).astype(np.int64)
+        drawn = rest[order[rank < quotas[sorted_groups]]]
+    return df.iloc[np.sort(np.concatenate([top, drawn]))]
+
+
+# Réserve de points (colonnes `columns`) calculée une fois par clé, en
+# général l'empreinte du portefeuille ; sous POOL_SIZE lignes, tout est gardé.
+def scatter_pool(df, key, columns, keep_top=None, stratify=None, size=POOL_SIZE, extremes=POOL_EXTREMES):
+    columns = list(dict.fromkeys(columns))
+    return get_or_compute(_RESERVES, (key, tuple(columns), keep_top, stratify, size, extremes),
+                          lambda: downsample(df[columns], size, keep_top=keep_top, stratify=stratify,
+                                             extremes=extremes))
+
+
+# Comptages sur une grille régulière x × y (centres des cases et effectifs)
+def density_grid(df, x, y, bins=DENSITY_BINS):
+    values = df[[x, y]].to_numpy(dtype=float)
+    values = values[np.isfinite(values).all(axis=1)]
+    counts, x_edges, y_edges = np.histogram2d(values[:, 0], values[:, 1], bins=bins)
+    return (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, counts
+
+
+def _density_figure(df, x, y, keep_top, title, bins):
+    x_centers, y_centers, counts = density_grid(df, x, y, bins)
+    # Échelle logarithmique : quelques cases très denses écraseraient le reste
+    z = np.where(counts > 0, np.log10(np.where(counts > 0, counts, 1)), np.nan).T
+    fig = go.Figure(go.Heatmap(x=x_centers, y=y_centers, z=z, customdata=counts.T, colorscale="Viridis",
+                               colorbar=dict(title="log10(contrats)"),
+                               hovertemplate=f"{x}=%{{x:.3g}}<br>{y}=%{{y:.3g}}<br>Contrats=%{{customdata:.0f}}"
+                                             "<extra></extra>"))
+    rendered = int((counts > 0).sum())
+    if keep_top:
+        top = df.iloc[_extreme_positions(df, keep_top, EXTREME_POINTS)]
+        fig.add_trace(go.Scatter(x=top[x], y=top[y], mode="markers", name="Valeurs extrêmes",
+                                 marker=dict(color="red", size=5)))
+        rendered += len(top)
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig, rendered
+
+
+# Nuage de points adapté à la volumétrie : tracé complet sous le budget, sinon
+# échantillon stratifié ou densité 2D selon `mode`. Renvoie aussi le nombre de
+# points (ou cases) réellement envoyés au navigateur.
+def scatter_figure(df, x, y, color=None, mode=RENDER_MODES[0], budget=POINT_BUDGET, keep_top=None,
+                   title=None, hover_data=None, bins=DENSITY_BINS):
+    if len(df) > budget and mode == "Densité 2D":
+        return _density_figure(df, x, y, keep_top, title, bins)
+    sample = downsample(df, budget, keep_top=keep_top, stratify=color)
+    fig = px.scatter(sample, x=x, y=y, color=color, hover_data=hover_data, title=title,
+                     render_mode="webgl" if len(sample) > 1_000 else "auto")
+    return fig, len(sample)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+
+class SchemaError(ValueError):
+    pass
+
+
+# Schéma compact du portefeuille auto (colonnes de type freMTPL) :
+# colonne -> (type cible, minimum, maximum). Les colonnes absentes sont ignorées.
+PORTFOLIO_SCHEMA = {
+    "Area": ("category", None, None),
+    "Region": ("category", None, None),
+    "VehBrand": ("category", None, None),
+    "VehGas": ("category", None, None),
+    "VehPower": ("int8", 1, 100),
+    "VehAge": ("int16", 0, 150),
+    "DrivAge": ("int8", 16, 120),
+    "BonusMalus": ("int16", 0, 500),
+    "Density": ("int32", 0, None),
+    "ClaimNb": ("int8", 0, 100),
+    "Exposure": ("float32", 0, 10),
+    "ClaimAmount": ("float32", 0, None),
+}
+
+# Colonnes sans lesquelles fréquence et coût n'ont pas de sens : une valeur
+# manquante y est une erreur. Dans les autres colonnes, elle est conservée
+# (une colonne entière est alors stockée en réel) et comptée par
+# missing_values, l'appelant décidant de l'usage à en faire.
+REQUIRED_COLUMNS = ("Exposure", "ClaimNb")
+
+# Écart absolu toléré pour stocker une colonne réelle en float32 ; au-delà
+# (montants élevés au centime près par exemple), elle reste en float64.
+FLOAT32_TOLERANCE = {
+    "Exposure": 1e-6,
+    "ClaimAmount": 5e-3,
+}
+
+
+def _check_range(col, values, low, high):
+    errors = []
+    if col in REQUIRED_COLUMNS and values.isna().any():
+        errors.append(f"{col} : {int(values.isna().sum())} valeurs manquantes")
+    values = values.dropna()
+    if low is not None and (values < low).any():
+        errors.append(f"{col} : {int((values < low).sum())} valeurs < {low}")
+    if high is not None and (values > high).any():
+        errors.append(f"{col} : {int((values > high).sum())} valeurs > {high}")
+    return errors
+
+
+def _to_float32(col, values):
+    values64 = values.astype("float64")
+    values32 = values64.astype("float32")
+    tolerance = FLOAT32_TOLERANCE.get(col, 0.0)
+    if np.nanmax(np.abs(values32.to_numpy(dtype="float64") - values64.to_numpy()), initial=0.0) <= tolerance:
+        return values32
+    return values64
+
+
+# Applique le schéma en place et lève SchemaError en listant toutes les
+# anomalies (types non numériques, valeurs hors bornes, décimales dans une
+# colonne entière, valeurs manquantes dans REQUIRED_COLUMNS).
+def apply_schema(df, schema=PORTFOLIO_SCHEMA):
+    errors = []
+    converted = {}
+    for col, (dtype, low, high) in schema.items():
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if dtype == "category":
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                converted[col] = s.astype("category")
+            continue
+
+        values = pd.to_numeric(s, errors="coerce")
+        invalid = int((values.isna() & s.notna()).sum())
+        if invalid:
+            errors.append(f"{col} : {invalid} valeurs non numériques")
+            continue
+        errors.extend(_check_range(col, values, low, high))
+        if dtype.startswith("int"):
+            if (values.dropna() % 1 != 0).any():
+                errors.append(f"{col} : valeurs décimales pour un entier")
+            elif not errors:
+                converted[col] = values.astype(dtype) if values.notna().all() else _to_float32(col, values)
+        elif not errors:
+            converted[col] = _to_float32(col, values)
+
+    if errors:
+        raise SchemaError("Données non conformes au schéma : " + " ; ".join(errors))
+    for col, values in converted.items():
+        df[col] = values
+    return df
+
+
+# Valeurs manquantes par colonne numérique du schéma (colonnes complètes omises)
+def missing_values(df, schema=PORTFOLIO_SCHEMA):
+    counts = {}
+    for col, (dtype, _, _) in schema.items():
+        if col in df.columns and dtype != "category" and df[col].isna().any():
+            counts[col] = int(df[col].isna().sum())
+    return counts
@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# Segmentation des contrats par rentabilité (prime commerciale - sinistralité
+# pure). Les seuils, croissants, délimitent les niveaux ; une valeur égale à un
+# seuil reste dans le niveau le plus proche du niveau central (« Neutre »).
+TIERS = {
+    3: ([-100.0, 100.0], ["Risque", "Neutre", "Rentable"]),
+    5: ([-500.0, -100.0, 100.0, 500.0], ["Très risqué", "Risque", "Neutre", "Rentable", "Très rentable"]),
+}
+
+ACTIONS = {
+    "Très rentable": "✅ Maintenir / Développer",
+    "Rentable": "✅ Maintenir / Fidéliser",
+    "Neutre": "🔍 Surveiller",
+    "Risque": "⚠️ Revoir tarification / conditions",
+    "Très risqué": "⛔ Majorer ou résilier",
+}
+
+PREMIUM_FACTOR_RANGE = (0.8, 1.4)
+
+
+# Prime commerciale : colonne réelle si elle est fournie, sinon simulée comme
+# `base` (sinistralité pure par défaut) × facteur uniforme, avec une graine
+# pour être reproductible.
+def commercial_premium(df, column=None, seed=42, factor_range=PREMIUM_FACTOR_RANGE, base="Sinistralite_pure"):
+    if column is not None:
+        if column not in df.columns:
+            raise ValueError(f"Colonne de prime introuvable : {column}")
+        return df[column].astype(float)
+    rng = np.random.default_rng(seed)
+    factors = rng.uniform(factor_range[0], factor_range[1], size=len(df))
+    return df[base].astype(float) * factors
+
+
+# Niveau de chaque valeur en une passe : rang par rapport aux seuils, côté
+# droit sous le niveau central et côté gauche au-dessus.
+def assign_tiers(values, thresholds, labels):
+    thresholds = np.asarray(thresholds, dtype=float)
+    if len(labels) != len(thresholds) + 1:
+        raise ValueError("Il faut exactement un libellé de plus que de seuils.")
+    if np.any(np.diff(thresholds) <= 0):
+        raise ValueError("Les seuils doivent être strictement croissants.")
+    values = np.asarray(values, dtype=float)
+    center = len(thresholds) // 2
+    below = np.searchsorted(thresholds, values, side="right")
+    above = np.searchsorted(thresholds, values, side="left")
+    codes = np.where(below <= center, below, above)
+    codes[np.isnan(values)] = -1
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+
+
+def segment_portfolio(df, thresholds=TIERS[3][0], labels=TIERS[3][1], premium_column=None, seed=42):
+    premium = commercial_premium(df, premium_column, seed)
+    result = df.assign(Prime_commerciale=premium.to_numpy(),
+                       Rentabilite=premium.to_numpy() - df["Sinistralite_pure"].to_numpy(dtype=float))
+    result["Segment"] = assign_tiers(result["Rentabilite"].to_numpy(), thresholds, labels)
+    return result
+
+
+# Ancienne règle ligne à ligne (3 niveaux), conservée pour le benchmark
+def _tag_row(row):
+    if row["Rentabilite"] > 100:
+        return "Rentable"
+    elif row["Rentabilite"] < -100:
+        return "Risque"
+    else:
+        return "Neutre"
+
+
+# Durées de la segmentation par apply (ligne à ligne) et vectorisée sur les
+# mêmes lignes, et vérification que les deux donnent les mêmes segments.
+def benchmark_segmentation(df, rows=100_000):
+    data = df[["Rentabilite"]].head(rows)
+    start = time.perf_counter()
+    by_row = data.apply(_tag_row, axis=1)
+    apply_time = time.perf_counter() - start
+    start = time.perf_counter()
+    vectorized = assign_tiers(data["Rentabilite"].to_numpy(), *TIERS[3])
+    vector_time = time.perf_counter() - start
+    return {
+        "Lignes": len(data),
+        "apply (s)": apply_time,
+        "Vectorisé (s)": vector_time,
+        "Accélération": apply_time / max(vector_time, 1e-9),
+        "Résultats identiques": bool((np.asarray(vectorized, dtype=object) == by_row.to_numpy()).all()),
+    }
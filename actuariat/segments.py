@@ -0,0 +1,119 @@
+import io
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.figure import Figure
+
+from actuariat.cache import get_or_compute, lru_cache
+
+# Analyse croisée de la sinistralité sur deux axes. Les variables continues
+# sont découpées en tranches de quantiles, les variables catégorielles trop
+# riches regroupent leurs plus petites modalités (en exposition) dans
+# « Autres ». La sinistralité pure d'une cellule est pondérée par l'exposition :
+# somme des ClaimAmount / somme des Exposure.
+MAX_LEVELS = 20
+QUANTILE_BANDS = 10
+ANNOTATE_MAX_CELLS = 300
+OTHERS = "Autres"
+
+_CELLULES = lru_cache(maxsize=16)
+_HEATMAPS = lru_cache(maxsize=16)
+
+
+def _is_continuous(series, max_levels):
+    return pd.api.types.is_numeric_dtype(series) and series.nunique() > max_levels
+
+
+# Tranches de quantiles (bornes dédoublonnées) : codes et libellés
+def _quantile_bands(values, bands):
+    finite = values[np.isfinite(values)]
+    edges = np.unique(np.quantile(finite, np.linspace(0, 1, bands + 1)))
+    codes = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+    codes[~np.isfinite(values)] = -1
+    labels = [f"[{edges[i]:.4g} ; {edges[i + 1]:.4g}{']' if i == len(edges) - 2 else '['}"
+              for i in range(len(edges) - 1)]
+    return codes, labels
+
+
+# Modalités conservées par exposition décroissante, les autres regroupées
+def _capped_levels(series, exposure, max_levels):
+    codes, uniques = pd.factorize(series, sort=True)
+    labels = [str(level) for level in uniques]
+    if len(labels) <= max_levels:
+        return codes, labels
+    weight = np.bincount(codes[codes >= 0], weights=exposure[codes >= 0], minlength=len(labels))
+    kept = np.sort(np.argsort(weight)[::-1][:max_levels - 1])
+    remap = np.full(len(labels), len(kept))
+    remap[kept] = np.arange(len(kept))
+    return np.where(codes >= 0, remap[codes], -1), [labels[i] for i in kept] + [OTHERS]
+
+
+def axis_codes(series, exposure, bands=QUANTILE_BANDS, max_levels=MAX_LEVELS):
+    if _is_continuous(series, max_levels):
+        return _quantile_bands(series.to_numpy(dtype=float), bands)
+    return _capped_levels(series, exposure, max_levels)
+
+
+# Sommes par cellule (exposition, montants, sinistres, contrats) en une passe
+# bincount sur le code combiné des deux axes.
+def _segment_cells(df, col1, col2, bands):
+    exposure = df["Exposure"].to_numpy(dtype=float)
+    codes1, labels1 = axis_codes(df[col1], exposure, bands)
+    codes2, labels2 = axis_codes(df[col2], exposure, bands)
+    valid = (codes1 >= 0) & (codes2 >= 0)
+    cell = codes1[valid] * len(labels2) + codes2[valid]
+    size = len(labels1) * len(labels2)
+
+    def total(values):
+        return np.bincount(cell, weights=values[valid], minlength=size).reshape(len(labels1), len(labels2))
+
+    sums = {
+        "Exposition": total(exposure),
+        "ClaimAmount": total(df["ClaimAmount"].to_numpy(dtype=float)),
+        "ClaimNb": total(df["ClaimNb"].to_numpy(dtype=float)),
+        "Contrats": np.bincount(cell, minlength=size).reshape(len(labels1), len(labels2)),
+    }
+    index = pd.Index(labels1, name=col1)
+    columns = pd.Index(labels2, name=col2)
+    return {name: pd.DataFrame(values, index=index, columns=columns) for name, values in sums.items()}
+
+
+# Sommes par cellule mises en cache par (empreinte, axes, nombre de tranches)
+def segment_cells(portefeuille, col1, col2, bands=QUANTILE_BANDS):
+    key = (portefeuille.fingerprint, col1, col2, bands)
+    return get_or_compute(_CELLULES, key, lambda: _segment_cells(portefeuille.exposed, col1, col2, bands))
+
+
+# Sinistralité pure pondérée par l'exposition ; NaN pour les cellules vides
+def pure_premium(cells):
+    exposure = cells["Exposition"]
+    return cells["ClaimAmount"].div(exposure.where(exposure > 0))
+
+
+def heatmap_png(table, key, title=None):
+    def render():
+        annotate = bool(table.size <= ANNOTATE_MAX_CELLS)
+        fig = Figure(figsize=(max(8, 0.5 * table.shape[1]), max(5, 0.35 * table.shape[0])))
+        ax = fig.subplots()
+        sns.heatmap(table, annot=annotate, fmt=".0f", cmap="Reds", ax=ax)
+        if title:
+            ax.set_title(title)
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=100)
+        return buffer.getvalue()
+    return get_or_compute(_HEATMAPS, key, render)
+
+
+# Contrats au-delà du seuil : nombre total et les k plus élevés, par sélection
+# partielle (argpartition) plutôt que par tri complet.
+def high_risk(df, threshold, k=20, column="Sinistralite_pure", columns=None):
+    values = df[column].to_numpy(dtype=float)
+    above = np.flatnonzero(values > threshold)
+    count = len(above)
+    if count > k:
+        above = above[np.argpartition(values[above], -k)[-k:]]
+    top = above[np.argsort(values[above])[::-1]]
+    rows = df.iloc[top]
+    return count, rows if columns is None else rows[columns]
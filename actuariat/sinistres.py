@@ -0,0 +1,88 @@
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+# Simulation de ClaimAmount quand la source n'en fournit pas : pour chaque
+# contrat sinistré, ClaimNb × un coût tiré dans la loi choisie, de moyenne
+# shape × (base + per_power × VehPower), éventuellement multipliée par segment.
+# Le générateur est initialisé par une graine enregistrée avec le portefeuille :
+# une même source et une même configuration donnent toujours les mêmes données,
+# donc la même empreinte et les mêmes résultats en cache.
+DISTRIBUTIONS = ["gamma", "lognormal"]
+DEFAULT_SEED = 2024
+
+
+@dataclass(frozen=True)
+class SeverityConfig:
+    distribution: str = "gamma"
+    shape: float = 2.0
+    base: float = 250.0
+    per_power: float = 30.0
+    segment: str = None
+    multipliers: tuple = ()
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, values):
+        values = dict(values)
+        values["multipliers"] = tuple(tuple(item) for item in values.get("multipliers", ()))
+        return cls(**values)
+
+
+DEFAULT_SEVERITY = SeverityConfig()
+
+
+# « A=0.8, F=1.5 » -> (("A", 0.8), ("F", 1.5))
+def parse_multipliers(text):
+    multipliers = []
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        level, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Multiplicateur invalide : « {item} » (format attendu : modalité=valeur)")
+        multipliers.append((level.strip(), float(value)))
+    return tuple(multipliers)
+
+
+def _mean_severity(df, rows, config):
+    mean = config.shape * (config.base + config.per_power * df["VehPower"].to_numpy(dtype=float)[rows])
+    if config.segment is not None and config.multipliers:
+        if config.segment not in df.columns:
+            raise ValueError(f"Colonne de segmentation introuvable : {config.segment}")
+        factors = df[config.segment].astype(str).map(dict(config.multipliers)).to_numpy(dtype=float)[rows]
+        mean = mean * np.where(np.isnan(factors), 1.0, factors)
+    return mean
+
+
+# Montants simulés, tirés uniquement pour les contrats sinistrés
+def simulate_claim_amounts(df, config=DEFAULT_SEVERITY, seed=DEFAULT_SEED):
+    if config.distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Loi de coût inconnue : {config.distribution}")
+    claims = df["ClaimNb"].to_numpy(dtype=float)
+    rows = np.flatnonzero(claims > 0)
+    mean = _mean_severity(df, rows, config)
+    rng = np.random.default_rng(seed)
+    if config.distribution == "gamma":
+        draws = rng.gamma(config.shape, mean / config.shape)
+    else:
+        # Même moyenne et même coefficient de variation (1 / √shape) que la Gamma
+        sigma2 = np.log1p(1.0 / config.shape)
+        draws = rng.lognormal(np.log(mean) - sigma2 / 2.0, np.sqrt(sigma2))
+    amounts = np.zeros(len(df))
+    amounts[rows] = claims[rows] * draws
+    return amounts
+
+
+# Ajoute ClaimAmount si besoin ; renvoie aussi la description de la simulation
+# (graine et configuration) à conserver avec le portefeuille, None sinon.
+def enrich_with_claim_amount(df, config=DEFAULT_SEVERITY, seed=DEFAULT_SEED):
+    if "ClaimAmount" in df.columns or "ClaimNb" not in df.columns or "VehPower" not in df.columns:
+        return df, None
+    df["ClaimAmount"] = simulate_claim_amounts(df, config, seed)
+    return df, {"seed": int(seed), "severity": config.to_dict()}
+
+
+# Clé de la configuration, pour distinguer les sources enrichies différemment
+def simulation_key(config, seed):
+    return repr((sorted(config.to_dict().items()), int(seed)))
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from actuariat.portefeuille import DERIVED_COLUMNS
+
+SNAPSHOT_DIR = Path(".cache") / "snapshots"
+_METADATA_KEY = b"actuariat"
+
+
+# Identifiant stable d'une source (fichier, table, collection) : les éléments
+# sensibles comme le mot de passe ne doivent pas y figurer.
+def source_key(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+
+
+def snapshot_path(source, fingerprint):
+    return SNAPSHOT_DIR / f"{source}_{fingerprint}.parquet"
+
+
+# Snapshot le plus récent d'une source, ou None.
+def find_snapshot(source):
+    if not SNAPSHOT_DIR.exists():
+        return None
+    paths = sorted(SNAPSHOT_DIR.glob(f"{source}_*.parquet"), key=lambda p: p.stat().st_mtime)
+    return paths[-1] if paths else None
+
+
+def snapshot_metadata(path):
+    metadata = pq.read_schema(path).metadata or {}
+    return json.loads(metadata.get(_METADATA_KEY, b"{}"))
+
+
+def snapshot_columns(path):
+    return [name for name in pq.read_schema(path).names if not name.startswith("__")]
+
+
+# Les colonnes dérivées ne sont pas stockées : elles sont recalculées au
+# rechargement. L'écriture passe par un fichier temporaire pour qu'un snapshot
+# incomplet ne soit jamais lu, puis remplace les anciennes versions.
+def save_snapshot(df, source, fingerprint, **metadata):
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    columns = [col for col in df.columns if col not in DERIVED_COLUMNS]
+    table = pa.Table.from_pandas(df[columns], preserve_index=False)
+    metadata.update(source=source, fingerprint=fingerprint, created=datetime.now().isoformat(timespec="seconds"))
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _METADATA_KEY: json.dumps(metadata).encode()})
+
+    path = snapshot_path(source, fingerprint)
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+    for old in SNAPSHOT_DIR.glob(f"{source}_*.parquet"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return path
+
+
+# Lecture projetée et mappée en mémoire : seules les colonnes demandées sont
+# décodées.
+def load_snapshot(path, columns=None):
+    table = pq.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
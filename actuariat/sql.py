@@ -0,0 +1,177 @@
+import atexit
+
+from cachetools import LRUCache
+from sqlalchemy import Date, DateTime, Float, Integer, MetaData, Table, case, cast, create_engine, func, select
+from sqlalchemy.engine import URL
+
+from actuariat.cache import get_or_compute, lru_cache
+from actuariat.cube import AGE_BAND_WIDTH, DIMENSIONS
+from actuariat.ingestion import DEFAULT_CHUNKSIZE, read_sql_chunked
+
+# Accès aux bases SQL. Un moteur SQLAlchemy (et son pool de connexions) est
+# conservé par profil de connexion au lieu d'être recréé à chaque clic ; les
+# requêtes sont construites avec SQLAlchemy Core sur la table réfléchie :
+# projection des colonnes, filtres Region / Area / fenêtre de dates en
+# paramètres liés, et cube du tableau de bord calculé par la base (GROUP BY),
+# pour ne rapatrier que des colonnes utiles ou des cellules.
+DRIVERS = {"PostgreSQL": "postgresql", "MySQL": "mysql+pymysql", "SQLite": "sqlite"}
+POOL_SIZE = 5
+MAX_OVERFLOW = 5
+
+
+# Un moteur évincé du cache ferme ses connexions
+class _EnginePool(LRUCache):
+    def popitem(self):
+        key, engine = super().popitem()
+        engine.dispose()
+        return key, engine
+
+
+_ENGINES = _EnginePool(maxsize=8)
+_TABLES = lru_cache(maxsize=32)
+
+
+# Profil de connexion -> URL ; le mot de passe est échappé par SQLAlchemy
+def connection_url(db_type, host=None, port=None, user=None, password=None, database=None):
+    if db_type not in DRIVERS:
+        raise ValueError(f"Type de base inconnu : {db_type}")
+    if db_type == "SQLite":
+        return URL.create("sqlite", database=database)
+    return URL.create(DRIVERS[db_type], username=user or None, password=password or None, host=host,
+                      port=int(port) if port else None, database=database)
+
+
+# Moteur partagé par profil ; pre_ping écarte les connexions coupées par le serveur
+def get_engine(url):
+    def connect():
+        if url.get_backend_name() == "sqlite":
+            return create_engine(url)
+        return create_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_pre_ping=True)
+    return get_or_compute(_ENGINES, url.render_as_string(hide_password=False), connect)
+
+
+# Fermeture des pools à l'arrêt du processus (serveur Streamlit ou batch)
+@atexit.register
+def dispose_engines():
+    while _ENGINES:
+        _ENGINES.popitem()
+
+
+# Table réfléchie une fois par moteur ; « schema.table » est accepté
+def reflect_table(engine, name):
+    schema, _, table = name.rpartition(".")
+    key = (engine.url.render_as_string(hide_password=False), name)
+    return get_or_compute(_TABLES, key, lambda: Table(table, MetaData(), schema=schema or None,
+                                                      autoload_with=engine))
+
+
+def _column(table, name):
+    if name not in table.c:
+        raise ValueError(f"Colonne introuvable dans la table {table.name} : {name}")
+    return table.c[name]
+
+
+# Colonnes de type date, proposées pour la fenêtre de dates
+def date_columns(table):
+    return [col.name for col in table.columns if isinstance(col.type, (Date, DateTime))]
+
+
+# Conditions WHERE : les valeurs sont transmises en paramètres liés
+def _conditions(table, regions=None, areas=None, date_column=None, date_range=None):
+    conditions = []
+    if regions:
+        conditions.append(_column(table, "Region").in_(list(regions)))
+    if areas:
+        conditions.append(_column(table, "Area").in_(list(areas)))
+    if date_column and date_range:
+        start, end = date_range
+        conditions.append(_column(table, date_column).between(start, end))
+    return conditions
+
+
+def select_query(table, columns=None, **filters):
+    selected = [_column(table, name) for name in columns] if columns else [table]
+    return select(*selected).where(*_conditions(table, **filters))
+
+
+def count_rows(engine, table, **filters):
+    query = select(func.count()).select_from(table).where(*_conditions(table, **filters))
+    with engine.connect() as connection:
+        return connection.execute(query).scalar_one()
+
+
+# Modalités distinctes d'une colonne (choix des filtres)
+def distinct_values(engine, table, column):
+    query = select(_column(table, column)).distinct().order_by(_column(table, column))
+    with engine.connect() as connection:
+        return [value for value in connection.execute(query).scalars() if value is not None]
+
+
+# Lecture par blocs des seules colonnes et lignes demandées
+def read_table(engine, table, columns=None, chunksize=DEFAULT_CHUNKSIZE, progress=None, **filters):
+    total_rows = count_rows(engine, table, **filters) if progress is not None else None
+    with engine.connect() as connection:
+        return read_sql_chunked(select_query(table, columns, **filters), connection, chunksize=chunksize,
+                                progress=progress, total_rows=total_rows)
+
+
+# Colonne convertie en flottant pour les divisions (pas de division entière).
+# MySQL divise déjà en décimal et ne sait pas convertir en FLOAT.
+def _numeric(table, name, dialect):
+    column = _column(table, name)
+    return column if dialect == "mysql" else column.cast(Float)
+
+
+# Sommes par cellule calculées par la base. Les divisions ne sont faites que
+# quand elles sont définies : Frequence et Sinistralite_pure pour Exposure > 0,
+# Cout_moyen pour ClaimNb > 0, comme les colonnes dérivées du portefeuille.
+def _cell_aggregates(table, dialect):
+    def numeric(name):
+        return _numeric(table, name, dialect)
+
+    claims, exposure, amount = numeric("ClaimNb"), numeric("Exposure"), numeric("ClaimAmount")
+    frequency = case((exposure > 0, claims / exposure))
+    cost = case((claims > 0, amount / claims))
+    pure = case((exposure > 0, amount / exposure))
+    return [
+        func.count().label("Contrats"),
+        func.sum(claims).label("ClaimNb"),
+        func.sum(exposure).label("Exposure"),
+        func.sum(amount).label("ClaimAmount"),
+        func.sum(frequency).label("Frequence_somme"),
+        func.count(frequency).label("Frequence_n"),
+        func.sum(cost).label("Cout_moyen_somme"),
+        func.count(cost).label("Cout_moyen_n"),
+        func.sum(pure).label("Sinistralite_pure_somme"),
+        func.count(pure).label("Sinistralite_pure_n"),
+    ]
+
+
+# Les pilotes peuvent renvoyer des Decimal : les agrégats sont ramenés en
+# float64 (sommes) et int64 (effectifs).
+def _read_grouped(engine, table, keys, **filters):
+    aggregates = _cell_aggregates(table, engine.dialect.name)
+    query = select(*keys, *aggregates).where(*_conditions(table, **filters)).group_by(*keys)
+    with engine.connect() as connection:
+        cells = read_sql_chunked(query, connection)
+    for column in aggregates:
+        counts = column.name == "Contrats" or column.name.endswith("_n")
+        cells[column.name] = cells[column.name].fillna(0).astype("int64" if counts else "float64")
+    return cells
+
+
+# Tranche d'âge FLOOR(DrivAge / 5) * 5, valable pour un DrivAge entier ou réel
+# (PostgreSQL n'a pas de % sur les réels)
+def _age_band(table, dialect):
+    drivage = _numeric(table, "DrivAge", dialect)
+    return cast(func.floor(drivage / AGE_BAND_WIDTH) * AGE_BAND_WIDTH, Integer).label("DrivAgeBand")
+
+
+# Cube du tableau de bord calculé par la base, même format que
+# actuariat.cube.build_cube.
+def read_cube(engine, table, **filters):
+    keys = [_column(table, name) for name in DIMENSIONS if name != "DrivAgeBand"]
+    keys.append(_age_band(table, engine.dialect.name))
+    cube = _read_grouped(engine, table, keys, **filters)
+    cube["DrivAgeBand"] = cube["DrivAgeBand"].astype(float)
+    return cube[DIMENSIONS + [col for col in cube.columns if col not in DIMENSIONS]]
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+from actuariat.cache import get_or_compute, lru_cache
+from actuariat.modele import design_matrix
+
+PRICE_COLUMNS = ["Fréquence estimée", "Coût moyen estimé", "Prime pure"]
+BATCH_CHUNKSIZE = 500_000
+# Au-delà, la grille (produit des domaines) n'est pas construite et les
+# profils sont tarifés directement par les modèles.
+MAX_GRID_CELLS = 1_000_000
+
+
+def _missing_features(profiles, model_freq, model_cout):
+    features = dict.fromkeys(model_freq.features + model_cout.features)
+    return [col for col in features if col not in profiles.columns]
+
+
+def _price_chunk(chunk, model_freq, model_cout, exposure):
+    # Plan d'expérience commun : un seul produit matriciel pour les deux modèles
+    if model_freq.layout == model_cout.layout:
+        X = design_matrix(chunk, model_freq.layout)
+        eta = X @ np.column_stack([model_freq.params, model_cout.params])
+        eta_freq, eta_cout = eta[:, 0], eta[:, 1]
+    else:
+        eta_freq = design_matrix(chunk, model_freq.layout) @ model_freq.params
+        eta_cout = design_matrix(chunk, model_cout.layout) @ model_cout.params
+    freq = np.exp(eta_freq + np.log(exposure))
+    cout = np.exp(eta_cout)
+    return np.column_stack([freq, cout, freq * cout])
+
+
+# Tarification vectorisée d'un lot de profils (une ligne par profil). La
+# colonne Exposure est facultative (1 an par défaut). Les lots volumineux sont
+# traités par blocs pour borner la taille des matrices intermédiaires.
+def price_batch(profiles, model_freq, model_cout, chunksize=BATCH_CHUNKSIZE):
+    missing = _missing_features(profiles, model_freq, model_cout)
+    if missing:
+        raise ValueError(f"Colonnes manquantes dans les profils : {', '.join(missing)}")
+
+    if "Exposure" in profiles.columns:
+        exposure = profiles["Exposure"].to_numpy(dtype=float)
+    else:
+        exposure = np.ones(len(profiles))
+
+    prices = np.empty((len(profiles), len(PRICE_COLUMNS)))
+    for start in range(0, len(profiles), chunksize):
+        stop = start + chunksize
+        prices[start:stop] = _price_chunk(profiles.iloc[start:stop], model_freq, model_cout, exposure[start:stop])
+    return pd.DataFrame(prices, columns=PRICE_COLUMNS, index=profiles.index)
+
+
+def price_quotes(quotes, model_freq, model_cout, grid=None):
+    if grid is None:
+        prices = price_batch(quotes, model_freq, model_cout)
+    else:
+        prices = lookup_prices(grid, quotes, model_freq, model_cout)
+    return pd.concat([quotes, prices], axis=1)
+
+
+# Domaine discret de chaque facteur : modalités du modèle pour les variables
+# catégorielles, valeurs entières entre le min et le max observés sinon.
+def tariff_domains(df, *models):
+    domains = {}
+    for model in models:
+        for col, levels in model.layout:
+            if col in domains:
+                continue
+            if levels is not None:
+                domains[col] = list(levels)
+            else:
+                domains[col] = list(range(int(df[col].min()), int(df[col].max()) + 1))
+    return domains
+
+
+def _build_tariff_grid(model_freq, model_cout, domains):
+    index = pd.MultiIndex.from_product(list(domains.values()), names=list(domains.keys()))
+    grid = price_batch(index.to_frame(index=False), model_freq, model_cout)
+    grid.index = index
+    # Relativités par rapport à la première cellule (modalités de référence)
+    base = grid.iloc[0]
+    grid["Relativité fréquence"] = grid["Fréquence estimée"] / base["Fréquence estimée"]
+    grid["Relativité coût"] = grid["Coût moyen estimé"] / base["Coût moyen estimé"]
+    grid["Relativité prime"] = grid["Prime pure"] / base["Prime pure"]
+    return grid
+
+
+_GRILLES = lru_cache(maxsize=16)
+
+
+def grid_size(domains):
+    return int(np.prod([len(values) for values in domains.values()], dtype=float))
+
+
+# Grille tarifaire complète (une ligne par cellule, pour 1 an d'exposition),
+# calculée une fois par couple de modèles et par domaine ; None si elle
+# dépasse max_cells cellules.
+def build_tariff_grid(model_freq, model_cout, domains, max_cells=MAX_GRID_CELLS):
+    if grid_size(domains) > max_cells:
+        return None
+    key = (model_freq.cache_key, model_cout.cache_key,
+           tuple((col, tuple(values)) for col, values in domains.items()))
+    return get_or_compute(_GRILLES, key, lambda: _build_tariff_grid(model_freq, model_cout, domains))
+
+
+# Tarification par lecture directe de la grille puis mise à l'échelle de
+# l'exposition : la grille étant un produit cartésien, la ligne d'un profil se
+# déduit des positions de ses modalités dans chaque domaine. Les profils hors
+# grille sont tarifés par les modèles s'ils sont fournis, et restent NaN sinon.
+# Sans grille (domaine trop vaste), tous les profils sont tarifés par les modèles.
+def lookup_prices(grid, profiles, model_freq=None, model_cout=None):
+    if grid is None:
+        return price_batch(profiles, model_freq, model_cout)
+    missing = [col for col in grid.index.names if col not in profiles.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes dans les profils : {', '.join(missing)}")
+    codes = []
+    for i, col in enumerate(grid.index.names):
+        domain = grid.index.get_level_values(i).unique()
+        codes.append(pd.Categorical(profiles[col], categories=domain).codes)
+    codes = np.array(codes)
+    dims = [len(grid.index.get_level_values(i).unique()) for i in range(grid.index.nlevels)]
+    off_grid = (codes < 0).any(axis=0)
+    positions = np.ravel_multi_index(np.where(off_grid, 0, codes), dims)
+
+    prices = grid[PRICE_COLUMNS].to_numpy()[positions]
+    prices[off_grid] = np.nan
+    if "Exposure" in profiles.columns:
+        exposure = profiles["Exposure"].to_numpy(dtype=float)
+        prices[:, 0] *= exposure
+        prices[:, 2] *= exposure
+    result = pd.DataFrame(prices, columns=PRICE_COLUMNS, index=profiles.index)
+
+    if off_grid.any() and model_freq is not None and model_cout is not None:
+        result.loc[off_grid] = price_batch(profiles[off_grid], model_freq, model_cout).to_numpy()
+    return result
+
+
+# Comparaison de deux versions de la grille sur leurs cellules communes.
+def diff_tariff_grids(old, new, column="Prime pure"):
+    diff = pd.concat([old[column].rename("Ancienne"), new[column].rename("Nouvelle")], axis=1, join="inner")
+    diff["Écart (%)"] = 100 * (diff["Nouvelle"] / diff["Ancienne"] - 1)
+    return diff.sort_values("Écart (%)", key=np.abs, ascending=False)
+
+
+def read_tariff_grid(source, index_columns):
+    return pd.read_csv(source).set_index(list(index_columns))
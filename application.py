@@ -43,6 +43,7 @@ def show_homepage():
     - 🧠 **Benchmark modèles** : Comparaison GLM vs Random Forest.
     - 🎯 **Analyse sinistralité** : Par segment, heatmaps, détection risques.
     - 💼 **Optimisation portefeuille** : Rentabilité, stratégie tarifaire.
+    - 🎲 **Simulation Monte Carlo** : Charge sinistre annuelle, VaR / TVaR.
     - 🔖 **Export PDF** : Rapport automatisé prêt à partager.
     """, unsafe_allow_html=True)
 
@@ -71,10 +72,8 @@ def main():
 
 
 if __name__ == "__main__":
-    if 'dataframe' not in st.session_state:
-        st.session_state['dataframe'] = None
-    if 'original_dataframe' not in st.session_state:
-        st.session_state['original_dataframe'] = None
     if 'final_dataframe' not in st.session_state:
         st.session_state['final_dataframe'] = None
+    if 'portefeuille' not in st.session_state:
+        st.session_state['portefeuille'] = None
     main()
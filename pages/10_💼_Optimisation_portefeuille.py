@@ -1,55 +1,120 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
 
+from actuariat.glm import fit_frequency, fit_severity
+from actuariat.optimisation import max_elasticity, optimize_adjustments, rating_cells
+from actuariat.rendu import POINT_BUDGET, RENDER_MODES, scatter_figure
+from actuariat.segmentation import ACTIONS, TIERS, benchmark_segmentation, commercial_premium, segment_portfolio
+from actuariat.tarification import MAX_GRID_CELLS, build_tariff_grid, grid_size, lookup_prices, tariff_domains
+
 st.set_page_config(layout="wide")
 st.title("💼 Optimisation du Portefeuille Assurance Auto")
 
-if 'final_dataframe' not in st.session_state or st.session_state['final_dataframe'] is None:
+if st.session_state.get('portefeuille') is None:
     st.warning("Veuillez charger les données d'abord.")
     st.stop()
 
+# --- Paramètres de segmentation ---
+portefeuille = st.session_state['portefeuille']
+st.sidebar.header("⚙️ Segmentation")
+n_tiers = st.sidebar.radio("Nombre de niveaux", sorted(TIERS), horizontal=True)
+default_thresholds, labels = TIERS[n_tiers]
+thresholds = [st.sidebar.number_input(f"Seuil {labels[i]} / {labels[i + 1]} (€)", value=threshold, step=50.0)
+              for i, threshold in enumerate(default_thresholds)]
+premium_columns = [col for col in portefeuille.data.columns
+                   if "prime" in col.lower() or "premium" in col.lower()]
+premium_source = st.sidebar.selectbox("Prime commerciale", ["Simulée (graine fixe)"] + premium_columns)
+seed = st.sidebar.number_input("Graine de simulation", min_value=0, value=42, step=1)
+premium_column = None if premium_source == "Simulée (graine fixe)" else premium_source
+
 # --- Données et calculs ---
-df = st.session_state['final_dataframe'].copy()
-df = df[df["Exposure"] > 0].copy()
-df["Frequence"] = df["ClaimNb"] / df["Exposure"]
-df["Cout_moyen"] = df["ClaimAmount"] / df["ClaimNb"].replace(0, np.nan)
-df["Sinistralite_pure"] = df["ClaimAmount"] / df["Exposure"]
-df = df.dropna(subset=["Cout_moyen"])
-
-# Ajout d'une prime commerciale simulée (aléatoire pour exemple)
-df["Prime_commerciale"] = df["Sinistralite_pure"] * np.random.uniform(0.8, 1.4, size=len(df))
-df["Rentabilite"] = df["Prime_commerciale"] - df["Sinistralite_pure"]
-
-def get_tag(row):
-    if row["Rentabilite"] > 100:
-        return "Rentable"
-    elif row["Rentabilite"] < -100:
-        return "Risque"
-    else:
-        return "Neutre"
-
-df["Segment"] = df.apply(get_tag, axis=1)
+# Seules les colonnes utiles sont extraites du portefeuille partagé.
+columns = ["Region", "VehBrand", "VehPower", "Sinistralite_pure"] + ([premium_column] if premium_column else [])
+try:
+    df = segment_portfolio(portefeuille.claimants[columns], thresholds, labels, premium_column, int(seed))
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
 
 # --- KPIs ---
 st.subheader("📊 Répartition des contrats par rentabilité")
 st.dataframe(df[["Prime_commerciale", "Sinistralite_pure", "Rentabilite", "Segment"]].head(10))
-st.plotly_chart(px.pie(df, names="Segment", title="Part des contrats par niveau de rentabilité"), use_container_width=True)
+segment_counts = df["Segment"].value_counts(sort=False).rename_axis("Segment").reset_index(name="Contrats")
+st.plotly_chart(px.pie(segment_counts, names="Segment", values="Contrats", title="Part des contrats par niveau de rentabilité"), use_container_width=True)
 
 # --- Recommandations d'action ---
 st.subheader("📌 Recommandations d'action")
-action_map = {
-    "Rentable": "✅ Maintenir / Fidéliser",
-    "Neutre": "🔍 Surveiller",
-    "Risque": "⚠️ Revoir tarification / conditions"
-}
-df_action = df.groupby("Segment")["Rentabilite"].agg(["count", "mean"]).reset_index()
-df_action["Recommandation"] = df_action["Segment"].map(action_map)
+df_action = df.groupby("Segment", observed=False)["Rentabilite"].agg(["count", "mean"]).reset_index()
+df_action["Recommandation"] = df_action["Segment"].astype(str).map(ACTIONS)
 st.dataframe(df_action.rename(columns={"count": "Nb contrats", "mean": "Rentabilité moyenne"}))
 
+with st.expander("⏱️ Segmentation vectorisée vs apply ligne à ligne"):
+    if st.button("Mesurer"):
+        st.write(benchmark_segmentation(df))
+
 # --- Visualisation ---
 st.subheader("📈 Visualisation: Prime Commerciale vs Sinistralité Pure")
-fig = px.scatter(df, x="Sinistralite_pure", y="Prime_commerciale", color="Segment", hover_data=["Region", "VehBrand", "VehPower"])
+point_budget = st.sidebar.number_input("Nombre maximal de points tracés", min_value=1_000, value=POINT_BUDGET, step=5_000)
+render_mode = st.sidebar.radio("Au-delà du budget", RENDER_MODES)
+fig, rendered = scatter_figure(df, "Sinistralite_pure", "Prime_commerciale", color="Segment", mode=render_mode,
+                               budget=int(point_budget), keep_top="Sinistralite_pure",
+                               hover_data=["Region", "VehBrand", "VehPower"])
 fig.add_shape(type="line", x0=0, y0=0, x1=df["Sinistralite_pure"].max(), y1=df["Sinistralite_pure"].max(), line=dict(color="gray", dash="dash"))
 st.plotly_chart(fig, use_container_width=True)
+st.caption(f"{rendered:,} points ou cases tracés pour {len(df):,} contrats.")
+
+# --- Optimisation des ajustements tarifaires ---
+st.subheader("🎯 Optimisation des ajustements tarifaires par cellule")
+st.caption("Ajustements minimisant les variations de prime (pondérées par la prime actuelle) sous contrainte "
+           "de S/P cible, de variation maximale et d'élasticité de la rétention. Le calcul porte sur les "
+           "cellules tarifaires des GLM, pas sur les contrats.")
+col1, col2, col3 = st.columns(3)
+target_loss_ratio = col1.slider("S/P cible", 0.3, 1.2, 0.7, 0.01)
+max_change = col2.slider("Variation maximale par cellule (%)", 1, 50, 15) / 100
+# Élasticité bornée pour que la rétention reste positive à la hausse maximale
+elasticity = col3.slider("Élasticité de la rétention", 0.0, float(max_elasticity(max_change)), 0.5, 0.1)
+
+exposed = portefeuille.exposed
+try:
+    model_freq = fit_frequency(portefeuille.data, portefeuille.fingerprint, **st.session_state.get("options_glm", {}))
+    model_cout = fit_severity(portefeuille.data, portefeuille.fingerprint, **st.session_state.get("options_glm", {}))
+except ValueError as e:
+    st.error(f"❌ {e}")
+    st.stop()
+
+# Prime actuelle par contrat : colonne réelle, ou prime pure GLM × facteur simulé
+if premium_column:
+    current_premium = exposed[premium_column].to_numpy(dtype=float)
+else:
+    domains = tariff_domains(portefeuille.data, model_freq, model_cout)
+    grid = build_tariff_grid(model_freq, model_cout, domains)
+    if grid is None:
+        st.warning(f"Grille tarifaire de {grid_size(domains):,} cellules (plafond {MAX_GRID_CELLS:,}) : "
+                   "primes calculées directement par les modèles.")
+    pure_premium = lookup_prices(grid, exposed, model_freq, model_cout)["Prime pure"]
+    current_premium = commercial_premium(pure_premium.to_frame(), seed=int(seed), base="Prime pure").to_numpy()
+cells = rating_cells(exposed, current_premium, model_freq, model_cout, (premium_source, int(seed)))
+
+try:
+    proposal, kpis = optimize_adjustments(cells, target_loss_ratio, max_change, elasticity)
+except ValueError as e:
+    st.error(f"❌ {e}")
+    st.stop()
+if kpis["Convergence"]:
+    st.success(f"{kpis['Message']} ({kpis['Cellules']} cellules, {kpis['Durée (s)'] * 1000:.1f} ms)")
+else:
+    st.warning(kpis["Message"])
+
+k1, k2, k3, k4 = st.columns(4)
+k1.metric("S/P projeté", f"{kpis['S/P projeté']:.3f}", f"{kpis['S/P projeté'] - kpis['S/P actuel']:+.3f}", delta_color="inverse")
+k2.metric("Prime projetée", f"{kpis['Prime projetée']:,.0f} €", f"{kpis['Prime projetée'] - kpis['Prime actuelle']:+,.0f} €")
+k3.metric("Rétention (exposition)", f"{kpis['Rétention (exposition)']:.1%}")
+k4.metric("Ajustement moyen", f"{kpis['Ajustement moyen (%)']:+.2f} %")
+
+st.dataframe(proposal.sort_values("Ajustement (%)", ascending=False).style.format(
+    {"Exposition": "{:,.1f}", "Prime actuelle": "{:,.0f}", "Charge attendue": "{:,.0f}", "Ajustement (%)": "{:+.2f}",
+     "Prime projetée": "{:,.0f}", "Rétention": "{:.1%}", "S/P actuel": "{:.3f}", "S/P projeté": "{:.3f}"}))
+st.plotly_chart(px.histogram(proposal, x="Ajustement (%)", y="Prime actuelle", nbins=30,
+                             title="Répartition des ajustements (pondérée par la prime actuelle)"),
+                use_container_width=True)
@@ -0,0 +1,79 @@
+import streamlit as st
+import plotly.express as px
+
+from actuariat.benchmark import n_jobs_choices, n_jobs_label
+from actuariat.glm import fit_frequency, fit_severity
+from actuariat.simulation import MODES, quantile_table, risk_measures, run_simulation, segment_contributions
+
+st.set_page_config(layout="wide")
+st.title("🎲 Simulation Monte Carlo de la Charge Sinistre")
+
+if st.session_state.get('portefeuille') is None:
+    st.warning("Veuillez charger les données d'abord.")
+    st.stop()
+
+portefeuille = st.session_state['portefeuille']
+
+# --- GLM modèles pré-entraînés (partagés avec les autres pages) ---
+try:
+    model_freq = fit_frequency(portefeuille.data, portefeuille.fingerprint, **st.session_state.get("options_glm", {}))
+    model_cout = fit_severity(portefeuille.data, portefeuille.fingerprint, **st.session_state.get("options_glm", {}))
+except ValueError as e:
+    st.error(f"❌ {e}")
+    st.stop()
+
+# --- Configuration ---
+st.sidebar.header("⚙️ Simulation")
+mode = st.sidebar.radio("Niveau de simulation", MODES,
+                        format_func={"cellules": "Cellules tarifaires (exact, rapide)",
+                                     "contrats": "Contrat par contrat"}.get)
+n_scenarios = st.sidebar.select_slider("Nombre de scénarios", [1_000, 5_000, 10_000, 50_000, 100_000], value=10_000)
+segments = [col for col in ["Area", "Region", "VehBrand", "VehGas", "VehPower"] if col in portefeuille.data.columns]
+segment = st.sidebar.selectbox("Segmentation des contributions", segments)
+seed = st.sidebar.number_input("Graine", min_value=0, value=42, step=1)
+n_jobs = st.sidebar.selectbox("Processus parallèles (n_jobs)", n_jobs_choices(), index=1, format_func=n_jobs_label)
+st.caption(f"Fréquence : Poisson, coût : Gamma de paramètre de forme {1 / model_cout.scale:.3f} "
+           f"(1 / dispersion de Pearson du GLM coût, au niveau contrat). {len(portefeuille.exposed):,} contrats exposés.")
+
+if st.button("🎲 Lancer la simulation"):
+    st.session_state['simulation_config'] = (portefeuille.fingerprint, mode, n_scenarios, segment, int(seed))
+
+# Les résultats sont en cache : revenir sur la page réaffiche la dernière simulation sans recalcul
+config = st.session_state.get('simulation_config')
+if config is None or config[0] != portefeuille.fingerprint:
+    st.info("Choisissez les paramètres puis lancez la simulation.")
+    st.stop()
+
+_, mode, n_scenarios, segment, seed = config
+with st.spinner(f"Simulation de {n_scenarios:,} scénarios..."):
+    try:
+        result = run_simulation(portefeuille.exposed, model_freq, model_cout, n_scenarios, mode, segment,
+                                n_jobs=int(n_jobs), seed=seed)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        st.stop()
+
+# --- Résultats ---
+k1, k2, k3, k4 = st.columns(4)
+k1.metric("Charge attendue (GLM)", f"{result.expected:,.0f} €")
+k2.metric("Charge moyenne simulée", f"{result.totals.mean():,.0f} €")
+k3.metric("Écart-type", f"{result.totals.std():,.0f} €")
+k4.metric("Durée", f"{result.duration:.2f} s")
+
+st.subheader("📈 Distribution de la charge sinistre annuelle")
+st.plotly_chart(px.histogram(x=result.totals, nbins=100, labels={"x": "Charge totale (€)"}), use_container_width=True)
+
+col1, col2 = st.columns(2)
+with col1:
+    st.markdown("**Quantiles**")
+    st.dataframe(quantile_table(result.totals).style.format({"Charge": "{:,.0f}"}))
+with col2:
+    st.markdown("**Mesures de risque**")
+    st.dataframe(risk_measures(result.totals).style.format({"VaR": "{:,.0f}", "TVaR": "{:,.0f}"}))
+
+st.subheader(f"🧩 Contributions par {segment}")
+level = st.select_slider("Niveau de la TVaR", [0.9, 0.95, 0.99, 0.995], value=0.99, format_func="{:.1%}".format)
+contributions = segment_contributions(result, level)
+st.dataframe(contributions.style.format({col: "{:,.1f}" for col in contributions.columns[1:]}))
+st.plotly_chart(px.bar(contributions, x=segment, y=["Part de la charge (%)", "Part de la TVaR (%)"], barmode="group"),
+                use_container_width=True)
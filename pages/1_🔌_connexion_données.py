@@ -1,144 +1,311 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-from sqlalchemy import create_engine, text
-from pymongo import MongoClient
 import pymysql  # Nécessaire pour MySQL
-import io
+import hashlib
+
+from actuariat import mongo
+from actuariat.cube import DIMENSIONS, register_cube
+from actuariat.ingestion import DEFAULT_CHUNKSIZE, read_csv_chunked, read_excel_compact
+from actuariat.portefeuille import build_portfolio
+from actuariat.schema import apply_schema, missing_values
+from actuariat.sinistres import (DEFAULT_SEED, DEFAULT_SEVERITY, DISTRIBUTIONS, SeverityConfig,
+                                 enrich_with_claim_amount, parse_multipliers, simulation_key)
+from actuariat.sql import (DRIVERS, connection_url, date_columns, distinct_values, get_engine, read_cube,
+                           read_table, reflect_table)
+from actuariat.snapshots import (find_snapshot, load_snapshot, save_snapshot, snapshot_columns,
+                                 snapshot_metadata, source_key)
+
+PREVIEW_ROWS = 1000
 
 
 def show_homepage():
     st.image("images/actuariat.jpg", width=150)
     st.image("images/assurance.jpg", use_column_width=True)
 
-def enrich_with_claim_amount(df):
-    if "ClaimAmount" not in df.columns and "ClaimNb" in df.columns and "VehPower" in df.columns:
-        vehicule_scale = df["VehPower"].map(lambda x: 250 + 30 * x)
-        df["ClaimAmount"] = df["ClaimNb"] * np.random.gamma(shape=2.0, scale=vehicule_scale)
-        st.success("✅ Colonne simulée 'ClaimAmount' ajoutée.")
-    return df
+# Paramètres de simulation de ClaimAmount (utilisés seulement si la source
+# n'a pas de colonne ClaimAmount).
+def severity_settings():
+    with st.expander("🎲 Simulation de ClaimAmount (si absente de la source)"):
+        col1, col2, col3 = st.columns(3)
+        seed = col1.number_input("Graine", min_value=0, value=DEFAULT_SEED, step=1)
+        distribution = col2.selectbox("Loi du coût", DISTRIBUTIONS)
+        shape = col3.number_input("Paramètre de forme", min_value=0.1, value=DEFAULT_SEVERITY.shape, step=0.5)
+        col1, col2, col3 = st.columns(3)
+        base = col1.number_input("Échelle de base (€)", min_value=0.0, value=DEFAULT_SEVERITY.base, step=10.0)
+        per_power = col2.number_input("Échelle par point de VehPower (€)", value=DEFAULT_SEVERITY.per_power, step=5.0)
+        segment = col3.selectbox("Segment", [None, "Area", "Region", "VehBrand", "VehGas"],
+                                 format_func=lambda value: "Aucun" if value is None else value)
+        multipliers = ()
+        if segment is not None:
+            text = st.text_input("Multiplicateurs par modalité (ex. A=0.8, F=1.5)", key="severity_multipliers")
+            try:
+                multipliers = parse_multipliers(text)
+            except ValueError as e:
+                st.error(str(e))
+    config = SeverityConfig(distribution=distribution, shape=float(shape), base=float(base),
+                            per_power=float(per_power), segment=segment, multipliers=multipliers)
+    st.session_state['simulation_sinistres'] = (config, int(seed))
+    return config, int(seed)
+
+
+# Enrichissement, empreinte et colonnes actuarielles calculés une seule fois au
+# chargement, après conversion au schéma compact ; les pages consomment ensuite
+# l'unique copie du portefeuille sans la recopier. Un snapshot Parquet de la source est écrit pour les sessions
+# suivantes, avec la graine de simulation éventuelle.
+def store_portfolio(df, source=None, fp=None, snapshot=True, columns=None, simulation=None):
+    if simulation is None:
+        config, seed = st.session_state.get('simulation_sinistres', (DEFAULT_SEVERITY, DEFAULT_SEED))
+        df, simulation = enrich_with_claim_amount(df, config, seed)
+        if simulation is not None:
+            st.success(f"✅ Colonne simulée 'ClaimAmount' ajoutée (graine {seed}).")
+    df = apply_schema(df)
+    missing = missing_values(df)
+    if missing:
+        st.warning("Valeurs manquantes conservées : "
+                   + ", ".join(f"{col} ({count:,})" for col, count in missing.items())
+                   + ". Les modèles utilisant ces colonnes les refuseront.")
+    portefeuille = build_portfolio(df, fp, simulation)
+    st.session_state['portefeuille'] = portefeuille
+    st.session_state['source'] = (source, columns)
+    st.session_state['final_dataframe'] = portefeuille.data
+    if source is not None and snapshot:
+        save_snapshot(df, source, portefeuille.fingerprint, **({"simulation": simulation} if simulation else {}))
+    return portefeuille.data
+
+
+# Propose le dernier snapshot local de la source et les colonnes à en lire.
+def snapshot_picker(source, key):
+    path = find_snapshot(source)
+    if path is None:
+        return None, None
+    metadata = snapshot_metadata(path)
+    created = metadata.get("created", "?")
+    if "simulation" in metadata:
+        created += f" (ClaimAmount simulé, graine {metadata['simulation']['seed']})"
+    if not st.checkbox(f"⚡ Recharger le snapshot local du {created}", value=True, key=f"snap_{key}"):
+        return None, None
+    all_columns = snapshot_columns(path)
+    columns = st.multiselect("🧩 Colonnes à charger", all_columns, default=all_columns, key=f"snap_cols_{key}")
+    return path, tuple(columns)
+
+
+# Sans projection, l'empreinte enregistrée dans le snapshot est réutilisée.
+def load_portfolio_snapshot(path, columns, source):
+    complete = set(columns) == set(snapshot_columns(path))
+    df = load_snapshot(path, list(columns))
+    metadata = snapshot_metadata(path)
+    fp = metadata["fingerprint"] if complete else None
+    return store_portfolio(df, source, fp=fp, snapshot=False, columns=None if complete else columns,
+                           simulation=metadata.get("simulation"))
+
+
+def progress_reporter(label):
+    bar = st.progress(0.0, text=label)
+
+    def report(rows, fraction):
+        bar.progress(min(fraction or 0.0, 1.0), text=f"{label} : {rows:,} lignes lues")
+    return report
+
+
+# Empreinte du fichier téléversé, calculée une fois par téléversement (file_id
+# change à chaque nouveau fichier) et sans copie du contenu.
+def upload_digest(uploaded_file):
+    cached = st.session_state.get('empreinte_fichier')
+    if cached is None or cached[0] != uploaded_file.file_id:
+        with uploaded_file.getbuffer() as buffer:
+            cached = (uploaded_file.file_id, hashlib.sha1(buffer).hexdigest())
+        st.session_state['empreinte_fichier'] = cached
+    return cached[1]
+
+
+# Seul un aperçu est envoyé au navigateur.
+def show_preview(df):
+    st.caption(f"{df.shape[0]:,} lignes × {df.shape[1]} colonnes — {df.memory_usage(deep=True).sum() / 1e6:,.1f} Mo en mémoire")
+    st.dataframe(df.head(PREVIEW_ROWS))
+
+
+# Colonnes nécessaires au calcul du cube du tableau de bord par la base
+CUBE_COLUMNS = [col for col in DIMENSIONS if col != "DrivAgeBand"] + ["DrivAge", "ClaimNb", "Exposure", "ClaimAmount"]
+SQL_ICONS = {"PostgreSQL": "🟦", "MySQL": "🟨", "SQLite": "⬜"}
+SQL_PORTS = {"PostgreSQL": "5432", "MySQL": "3306"}
+
+
+# Filtres transmis à la base (clause WHERE) : seules les lignes retenues sont lues.
+def sql_filters(engine, table, key):
+    filters = {}
+    with st.expander("🔎 Filtres appliqués par la base"):
+        for column, name in [("Region", "regions"), ("Area", "areas")]:
+            if column in table.c:
+                filters[name] = tuple(st.multiselect(f"{column} (toutes si vide)", distinct_values(engine, table, column),
+                                                     key=f"{key}_{name}"))
+        dates = date_columns(table)
+        if dates:
+            date_column = st.selectbox("Fenêtre de dates sur", [None] + dates, key=f"{key}_date_col",
+                                       format_func=lambda value: "Aucune" if value is None else value)
+            window = st.date_input("Période", value=(), key=f"{key}_dates") if date_column else ()
+            if date_column and len(window) == 2:
+                filters.update(date_column=date_column, date_range=tuple(window))
+    return filters
+
+
+# Bases SQL : moteur et pool de connexions partagés par profil, projection des
+# colonnes et filtres exécutés par la base, cube du tableau de bord
+# éventuellement calculé par un GROUP BY côté base.
+def sql_source(db_type, chunksize, enrichment):
+    key = db_type.lower()
+    st.subheader(f"{SQL_ICONS[db_type]} Connexion {db_type}")
+    if db_type == "SQLite":
+        host = port = user = password = None
+        database = st.text_input("Fichier de la base", value="assurance.db", key=f"{key}_db")
+    else:
+        host = st.text_input("Hôte", value="localhost", key=f"{key}_host")
+        port = st.text_input("Port", value=SQL_PORTS[db_type], key=f"{key}_port")
+        user = st.text_input("Utilisateur", key=f"{key}_user")
+        password = st.text_input("Mot de passe", type="password", key=f"{key}_pass")
+        database = st.text_input("Nom de la base de données", key=f"{key}_db")
+    table_name = st.text_input("Nom de la table à charger", key=f"{key}_table")
+    if not table_name:
+        return
+
+    try:
+        engine = get_engine(connection_url(db_type, host, port, user, password, database))
+        table = reflect_table(engine, table_name)
+    except Exception as e:
+        st.error(f"❌ Erreur {db_type} : {e}")
+        return
+
+    all_columns = [col.name for col in table.columns]
+    columns = st.multiselect("🧩 Colonnes à charger", all_columns, default=all_columns, key=f"{key}_cols")
+    filters = sql_filters(engine, table, key)
+    pushdown = st.checkbox("📊 Calculer le cube du tableau de bord dans la base (GROUP BY)", key=f"{key}_cube",
+                           disabled=not set(CUBE_COLUMNS) <= set(columns))
+
+    projection = None if set(columns) == set(all_columns) else tuple(columns)
+    source = source_key(key, host, port, user, database, table_name, projection, sorted(filters.items()), enrichment)
+    path, snapshot_cols = snapshot_picker(source, key)
+
+    if st.button(f"Se connecter à {db_type}"):
+        try:
+            if path is not None:
+                df = load_portfolio_snapshot(path, snapshot_cols, source)
+            else:
+                df = read_table(engine, table, columns, chunksize=chunksize,
+                                progress=progress_reporter(f"Lecture {db_type}"), **filters)
+                df = store_portfolio(df, source, columns=projection)
+                if pushdown:
+                    cube = read_cube(engine, table, **filters)
+                    register_cube(st.session_state['portefeuille'].fingerprint, cube)
+                    st.caption(f"Cube calculé par la base : {len(cube):,} cellules.")
+            st.success(f"✅ Données {db_type} chargées.")
+            show_preview(df)
+        except Exception as e:
+            st.error(f"❌ Erreur {db_type} : {e}")
+
+
+# MongoDB : client partagé par profil, projection et filtres appliqués par le
+# serveur, cube du tableau de bord éventuellement calculé par un pipeline $group.
+def mongo_source(chunksize, enrichment):
+    st.subheader("🟩 Connexion MongoDB")
+    host = st.text_input("Hôte", value="localhost", key="mongo_host")
+    port = st.text_input("Port", value="27017", key="mongo_port")
+    user = st.text_input("Utilisateur", key="mongo_user")
+    password = st.text_input("Mot de passe", type="password", key="mongo_pass")
+    database = st.text_input("Nom de la base", key="mongo_db")
+    collection_name = st.text_input("Nom de la collection", key="mongo_coll")
+    if not (database and collection_name):
+        return
+
+    try:
+        collection = mongo.get_client(host, port, user, password)[database][collection_name]
+        all_columns = mongo.field_names(collection)
+        columns = st.multiselect("🧩 Champs à charger", all_columns, default=all_columns, key="mongo_cols")
+        filters = {}
+        with st.expander("🔎 Filtres appliqués par le serveur"):
+            for column, name in [("Region", "regions"), ("Area", "areas")]:
+                if column in all_columns:
+                    filters[name] = tuple(st.multiselect(f"{column} (toutes si vide)",
+                                                         mongo.distinct_values(collection, column),
+                                                         key=f"mongo_{name}"))
+    except Exception as e:
+        st.error(f"❌ Erreur MongoDB : {e}")
+        return
+    pushdown = st.checkbox("📊 Calculer le cube du tableau de bord sur le serveur ($group)", key="mongo_cube",
+                           disabled=not set(CUBE_COLUMNS) <= set(columns))
+
+    projection = None if set(columns) == set(all_columns) else tuple(columns)
+    source = source_key("mongodb", host, port, user, database, collection_name, projection,
+                        sorted(filters.items()), enrichment)
+    path, snapshot_cols = snapshot_picker(source, "mongodb")
+
+    if st.button("Se connecter à MongoDB"):
+        try:
+            if path is not None:
+                df = load_portfolio_snapshot(path, snapshot_cols, source)
+            else:
+                df = mongo.read_collection(collection, columns, batch_size=chunksize,
+                                           progress=progress_reporter("Lecture MongoDB"), **filters)
+                df = store_portfolio(df, source, columns=projection)
+                if pushdown:
+                    cube = mongo.read_cube(collection, **filters)
+                    register_cube(st.session_state['portefeuille'].fingerprint, cube)
+                    st.caption(f"Cube calculé par le serveur : {len(cube):,} cellules.")
+            st.success("✅ Données MongoDB chargées.")
+            show_preview(df)
+        except Exception as e:
+            st.error(f"❌ Erreur MongoDB : {e}")
+
+
 def main():
     show_homepage()
     st.title("🔌 Connexion aux Données")
     st.write("Choisissez la source de données à analyser.")
 
     option = st.selectbox("📂 Source de Données", ["Télécharger CSV/Excel", "Se Connecter à une Base de Données"])
+    chunksize = int(st.number_input("📦 Taille des blocs de lecture (lignes)", min_value=1_000,
+                                    value=DEFAULT_CHUNKSIZE, step=10_000))
+    # La configuration de simulation fait partie de l'identité de la source
+    enrichment = simulation_key(*severity_settings())
 
     # Option 1 - Fichier CSV ou Excel
     if option == "Télécharger CSV/Excel":
         uploaded_file = st.file_uploader("📎 Choisir un fichier CSV ou Excel", type=["csv", "xlsx"])
         if uploaded_file is not None:
             try:
-                if uploaded_file.name.endswith('.csv'):
-                    df = pd.read_csv(uploaded_file)
+                source = source_key("fichier", uploaded_file.name, upload_digest(uploaded_file), enrichment)
+                path, columns = snapshot_picker(source, "fichier")
+                projection = None if path is None or set(columns) == set(snapshot_columns(path)) else columns
+                if st.session_state.get('source') == (source, projection) and st.session_state.get('portefeuille') is not None:
+                    df = st.session_state['portefeuille'].data
+                elif path is not None:
+                    df = load_portfolio_snapshot(path, columns, source)
                 else:
-                    df = pd.read_excel(uploaded_file)
-
-                st.session_state['dataframe'] = df
-                st.session_state['original_dataframe'] = df.copy()
-                st.session_state['dataframe'] = df
-                st.session_state['original_dataframe'] = df.copy()
-                df = enrich_with_claim_amount(df)
-                st.session_state['final_dataframe'] = df.copy()
+                    if uploaded_file.name.endswith('.csv'):
+                        df = read_csv_chunked(uploaded_file, chunksize=chunksize,
+                                              progress=progress_reporter("Lecture du fichier"),
+                                              total_bytes=uploaded_file.size)
+                    else:
+                        df = read_excel_compact(uploaded_file)
+
+                    df = store_portfolio(df, source)
                 st.success("✅ Fichier chargé avec succès.")
-                st.dataframe(df)
+                show_preview(df)
 
             except Exception as e:
                 st.error(f"❌ Erreur lors du chargement du fichier : {e}")
 
     # Option 2 - Connexion à base PostgreSQL
     elif option == "Se Connecter à une Base de Données":
-        db_type = st.selectbox("🔧 Type de Base de Données", ["PostgreSQL", "MySQL", "MongoDB"])
-
-        if db_type == "PostgreSQL":
-            st.subheader("🟦 Connexion PostgreSQL")
-            host = st.text_input("Hôte", value="localhost")
-            port = st.text_input("Port", value="5432")
-            user = st.text_input("Utilisateur")
-            password = st.text_input("Mot de passe", type="password")
-            database = st.text_input("Nom de la base de données")
-            table = st.text_input("Nom de la table à charger")
-
-            if st.button("Se connecter à PostgreSQL"):
-                try:
-                    url = f"postgresql://{user}:{password}@{host}:{port}/{database}"
-                    engine = create_engine(url)
-                    with engine.connect() as connection:
-                        df = pd.read_sql(f"SELECT * FROM {table}", connection)
-
-                    st.session_state['dataframe'] = df
-                    st.session_state['dataframe'] = df
-                    st.session_state['original_dataframe'] = df.copy()
-                    df = enrich_with_claim_amount(df)
-                    st.session_state['final_dataframe'] = df.copy()
-                    st.success("✅ Données PostgreSQL chargées.")
-                    st.dataframe(df)
-                except Exception as e:
-                    st.error(f"❌ Erreur PostgreSQL : {e}")
-
-        elif db_type == "MySQL":
-            st.subheader("🟨 Connexion MySQL")
-            host = st.text_input("Hôte", value="localhost", key="mysql_host")
-            port = st.text_input("Port", value="3306", key="mysql_port")
-            user = st.text_input("Utilisateur", key="mysql_user")
-            password = st.text_input("Mot de passe", type="password", key="mysql_pass")
-            database = st.text_input("Nom de la base", key="mysql_db")
-            table = st.text_input("Nom de la table", key="mysql_table")
-
-            if st.button("Se connecter à MySQL"):
-                try:
-                    url = f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}"
-                    engine = create_engine(url)
-                    with engine.connect() as conn:
-                        df = pd.read_sql(f"SELECT * FROM {table}", conn)
-
-                    st.session_state['dataframe'] = df
-                    st.session_state['dataframe'] = df
-                    st.session_state['original_dataframe'] = df.copy()
-                    df = enrich_with_claim_amount(df)
-                    st.session_state['final_dataframe'] = df.copy()
-                    st.success("✅ Données PostgreSQL chargées.")
-                    st.dataframe(df)
-                except Exception as e:
-                    st.error(f"❌ Erreur MySQL : {e}")
+        db_type = st.selectbox("🔧 Type de Base de Données", ["PostgreSQL", "MySQL", "SQLite", "MongoDB"])
+
+        if db_type in DRIVERS:
+            sql_source(db_type, chunksize, enrichment)
 
         elif db_type == "MongoDB":
-            st.subheader("🟩 Connexion MongoDB")
-            host = st.text_input("Hôte", value="localhost", key="mongo_host")
-            port = st.text_input("Port", value="27017", key="mongo_port")
-            user = st.text_input("Utilisateur", key="mongo_user")
-            password = st.text_input("Mot de passe", type="password", key="mongo_pass")
-            database = st.text_input("Nom de la base", key="mongo_db")
-            collection_name = st.text_input("Nom de la collection", key="mongo_coll")
-
-            if st.button("Se connecter à MongoDB"):
-                try:
-                    conn_str = f"mongodb://{user}:{password}@{host}:{port}/"
-                    client = MongoClient(conn_str)
-                    db = client[database]
-                    collection = db[collection_name]
-                    data = list(collection.find())
-                    df = pd.DataFrame(data)
-
-                    if '_id' in df.columns:
-                        df.drop('_id', axis=1, inplace=True)
-
-                    st.session_state['dataframe'] = df
-                    st.session_state['dataframe'] = df
-                    st.session_state['original_dataframe'] = df.copy()
-                    df = enrich_with_claim_amount(df)
-                    st.session_state['final_dataframe'] = df.copy()
-                    st.success("✅ Données PostgreSQL chargées.")
-                    st.dataframe(df)
-                except Exception as e:
-                    st.error(f"❌ Erreur MongoDB : {e}")
+            mongo_source(chunksize, enrichment)
 
 
 if __name__ == "__main__":
-    if 'dataframe' not in st.session_state:
-        st.session_state['dataframe'] = None
-    if 'original_dataframe' not in st.session_state:
-        st.session_state['original_dataframe'] = None
     if 'final_dataframe' not in st.session_state:
         st.session_state['final_dataframe'] = None
+    if 'portefeuille' not in st.session_state:
+        st.session_state['portefeuille'] = None
     main()
\ No newline at end of file
@@ -1,9 +1,8 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
 
+from actuariat.profil import cached_profile, correlation_heatmap_png
+
 def show_homepage():
     st.image("images/actuariat.jpg", width=150)
     st.image("images/assurance.jpg", use_column_width=True)
@@ -14,8 +13,9 @@ def main():
     st.title("📊 Analyse Exploratoire des Données")
     st.markdown("Explorez visuellement et statistiquement vos données d'assurance auto.")
 
-    if 'final_dataframe' in st.session_state and st.session_state['final_dataframe'] is not None:
-        df = st.session_state['final_dataframe']
+    if st.session_state.get('portefeuille') is not None:
+        portefeuille = st.session_state['portefeuille']
+        df = portefeuille.data
 
         # Filtres interactifs
         st.sidebar.header("🎛️ Filtres")
@@ -23,68 +23,72 @@ def main():
         age_range = st.sidebar.slider("Âge du conducteur", int(df['DrivAge'].min()), int(df['DrivAge'].max()),
                                       (int(df['DrivAge'].min()), int(df['DrivAge'].max())))
 
-        # Application des filtres
-        df_filtered = df[(df['Area'].isin(selected_area)) &
-                         (df['DrivAge'] >= age_range[0]) &
-                         (df['DrivAge'] <= age_range[1])]
+        # Profil calculé une fois par jeu de données et par état des filtres ;
+        # le sous-ensemble filtré n'est construit qu'en l'absence du cache.
+        def filter_data():
+            return df[(df['Area'].isin(selected_area)) &
+                      (df['DrivAge'] >= age_range[0]) &
+                      (df['DrivAge'] <= age_range[1])]
+
+        filters = (tuple(sorted(map(str, selected_area))), age_range)
+        profil = cached_profile(portefeuille.fingerprint, filters, filter_data, histograms=["DrivAge"],
+                                totals_by="Area")
 
-        st.success(f"{df_filtered.shape[0]} lignes affichées après filtrage")
+        st.success(f"{profil['lignes']} lignes affichées après filtrage")
+        if profil["approximatif"]:
+            st.caption("Volumétrie importante : quantiles et corrélations estimés sur un échantillon, "
+                       "nombres de valeurs distinctes approchés (≈).")
 
         # Statistiques descriptives
         st.header("📌 Statistiques descriptives")
-        st.dataframe(df_filtered.describe(include='all'))
+        st.dataframe(profil["numeriques"])
 
         # Types de données
         st.subheader("📁 Types de données")
-        st.write(df_filtered.dtypes)
+        st.write(profil["types"])
 
         # Valeurs manquantes
         st.subheader("🚫 Valeurs manquantes")
-        st.write(df_filtered.isnull().sum())
+        st.write(profil["manquantes"])
 
         # Valeurs uniques des colonnes catégorielles
         st.subheader("🔤 Valeurs uniques (colonnes catégorielles)")
-        categorical_columns = df_filtered.select_dtypes(include=['object']).columns
-        for col in categorical_columns:
+        for col, counts in profil["modalites"].items():
             st.markdown(f"**{col}**")
-            st.write(df_filtered[col].value_counts())
+            st.write(counts)
 
         # Visualisations
         st.header("📈 Visualisations")
 
         st.subheader("Distribution de l'âge du conducteur")
-        fig = px.histogram(df_filtered, x='DrivAge', nbins=20)
+        histogram = profil["histogrammes"]["DrivAge"]
+        fig = px.bar(histogram, x=(histogram["Borne basse"] + histogram["Borne haute"]) / 2, y="Effectif",
+                     labels={"x": "DrivAge"})
+        fig.update_layout(bargap=0)
         st.plotly_chart(fig)
 
         st.subheader("Répartition des sinistres par zone géographique")
-        fig2 = px.bar(df_filtered.groupby("Area")["ClaimNb"].sum().reset_index(), x='Area', y='ClaimNb')
+        fig2 = px.bar(profil["totaux"]["ClaimNb"].reset_index(), x='Area', y='ClaimNb')
         st.plotly_chart(fig2)
 
         st.subheader("Heatmap des corrélations")
-        numeric_df = df_filtered.select_dtypes(include='number')
-        fig3, ax = plt.subplots()
-        sns.heatmap(numeric_df.corr(), annot=True, cmap='Blues', ax=ax)
-        st.pyplot(fig3)
+        st.image(correlation_heatmap_png(profil["correlations"], (portefeuille.fingerprint, filters)))
 
         # KPIs actuariaux
         st.header("🧮 KPIs Actuariels")
 
         # Vérification des colonnes
         required_cols = ["ClaimNb", "Exposure", "ClaimAmount"]
-        missing = [col for col in required_cols if col not in df.columns]
+        missing = portefeuille.missing_columns(required_cols)
 
         if not missing:
-            df["Frequence"] = df["ClaimNb"] / df["Exposure"]
-            df["Cout_moyen"] = df["ClaimAmount"] / df["ClaimNb"].replace(0, pd.NA)
-            df["Sinistralite_pure"] = df["ClaimAmount"] / df["Exposure"]
-
             col1, col2, col3 = st.columns(3)
             col1.metric("📌 Fréquence moyenne", f"{df['Frequence'].mean():.3f}")
             col2.metric("💰 Coût moyen", f"{df['Cout_moyen'].mean():,.0f} €")
             col3.metric("🔥 Sinistralité pure", f"{df['Sinistralite_pure'].mean():,.0f} €")
 
             st.subheader("📍 Sinistralité pure par zone géographique")
-            st.bar_chart(df.groupby("Area")["Sinistralite_pure"].mean())
+            st.bar_chart(df.groupby("Area", observed=True)["Sinistralite_pure"].mean())
         else:
             st.error(f"Colonnes manquantes : {', '.join(missing)}")
 
@@ -1,65 +1,165 @@
 import streamlit as st
-import pandas as pd
-import statsmodels.api as sm
-import numpy as np
+
+from actuariat.benchmark import n_jobs_choices, n_jobs_label
+from actuariat.bootstrap import iter_bootstrap, premium_intervals, prepare_bootstrap, relativity_intervals
+from actuariat.glm import (ENGINE_LABELS, ENGINES, RATING_FACTORS, benchmark_engines, compare_aggregate_fit,
+                           fit_frequency, fit_severity)
+from actuariat.registre import delete_model, list_models
+from actuariat.tarification import (MAX_GRID_CELLS, build_tariff_grid, diff_tariff_grids, grid_size,
+                                    read_tariff_grid, tariff_domains)
 
 def main():
     st.title("📈 Modélisation Actuarielle - GLM")
 
-    df = st.session_state.get("final_dataframe", None)
-    if df is None:
+    portefeuille = st.session_state.get("portefeuille", None)
+    if portefeuille is None:
         st.warning("Aucune donnée disponible. Veuillez d'abord charger les données.")
         return
 
     required_cols = ["ClaimNb", "Exposure", "ClaimAmount", "VehPower", "Area"]
-    if not all(col in df.columns for col in required_cols):
-        st.error(f"Colonnes manquantes : {', '.join([c for c in required_cols if c not in df.columns])}")
+    if not portefeuille.has_columns(required_cols):
+        st.error(f"Colonnes manquantes : {', '.join(portefeuille.missing_columns(required_cols))}")
         return
 
-    df["Frequence"] = df["ClaimNb"] / df["Exposure"]
-    df["Cout_moyen"] = df["ClaimAmount"] / df["ClaimNb"].replace(0, np.nan)
+    df = portefeuille.data
+    fp = portefeuille.fingerprint
+
+    # Choix du moteur et du mode d'ajustement (partagés avec les simulateurs) et des facteurs tarifaires
+    options = st.session_state.get("options_glm", {"engine": "statsmodels", "aggregate": False})
+    engine = st.sidebar.selectbox("⚙️ Moteur GLM", ENGINES, index=ENGINES.index(options["engine"]),
+                                  format_func=ENGINE_LABELS.get)
+    aggregate = st.sidebar.checkbox("⚡ Ajuster sur les cellules tarifaires agrégées", value=options["aggregate"])
+    st.session_state["options_glm"] = {"engine": engine, "aggregate": aggregate}
+    candidates = [col for col in ["VehPower", "Area", "Region", "VehBrand", "VehGas", "VehAge", "DrivAge"] if col in df.columns]
+    features = st.sidebar.multiselect("🧩 Facteurs tarifaires", candidates, default=RATING_FACTORS)
+    if not features:
+        st.warning("Sélectionnez au moins un facteur tarifaire.")
+        return
 
     # ------------------------
     st.subheader("🔹 GLM Fréquence (Poisson)")
 
-    X_freq = pd.get_dummies(df[["VehPower", "Area"]], drop_first=True)
-    X_freq = sm.add_constant(X_freq).astype(float)
+    try:
+        result_freq = fit_frequency(df, fp, features, engine, aggregate)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return
+    st.text(result_freq.summary)
 
-    y_freq = df["ClaimNb"].astype(float)
-    exposure = np.log(df["Exposure"]).astype(float)
+    # ------------------------
+    st.subheader("🔹 GLM Coût Moyen (Gamma)")
 
-    if X_freq.isnull().values.any() or y_freq.isnull().values.any() or exposure.isnull().values.any():
-        st.error("❌ Des valeurs manquantes détectées dans les variables du modèle.")
+    try:
+        result_cout = fit_severity(df, fp, features, engine, aggregate)
+    except ValueError as e:
+        st.error(f"❌ {e}")
         return
-
-    model_freq = sm.GLM(y_freq, X_freq, family=sm.families.Poisson(), offset=exposure)
-    result_freq = model_freq.fit()
-    st.text(result_freq.summary())
+    st.text(result_cout.summary)
 
     # ------------------------
-    st.subheader("🔹 GLM Coût Moyen (Gamma)")
+    # Les modèles ajustés sont enregistrés sur disque : après un redémarrage,
+    # ils sont rechargés sans nouvel ajustement.
+    with st.expander("💾 Registre des modèles"):
+        registered = list_models()
+        current = registered["Empreinte"] == fp
+        st.caption(f"{len(registered)} version(s) enregistrée(s), dont {int(current.sum())} pour les données chargées.")
+        st.dataframe(registered[current] if st.checkbox("Données chargées uniquement", value=True) else registered)
+        obsolete = sorted(set(registered.loc[~current, "Identifiant"]))
+        if obsolete and st.button(f"🗑️ Supprimer les {len(obsolete)} modèle(s) d'autres jeux de données"):
+            for identifier in obsolete:
+                delete_model(identifier)
+            st.rerun()
 
-    df_non_zero = df[df["ClaimNb"] > 0].copy()
-    df_non_zero["Cout_moyen"] = df_non_zero["ClaimAmount"] / df_non_zero["ClaimNb"]
+    # ------------------------
+    st.subheader("🧾 Grille tarifaire")
+    if st.checkbox("Précalculer la grille tarifaire complète (toutes les cellules des facteurs tarifaires)"):
+        domains = tariff_domains(df, result_freq, result_cout)
+        grid = build_tariff_grid(result_freq, result_cout, domains)
+        if grid is None:
+            st.warning(f"Grille de {grid_size(domains):,} cellules, au-delà du plafond de {MAX_GRID_CELLS:,} : "
+                       "retirez des facteurs numériques (VehAge, DrivAge) pour la précalculer.")
+        else:
+            st.caption(f"{len(grid)} cellules — primes pour 1 an d'exposition, relativités par rapport à la cellule de référence.")
+            st.dataframe(grid)
+            st.download_button("📥 Exporter la grille (CSV)", data=grid.to_csv().encode("utf-8"),
+                               file_name="grille_tarifaire.csv", mime="text/csv")
+
+            previous = st.file_uploader("🔁 Comparer avec une grille exportée précédemment (CSV)", type=["csv"])
+            if previous is not None:
+                try:
+                    st.dataframe(diff_tariff_grids(read_tariff_grid(previous, grid.index.names), grid))
+                except KeyError as e:
+                    st.error(f"❌ Grille incompatible, colonne absente : {e}")
 
-    X_cout = pd.get_dummies(df_non_zero[["VehPower", "Area"]], drop_first=True)
-    X_cout = sm.add_constant(X_cout).astype(float)
-    y_cout = df_non_zero["Cout_moyen"].astype(float)
+    # ------------------------
+    with st.expander("⏱️ Benchmark des moteurs : statsmodels (dense) vs IRLS (creux)"):
+        if st.button("Lancer le benchmark"):
+            with st.spinner("Ajustement des deux moteurs..."):
+                st.dataframe(benchmark_engines(df, features))
 
-    if X_cout.isnull().values.any() or y_cout.isnull().values.any():
-        st.error("❌ Des valeurs manquantes dans les données du modèle de coût.")
-        return
+    with st.expander("🔎 Contrôle : coefficients par contrat vs par cellule agrégée"):
+        if st.button("Comparer les deux ajustements"):
+            with st.spinner("Ajustement contrat par contrat et par cellule..."):
+                comparison = compare_aggregate_fit(df, features, engine)
+            st.metric("Écart maximal entre coefficients", f"{comparison['Écart'].max():.2e}")
+            st.dataframe(comparison)
 
-    model_cout = sm.GLM(y_cout, X_cout, family=sm.families.Gamma(sm.families.links.log()))
-    result_cout = model_cout.fit()
-    st.text(result_cout.summary())
+    with st.expander("🎲 Intervalles de confiance bootstrap (relativités et primes pures par cellule)"):
+        bootstrap_intervals(df, result_freq, result_cout)
 
     # ------------------------
     st.subheader("💡 Prime Pure simulée")
-    df["Prime_pure"] = df["Frequence"] * df["Cout_moyen"]
-    st.write(df[["Area", "VehPower", "Exposure", "Frequence", "Cout_moyen", "Prime_pure"]].head(10))
+    apercu = df[["Area", "VehPower", "Exposure", "Frequence", "Cout_moyen"]].head(10)
+    st.write(apercu.assign(Prime_pure=apercu["Frequence"] * apercu["Cout_moyen"]))
     st.success("✅ Modèle GLM appliqué avec succès !")
 
 
+# Bootstrap de Poisson agrégé par cellule, réajusté en parallèle : les
+# intervalles sont mis à jour au fil des répliques terminées. Le bouton
+# « Arrêter » relance le script, ce qui interrompt la boucle et annule les
+# répliques restantes.
+def bootstrap_intervals(df, result_freq, result_cout):
+    col1, col2, col3 = st.columns(3)
+    n_replicates = col1.number_input("Nombre de répliques", min_value=20, max_value=5_000, value=200, step=50)
+    n_jobs = col2.selectbox("Processus parallèles", n_jobs_choices(), format_func=n_jobs_label)
+    level = col3.select_slider("Niveau de confiance", [0.8, 0.9, 0.95, 0.99], value=0.95)
+    key = (result_freq.cache_key, result_cout.cache_key, int(n_replicates))
+
+    start, stop = st.columns(2)
+    running = start.button("Lancer le bootstrap")
+    stop.button("⏹️ Arrêter")
+
+    data = prepare_bootstrap(df, result_freq, result_cout)
+    progress = st.empty()
+    tables = st.empty()
+
+    def show(freq_draws, cout_draws):
+        with tables.container():
+            st.markdown("**Relativités — fréquence**")
+            st.dataframe(relativity_intervals(result_freq, freq_draws, level))
+            st.markdown("**Relativités — coût moyen**")
+            st.dataframe(relativity_intervals(result_cout, cout_draws, level))
+            st.markdown("**Prime pure annuelle par cellule**")
+            st.dataframe(premium_intervals(data, result_freq, result_cout, freq_draws, cout_draws, level))
+
+    if running:
+        st.session_state.pop("bootstrap", None)
+        step = max(1, int(n_replicates) // 20)
+        shown = 0
+        freq_draws = cout_draws = None
+        for completed, freq_draws, cout_draws in iter_bootstrap(data, result_freq, result_cout, int(n_replicates),
+                                                                int(n_jobs)):
+            progress.progress(completed / n_replicates, text=f"{completed} / {n_replicates} répliques")
+            if len(freq_draws) > 1 and (completed >= shown + step or completed == n_replicates):
+                show(freq_draws, cout_draws)
+                shown = completed
+        st.session_state["bootstrap"] = (key, freq_draws, cout_draws)
+    elif st.session_state.get("bootstrap", (None,))[0] == key:
+        _, freq_draws, cout_draws = st.session_state["bootstrap"]
+        progress.caption(f"{len(freq_draws)} répliques valides.")
+        if len(freq_draws) > 1:
+            show(freq_draws, cout_draws)
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
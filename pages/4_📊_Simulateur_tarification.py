@@ -1,5 +1,4 @@
 import streamlit as st
-import statsmodels.api as sm
 import pandas as pd
 
 def main():
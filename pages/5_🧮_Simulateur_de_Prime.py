@@ -1,41 +1,25 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import statsmodels.api as sm
+
+from actuariat.glm import fit_frequency, fit_severity
+from actuariat.tarification import MAX_GRID_CELLS, build_tariff_grid, grid_size, lookup_prices, tariff_domains
 
 def main():
     st.title("🧮 Simulateur de Prime Pure")
 
-    df = st.session_state.get("final_dataframe", None)
-    if df is None:
+    portefeuille = st.session_state.get("portefeuille", None)
+    if portefeuille is None:
         st.warning("Veuillez charger les données dans l'application.")
         return
-
-    # Préparation du DataFrame pour les modèles
-    df = df.copy()
-    df["Frequence"] = df["ClaimNb"] / df["Exposure"]
-    df["Cout_moyen"] = df["ClaimAmount"] / df["ClaimNb"].replace(0, np.nan)
-    df_non_zero = df[df["ClaimNb"] > 0].copy()
-
-    # ======= Modèles GLM =======
-    st.markdown("## 🔁 Calcul des modèles en arrière-plan...")
-
-    # Modèle fréquence
-    X_freq = pd.get_dummies(df[["VehPower", "Area"]], drop_first=True)
-    X_freq = sm.add_constant(X_freq).astype(float)
-    y_freq = df["ClaimNb"]
-    exposure = np.log(df["Exposure"])
-    glm_freq = sm.GLM(y_freq, X_freq, family=sm.families.Poisson(), offset=exposure)
-    res_freq = glm_freq.fit()
-
-    # Modèle coût
-    X_cout = pd.get_dummies(df_non_zero[["VehPower", "Area"]], drop_first=True)
-    X_cout = sm.add_constant(X_cout).astype(float)
-    y_cout = df_non_zero["Cout_moyen"]
-    glm_cout = sm.GLM(y_cout, X_cout, family=sm.families.Gamma(sm.families.links.log()))
-    res_cout = glm_cout.fit()
-
-    st.success("✅ Modèles GLM recalculés avec succès !")
+    df = portefeuille.data
+
+    # ======= Modèles GLM (ajustés une fois, puis réutilisés) =======
+    try:
+        res_freq = fit_frequency(df, portefeuille.fingerprint, **st.session_state.get("options_glm", {}))
+        res_cout = fit_severity(df, portefeuille.fingerprint, **st.session_state.get("options_glm", {}))
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return
 
     # ======= Interface utilisateur =======
     st.markdown("## 🎯 Choix du profil assuré")
@@ -48,21 +32,18 @@ def main():
     # Création de la ligne à prédire
     input_data = pd.DataFrame({
         "VehPower": [vehpower],
-        "Area": [area]
+        "Area": [area],
+        "Exposure": [exposure_input]
     })
-    input_freq = pd.get_dummies(input_data, drop_first=True)
-    input_freq = sm.add_constant(input_freq.reindex(columns=X_freq.columns, fill_value=0)).astype(float)
-
-    # Prédiction fréquence
-    freq_pred = res_freq.predict(input_freq, offset=np.log([exposure_input]))[0]
-
-    # Prédiction coût
-    input_cout = sm.add_constant(input_freq.drop(columns='const')).astype(float)
-    input_cout = input_cout.reindex(columns=X_cout.columns, fill_value=0)
-    cout_pred = res_cout.predict(input_cout)[0]
 
-    # Prime pure
-    prime = freq_pred * cout_pred
+    # Lecture de la grille tarifaire précalculée, puis mise à l'échelle de l'exposition
+    domains = tariff_domains(df, res_freq, res_cout)
+    grid = build_tariff_grid(res_freq, res_cout, domains)
+    if grid is None:
+        st.warning(f"Grille tarifaire de {grid_size(domains):,} cellules (plafond {MAX_GRID_CELLS:,}) : "
+                   "profil tarifé directement par les modèles.")
+    prices = lookup_prices(grid, input_data, res_freq, res_cout)
+    freq_pred, cout_pred, prime = prices.iloc[0]
 
     # Résultat
     st.markdown("## 📊 Résultat de la Simulation")
@@ -1,80 +1,108 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from datetime import datetime
-from xhtml2pdf import pisa
-import tempfile
+
+from actuariat.cube import age_distribution, build_cube, filter_cube, kpis, mean_by
+from actuariat.rapport import pending_report, submit_report
+from actuariat.rendu import POINT_BUDGET, POOL_EXTREMES, RENDER_MODES, scatter_figure, scatter_pool
 
 st.set_page_config(layout="wide")
 
 st.title("📊 Dashboard Actuariel Interactif - Assurance Auto")
 
 # Load data from session or fallback
-if 'final_dataframe' in st.session_state and st.session_state['final_dataframe'] is not None:
-    df = st.session_state['final_dataframe'].copy()
+if st.session_state.get('portefeuille') is not None:
+    portefeuille = st.session_state['portefeuille']
+    df = portefeuille.data
 else:
     st.warning("Aucune donnée chargée. Veuillez importer un fichier depuis la page de connexion.")
     st.stop()
 
 # --- FILTRES SIDEBAR ---
+# Modalités lues dans le cube plutôt que dans le portefeuille
+cube = build_cube(portefeuille)
 st.sidebar.header("🎛️ Filtres")
-regions = st.sidebar.multiselect("Régions", df["Region"].unique(), default=df["Region"].unique())
-brands = st.sidebar.multiselect("Marques de véhicule", df["VehBrand"].unique(), default=df["VehBrand"].unique())
-power_range = st.sidebar.slider("Puissance du véhicule", int(df["VehPower"].min()), int(df["VehPower"].max()), (4, 14))
+regions = st.sidebar.multiselect("Régions", cube["Region"].unique(), default=cube["Region"].unique())
+brands = st.sidebar.multiselect("Marques de véhicule", cube["VehBrand"].unique(), default=cube["VehBrand"].unique())
+power_range = st.sidebar.slider("Puissance du véhicule", int(cube["VehPower"].min()), int(cube["VehPower"].max()), (4, 14))
+
+st.sidebar.header("🖼️ Rendu des nuages de points")
+point_budget = st.sidebar.number_input("Nombre maximal de points tracés", min_value=1_000, value=POINT_BUDGET, step=5_000)
+render_mode = st.sidebar.radio("Au-delà du budget", RENDER_MODES)
 
 # --- APPLICATION DES FILTRES ---
-df_filtered = df[
-    (df["Region"].isin(regions)) &
-    (df["VehBrand"].isin(brands)) &
-    (df["VehPower"] >= power_range[0]) &
-    (df["VehPower"] <= power_range[1])
-]
+# Indicateurs et graphiques agrégés lus dans le cube (calculé une fois par jeu
+# de données) : un changement de filtre ne parcourt que les cellules du cube.
+cells = filter_cube(cube, regions, brands, power_range)
+indicateurs = kpis(cells)
 
-st.success(f"{df_filtered.shape[0]} lignes affichées après filtrage")
+st.success(f"{indicateurs['Contrats']} lignes affichées après filtrage")
 
 # --- KPIs ---
 st.subheader("🧮 Indicateurs Clés")
 kpi1, kpi2, kpi3 = st.columns(3)
-kpi1.metric("Fréquence moyenne", f"{df_filtered['Frequence'].mean():.3f}")
-kpi2.metric("Coût moyen", f"{df_filtered['Cout_moyen'].mean():.0f} €")
-kpi3.metric("Sinistralité pure", f"{df_filtered['Sinistralite_pure'].mean():.0f} €")
+kpi1.metric("Fréquence moyenne", f"{indicateurs['Frequence']:.3f}")
+kpi2.metric("Coût moyen", f"{indicateurs['Cout_moyen']:.0f} €")
+kpi3.metric("Sinistralité pure", f"{indicateurs['Sinistralite_pure']:.0f} €")
 
 # --- PLOTS ---
 st.subheader("📈 Visualisations Interactives")
 
-fig1 = px.bar(df_filtered.groupby("Area")["Frequence"].mean().reset_index(), x="Area", y="Frequence", title="Fréquence moyenne par zone")
+fig1 = px.bar(mean_by(cells, "Area", "Frequence"), x="Area", y="Frequence", title="Fréquence moyenne par zone")
 st.plotly_chart(fig1, use_container_width=True)
 
-fig2 = px.bar(df_filtered.groupby("VehBrand")["Sinistralite_pure"].mean().reset_index(), x="VehBrand", y="Sinistralite_pure", title="Sinistralité pure par marque")
+fig2 = px.bar(mean_by(cells, "VehBrand", "Sinistralite_pure"), x="VehBrand", y="Sinistralite_pure", title="Sinistralité pure par marque")
 st.plotly_chart(fig2, use_container_width=True)
 
-fig3 = px.histogram(df_filtered, x="DrivAge", nbins=20, title="Distribution de l'âge des conducteurs")
+fig3 = px.bar(age_distribution(cells), x="Tranche d'âge", y="Contrats", title="Distribution de l'âge des conducteurs")
 st.plotly_chart(fig3, use_container_width=True)
 
-fig4 = px.scatter(df_filtered, x="VehAge", y="ClaimAmount", color="VehBrand", title="Montant des sinistres en fonction de l'âge du véhicule")
+# Le nuage de points reste au niveau contrat, tiré d'une réserve de points
+# constituée une fois par jeu de données (plus gros sinistres inclus) : un
+# changement de filtre ne parcourt que cette réserve.
+pool = scatter_pool(df, portefeuille.fingerprint, ["Region", "VehBrand", "VehPower", "VehAge", "ClaimAmount"],
+                    keep_top="ClaimAmount", stratify="VehBrand")
+pool_filtered = filter_cube(pool, regions, brands, power_range)
+fig4, rendered = scatter_figure(pool_filtered, "VehAge", "ClaimAmount", color="VehBrand", mode=render_mode,
+                                budget=int(point_budget), keep_top="ClaimAmount",
+                                title="Montant des sinistres en fonction de l'âge du véhicule")
 st.plotly_chart(fig4, use_container_width=True)
+if len(pool) < len(df):
+    st.caption(f"{rendered:,} points ou cases tracés pour {indicateurs['Contrats']:,} contrats, à partir d'une "
+               f"réserve de {len(pool):,} contrats tirée une fois (dont les {POOL_EXTREMES:,} plus gros sinistres).")
+else:
+    st.caption(f"{rendered:,} points ou cases tracés pour {indicateurs['Contrats']:,} contrats "
+               "(les plus gros sinistres sont toujours affichés).")
 
 # --- EXPORT PDF ---
 st.subheader("📥 Export du rapport (HTML > PDF)")
 
-def convert_html_to_pdf(source_html, output_filename):
-    with open(output_filename, "w+b") as result_file:
-        pisa_status = pisa.CreatePDF(src=source_html, dest=result_file)
-    return pisa_status.err
+# Le rendu tourne dans un thread dédié. Tant qu'un rapport est en cours, un
+# fragment se réexécute chaque seconde, sans bloquer le reste de la page ; dès
+# qu'il est prêt, la page est relancée et le fragment n'est plus affiché : la
+# page ne sonde le serveur que pendant la génération.
+report_filters = (tuple(sorted(map(str, regions))), tuple(sorted(map(str, brands))), tuple(power_range))
+report_label = (f"{len(regions)} région(s), {len(brands)} marque(s), "
+                f"puissance {power_range[0]} à {power_range[1]}")
 
 if st.button("Générer le rapport PDF"):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
-        now = datetime.now().strftime("%Y-%m-%d %H:%M")
-        html_content = f"""
-        <h1>Rapport Actuariel - {now}</h1>
-        <h3>Indicateurs Clés</h3>
-        <ul>
-            <li>Fréquence moyenne : {df_filtered['Frequence'].mean():.3f}</li>
-            <li>Coût moyen : {df_filtered['Cout_moyen'].mean():.0f} €</li>
-            <li>Sinistralité pure : {df_filtered['Sinistralite_pure'].mean():.0f} €</li>
-        </ul>
-        <p>Nombre de lignes : {df_filtered.shape[0]}</p>
-        """
-        convert_html_to_pdf(html_content, tmp_pdf.name)
-        with open(tmp_pdf.name, "rb") as file:
-            st.download_button("📥 Télécharger le rapport PDF", data=file, file_name="rapport_assurance.pdf")
+    submit_report(portefeuille.fingerprint, report_filters, cells, report_label)
+
+
+@st.experimental_fragment(run_every=1)
+def wait_for_report():
+    future = pending_report(portefeuille.fingerprint, report_filters)
+    if future is not None and not future.done():
+        st.info("⏳ Rapport en cours de génération...")
+    else:
+        st.rerun()
+
+
+future = pending_report(portefeuille.fingerprint, report_filters)
+if future is not None and not future.done():
+    wait_for_report()
+elif future is not None and future.exception() is not None:
+    st.error(f"Erreur lors de la génération du rapport : {future.exception()}")
+elif future is not None:
+    st.download_button("📥 Télécharger le rapport PDF", data=future.result(),
+                       file_name="rapport_assurance.pdf", mime="application/pdf")
@@ -1,52 +1,103 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-from sklearn.linear_model import PoissonRegressor
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sklearn.model_selection import train_test_split
+
+from actuariat.benchmark import (
+    FEATURES,
+    MODELS,
+    learning_curve,
+    n_jobs_choices,
+    n_jobs_label,
+    run_benchmark,
+    summarize,
+    time_to_accuracy,
+)
 
 st.title("🧠 Benchmark de Modèles - Fréquence des Sinistres")
 
-if 'final_dataframe' not in st.session_state or st.session_state['final_dataframe'] is None:
+if st.session_state.get('portefeuille') is None:
     st.warning("Veuillez charger les données sur la page d'accueil.")
     st.stop()
 
-df = st.session_state['final_dataframe'].copy()
-df = df[df["Exposure"] > 0]
-df["Frequence"] = df["ClaimNb"] / df["Exposure"]
-
-# --- Préparation des données ---
-features = ["VehPower", "VehAge", "DrivAge"]
-X = df[features]
-y = df["Frequence"]
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
-
-# --- Modèle GLM Poisson ---
-st.subheader("GLM Poisson")
-glm = PoissonRegressor(alpha=1e-4, max_iter=300)
-glm.fit(X_train, y_train)
-y_pred_glm = glm.predict(X_test)
-
-# --- Modèle Random Forest ---
-st.subheader("Random Forest")
-rf = RandomForestRegressor(n_estimators=100, random_state=42)
-rf.fit(X_train, y_train)
-y_pred_rf = rf.predict(X_test)
-
-# --- Évaluation ---
-def afficher_scores(y_true, y_pred, label):
-    mae = mean_absolute_error(y_true, y_pred)
-    rmse = mean_squared_error(y_true, y_pred, squared=False)
-    r2 = r2_score(y_true, y_pred)
-    st.write(f"**{label}**")
-    st.metric("MAE", f"{mae:.4f}")
-    st.metric("RMSE", f"{rmse:.4f}")
-    st.metric("R²", f"{r2:.4f}")
-
-col1, col2 = st.columns(2)
-with col1:
-    afficher_scores(y_test, y_pred_glm, "GLM Poisson")
-with col2:
-    afficher_scores(y_test, y_pred_rf, "Random Forest")
+portefeuille = st.session_state['portefeuille']
+df = portefeuille.exposed
+
+# --- Configuration ---
+st.sidebar.header("⚙️ Configuration du benchmark")
+mode = st.sidebar.radio("Mode", ["Validation croisée", "Courbe d'apprentissage (sous-échantillons)"])
+models = st.sidebar.multiselect("Modèles candidats", MODELS, default=MODELS)
+if mode == "Validation croisée":
+    settings = (st.sidebar.slider("Nombre de plis (validation croisée)", 2, 10, 5),)
+else:
+    # Au moins 1 000 contrats de test, et start_size contrats d'entraînement
+    start_size = st.sidebar.number_input("Taille initiale de l'échantillon", min_value=500,
+                                         max_value=max(len(df) - 1_000, 500),
+                                         value=min(5_000, max(len(df) // 10, 500)), step=1_000)
+    max_size = st.sidebar.number_input("Taille maximale de l'échantillon", min_value=int(start_size),
+                                       max_value=max(len(df), int(start_size)),
+                                       value=max(min(200_000, len(df) // 2), int(start_size)), step=10_000)
+    test_size = st.sidebar.number_input("Taille de l'échantillon de test", min_value=1_000,
+                                        max_value=max(len(df) - int(start_size), 1_000),
+                                        value=max(min(50_000, len(df) // 5, len(df) - int(start_size)), 1_000),
+                                        step=5_000)
+    tolerance = st.sidebar.slider("Arrêt si la déviance varie de moins de (%)", 0.1, 5.0, 1.0, 0.1) / 100
+    settings = (int(start_size), int(max_size), int(test_size), tolerance)
+n_jobs = st.sidebar.selectbox("Processus parallèles (n_jobs)", n_jobs_choices(), format_func=n_jobs_label)
+features = [col for col in FEATURES if col in df.columns]
+st.caption(f"Variables explicatives : {', '.join(features)} — cible : ClaimNb / Exposure, "
+           "pondérée par l'exposition.")
+
+if st.button("🚀 Lancer le benchmark") and models:
+    st.session_state['benchmark_config'] = (portefeuille.fingerprint, mode, tuple(models), settings)
+
+# Les résultats sont en cache : revenir sur la page réaffiche le dernier benchmark sans recalcul
+config = st.session_state.get('benchmark_config')
+if config is None or config[0] != portefeuille.fingerprint:
+    st.info("Choisissez les modèles puis lancez le benchmark.")
+    st.stop()
+
+_, mode, models, settings = config
+
+if mode == "Validation croisée":
+    n_splits, = settings
+    with st.spinner(f"Validation croisée en {n_splits} plis de {len(models)} modèles..."):
+        results = run_benchmark(df, portefeuille.fingerprint, models, n_splits, int(n_jobs), features)
+
+    # --- Évaluation ---
+    summary = summarize(results)
+    st.subheader("📊 Scores moyens par modèle")
+    st.dataframe(summary[["Déviance Poisson", "Gini", "MAE", "RMSE", "R²",
+                          "Ajustement (s)", "Prédiction (s)", "Pic mémoire (Mo)"]].style.format("{:.4f}"))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Déviance de Poisson (plus bas = meilleur)**")
+        st.bar_chart(summary["Déviance Poisson"])
+    with col2:
+        st.markdown("**Temps d'ajustement moyen (s)**")
+        st.bar_chart(summary["Ajustement (s)"])
+
+    with st.expander("Détail par pli"):
+        st.dataframe(results)
+else:
+    start_size, max_size, test_size, tolerance = settings
+    with st.spinner(f"Entraînement sur des échantillons de {start_size:,} à {max_size:,} contrats..."):
+        try:
+            curve = learning_curve(df, portefeuille.fingerprint, models, start_size, max_size, test_size,
+                                   tolerance, int(n_jobs), features)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            st.stop()
+
+    st.subheader("⏱️ Temps pour atteindre la précision")
+    st.dataframe(time_to_accuracy(curve, tolerance).style.format(
+        {"Déviance finale": "{:.4f}", "Gini final": "{:.4f}", "Temps pour atteindre (s)": "{:.2f}"}))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Déviance de Poisson selon la taille de l'échantillon**")
+        st.line_chart(curve.pivot(index="Taille échantillon", columns="Modèle", values="Déviance Poisson"))
+    with col2:
+        st.markdown("**Déviance selon le temps cumulé (s)**")
+        st.scatter_chart(curve, x="Temps cumulé (s)", y="Déviance Poisson", color="Modèle")
+
+    with st.expander("Détail par taille d'échantillon"):
+        st.dataframe(curve)
@@ -1,33 +1,54 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import statsmodels.api as sm
+
+from actuariat.glm import fit_frequency, fit_severity
+from actuariat.tarification import (MAX_GRID_CELLS, build_tariff_grid, grid_size, lookup_prices, price_quotes,
+                                    tariff_domains)
 
 st.title("🎯 Tarification Dynamique - Comparaison de Profils")
 
 # Chargement des données
-if 'final_dataframe' not in st.session_state or st.session_state['final_dataframe'] is None:
+if st.session_state.get('portefeuille') is None:
     st.warning("Veuillez charger les données d'abord.")
     st.stop()
 
-# Dataset original
-df = st.session_state['final_dataframe'].copy()
-df = df[df["Exposure"] > 0].copy()
-df["Frequence"] = df["ClaimNb"] / df["Exposure"]
-df["Cout_moyen"] = df["ClaimAmount"] / df["ClaimNb"].replace(0, np.nan)
-df = df.dropna(subset=["Cout_moyen"])
+portefeuille = st.session_state['portefeuille']
+df = portefeuille.data
+
+# --- GLM modèles pré-entraînés (partagés avec les autres pages) ---
+try:
+    model_freq = fit_frequency(df, portefeuille.fingerprint, **st.session_state.get("options_glm", {}))
+    model_cout = fit_severity(df, portefeuille.fingerprint, **st.session_state.get("options_glm", {}))
+except ValueError as e:
+    st.error(f"❌ {e}")
+    st.stop()
 
-# --- GLM modèles pré-entraînés ---
-X_freq = pd.get_dummies(df[["VehPower", "Area"]], drop_first=True)
-X_freq = sm.add_constant(X_freq).astype(float)
-y_freq = df["ClaimNb"]
-exposure = np.log(df["Exposure"])
-model_freq = sm.GLM(y_freq, X_freq, family=sm.families.Poisson(), offset=exposure).fit()
+# Grille tarifaire précalculée : les profils y sont lus directement
+domains = tariff_domains(df, model_freq, model_cout)
+grid = build_tariff_grid(model_freq, model_cout, domains)
+if grid is None:
+    st.warning(f"Grille tarifaire de {grid_size(domains):,} cellules (plafond {MAX_GRID_CELLS:,}) : "
+               "profils tarifés directement par les modèles.")
 
-X_cout = pd.get_dummies(df[["VehPower", "Area"]], drop_first=True)
-X_cout = sm.add_constant(X_cout).astype(float)
-y_cout = df["Cout_moyen"]
-model_cout = sm.GLM(y_cout, X_cout, family=sm.families.Gamma(sm.families.links.log())).fit()
+mode = st.radio("Mode de tarification", ["Profils personnalisés", "Fichier de devis (CSV)"], horizontal=True)
+
+if mode == "Fichier de devis (CSV)":
+    # --- Tarification en lot d'un fichier de devis ---
+    st.subheader("📂 Tarification d'un fichier de devis")
+    st.caption("Colonnes attendues : " + ", ".join(dict.fromkeys(model_freq.features + model_cout.features))
+               + " (Exposure facultative, 1 an par défaut).")
+    quotes_file = st.file_uploader("📎 Choisir un fichier CSV de devis", type=["csv"])
+    if quotes_file is not None:
+        try:
+            priced = price_quotes(pd.read_csv(quotes_file), model_freq, model_cout, grid)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            st.stop()
+        st.success(f"✅ {len(priced):,} devis tarifés.")
+        st.dataframe(priced.head(1000))
+        st.download_button("📥 Télécharger les devis tarifés", data=priced.to_csv(index=False).encode("utf-8"),
+                           file_name="devis_tarifes.csv", mime="text/csv")
+    st.stop()
 
 # --- Interface multi-profils ---
 st.subheader("📋 Création de profils personnalisés")
@@ -46,26 +67,11 @@ for i in range(n_profiles):
 
     profils.append({"VehPower": power, "Area": area, "Exposure": exposure_input})
 
-# --- Prédictions et résultats ---
-results = []
-for profil in profils:
-    input_df = pd.DataFrame([profil])
-    x_freq = pd.get_dummies(input_df, drop_first=True)
-    x_freq = sm.add_constant(x_freq.reindex(columns=X_freq.columns, fill_value=0)).astype(float)
-    x_cout = x_freq.reindex(columns=X_cout.columns, fill_value=0)
-
-    pred_freq = model_freq.predict(x_freq, offset=np.log([profil["Exposure"]]))[0]
-    pred_cout = model_cout.predict(x_cout)[0]
-    prime = pred_freq * pred_cout
-
-    profil.update({
-        "Fréquence estimée": round(pred_freq, 3),
-        "Coût moyen estimé": round(pred_cout, 0),
-        "Prime pure": round(prime, 0)
-    })
-    results.append(profil)
+# --- Prédictions et résultats (un seul lot pour tous les profils) ---
+df_profils = pd.DataFrame(profils)
+prices = lookup_prices(grid, df_profils, model_freq, model_cout).round({"Fréquence estimée": 3, "Coût moyen estimé": 0, "Prime pure": 0})
+df_results = pd.concat([df_profils, prices], axis=1)
 
 # --- Affichage final ---
 st.subheader("📊 Résultats de la comparaison")
-df_results = pd.DataFrame(results)
-st.dataframe(df_results.set_index(pd.Index([f"Profil {i+1}" for i in range(len(results))])))
+st.dataframe(df_results.set_index(pd.Index([f"Profil {i+1}" for i in range(len(df_results))])))
@@ -1,38 +1,43 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
+
+from actuariat.segments import ANNOTATE_MAX_CELLS, MAX_LEVELS, heatmap_png, high_risk, pure_premium, segment_cells
 
 st.set_page_config(layout="wide")
 st.title("🔍 Analyse de la Sinistralité par Segment")
 
-if 'final_dataframe' not in st.session_state or st.session_state['final_dataframe'] is None:
+if st.session_state.get('portefeuille') is None:
     st.warning("Veuillez charger les données d'abord.")
     st.stop()
 
-df = st.session_state['final_dataframe'].copy()
-df = df[df["Exposure"] > 0].copy()
-df["Frequence"] = df["ClaimNb"] / df["Exposure"]
-df["Cout_moyen"] = df["ClaimAmount"] / df["ClaimNb"].replace(0, np.nan)
-df["Sinistralite_pure"] = df["ClaimAmount"] / df["Exposure"]
+portefeuille = st.session_state['portefeuille']
+df = portefeuille.exposed
 
 st.subheader("🎯 Choix des dimensions de segmentation")
 seg_col1 = st.selectbox("Variable en X (Segment 1)", df.columns, index=df.columns.get_loc("Region"))
 seg_col2 = st.selectbox("Variable en Y (Segment 2)", df.columns, index=df.columns.get_loc("VehPower"))
 
-# Agrégation
-grouped = df.groupby([seg_col1, seg_col2])["Sinistralite_pure"].mean().unstack().fillna(0)
+bands = st.slider("Nombre de tranches pour les variables continues", 3, MAX_LEVELS, 10)
+st.caption(f"Variables continues découpées en tranches de quantiles ; au-delà de {MAX_LEVELS} modalités, "
+           "les moins exposées sont regroupées dans « Autres ».")
+
+# Agrégation : sommes par cellule en cache, sinistralité pondérée par l'exposition
+cells = segment_cells(portefeuille, seg_col1, seg_col2, bands)
+grouped = pure_premium(cells)
 
 # Heatmap
-st.subheader("📊 Heatmap - Sinistralité Pure Moyenne")
-fig, ax = plt.subplots(figsize=(10, 6))
-sns.heatmap(grouped, annot=True, fmt=".0f", cmap="Reds", ax=ax)
-st.pyplot(fig)
+st.subheader("📊 Heatmap - Sinistralité Pure (pondérée par l'exposition)")
+if grouped.size > ANNOTATE_MAX_CELLS:
+    st.caption(f"{grouped.size} cellules : valeurs non affichées sur la heatmap (voir le tableau ci-dessous).")
+st.image(heatmap_png(grouped, (portefeuille.fingerprint, seg_col1, seg_col2, bands)))
+
+with st.expander("Détail par cellule"):
+    st.dataframe(pd.concat({"Sinistralité pure": grouped.stack(), "Exposition": cells["Exposition"].stack(),
+                            "Contrats": cells["Contrats"].stack()}, axis=1).query("Contrats > 0"))
 
 # Affichage des segments à forte sinistralité
 st.subheader("🚨 Segments à risque ")
 thresh = st.slider("Seuil de sinistralité pure élevée (€)", 500, 3000, 1000)
-high_risk = df[df["Sinistralite_pure"] > thresh]
-st.write(f"{high_risk.shape[0]} contrats avec sinistralité > {thresh} €")
-st.dataframe(high_risk[["Region", "VehBrand", "VehPower", "DrivAge", "Sinistralite_pure"]].sort_values(by="Sinistralite_pure", ascending=False).head(20))
+count, top = high_risk(df, thresh, k=20, columns=["Region", "VehBrand", "VehPower", "DrivAge", "Sinistralite_pure"])
+st.write(f"{count} contrats avec sinistralité > {thresh} €")
+st.dataframe(top)
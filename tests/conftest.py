@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# Petit portefeuille synthétique au format freMTPL
+@pytest.fixture
+def portfolio_frame():
+    rng = np.random.default_rng(0)
+    n = 5_000
+    df = pd.DataFrame({
+        "IDpol": np.arange(1, n + 1),
+        "ClaimNb": rng.poisson(0.1, n),
+        "Exposure": rng.uniform(0.05, 1.0, n).round(2),
+        "Area": rng.choice(list("ABCDEF"), n),
+        "VehPower": rng.integers(4, 16, n),
+        "VehAge": rng.integers(0, 30, n),
+        "DrivAge": rng.integers(18, 90, n),
+        "BonusMalus": rng.integers(50, 150, n),
+        "VehBrand": rng.choice([f"B{i}" for i in range(1, 15)], n),
+        "VehGas": rng.choice(["Regular", "Diesel"], n),
+        "Density": rng.integers(1, 27_000, n),
+        "Region": rng.choice([f"R{i}" for i in range(11, 95, 4)], n),
+    })
+    df["ClaimAmount"] = df["ClaimNb"] * rng.gamma(2.0, 250 + 30 * df["VehPower"])
+    return df
+
+
+# Registre des modèles et snapshots écrits dans un répertoire temporaire
+@pytest.fixture(autouse=True)
+def _workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,21 @@
+import pytest
+
+from actuariat.benchmark import _learning_curve
+from actuariat.portefeuille import add_derived_columns
+
+
+@pytest.fixture
+def exposed(portfolio_frame):
+    return add_derived_columns(portfolio_frame.head(3_000).copy())
+
+
+# Test demandé sur tout le portefeuille : réduit pour garder start_size lignes
+def test_test_size_clamped_to_keep_training_pool(exposed):
+    curve = _learning_curve(exposed, ["GLM Poisson"], start_size=500, max_size=2_000, test_size=3_000, n_jobs=1)
+    assert curve["Taille échantillon"].min() == 500
+    assert curve["Taille échantillon"].max() < 600
+
+
+def test_portfolio_smaller_than_start_size(exposed):
+    with pytest.raises(ValueError, match="trop petit"):
+        _learning_curve(exposed, ["GLM Poisson"], start_size=3_000, test_size=1_000, n_jobs=1)
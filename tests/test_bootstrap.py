@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from actuariat.bootstrap import _prepare, iter_bootstrap
+from actuariat.glm import fit_frequency, fit_severity
+from actuariat.portefeuille import add_derived_columns
+from actuariat.schema import apply_schema
+
+FEATURES = ["VehPower", "Area"]
+
+
+@pytest.fixture
+def portfolio(portfolio_frame):
+    df = portfolio_frame.copy()
+    # Contrats sinistrés sans exposition : dans le GLM coût, pas dans la fréquence
+    claimants = np.flatnonzero(df["ClaimNb"] > 0)[:20]
+    df.loc[claimants, "Exposure"] = 0.0
+    df = add_derived_columns(apply_schema(df))
+    options = dict(features=FEATURES, engine="irls")
+    return df, fit_frequency(df, "test-bootstrap", **options), fit_severity(df, "test-bootstrap", **options)
+
+
+def test_same_rows_as_the_fits(portfolio):
+    df, model_freq, model_cout = portfolio
+    data = _prepare(df, model_freq, model_cout)
+    assert len(data.claimant_rows) == (df["ClaimNb"] > 0).sum()
+    assert data.claims.sum() == df.loc[df["Exposure"] > 0, "ClaimNb"].sum()
+    assert np.isclose(data.exposure.sum(), df["Exposure"].sum())
+
+
+def test_processes_match_sequential(portfolio):
+    df, model_freq, model_cout = portfolio
+    data = _prepare(df, model_freq, model_cout)
+    runs = [list(iter_bootstrap(data, model_freq, model_cout, n_replicates=30, n_jobs=n_jobs))[-1]
+            for n_jobs in (1, 2)]
+    for completed, freq_draws, cout_draws in runs:
+        assert completed == 30 and len(freq_draws) == len(cout_draws) == 30
+    # Blocs rendus dans l'ordre d'achèvement : mêmes tirages, ordre libre
+    assert np.allclose(np.sort(runs[0][1], axis=0), np.sort(runs[1][1], axis=0))
+    assert np.allclose(np.median(runs[0][2], axis=0), model_cout.params, atol=0.2)
@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from actuariat.cli import main, write
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Le registre des modèles est écrit dans le répertoire courant
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".csv"])
+def test_pipeline_keeps_string_columns(workdir, portfolio_frame, suffix):
+    source = workdir / "portefeuille.csv"
+    portfolio_frame.assign(PolicyRef=[f"POL-{i:06d}" for i in portfolio_frame["IDpol"]]).to_csv(source, index=False)
+    output = workdir / f"resultats{suffix}"
+
+    assert main([str(source), "-o", str(output), "--n-jobs", "1", "--chunksize", "1000"]) == 0
+
+    result = pd.read_parquet(output) if suffix == ".parquet" else pd.read_csv(output)
+    assert len(result) == len(portfolio_frame)
+    assert result["PolicyRef"].iloc[-1] == f"POL-{len(portfolio_frame):06d}"
+    assert {"Prime pure", "Segment"} <= set(result.columns)
+    assert result["Segment"].notna().sum() == (portfolio_frame["ClaimNb"] > 0).sum()
+
+
+# Colonne texte vide dans le premier bloc, renseignée ensuite
+def test_write_parquet_string_column_filled_late(tmp_path):
+    df = pd.DataFrame({"Ref": [None] * 3 + ["A", "B"], "Valeur": range(5)})
+    write(df, tmp_path / "sortie.parquet", chunksize=2)
+    assert pd.read_parquet(tmp_path / "sortie.parquet")["Ref"].tolist() == [None, None, None, "A", "B"]
@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+
+from actuariat.ingestion import read_csv_chunked
+
+
+@pytest.fixture
+def csv_path(portfolio_frame, tmp_path):
+    df = portfolio_frame.head(2_001).assign(PolicyRef=lambda d: "P" + d["IDpol"].astype(str).str.zfill(7))
+    path = tmp_path / "portefeuille.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+# Dernier bloc d'une seule ligne : il ne doit pas changer le type des colonnes
+@pytest.mark.parametrize("chunksize", [1_000, 2_001, 500])
+def test_dtypes_independent_of_chunksize(csv_path, chunksize):
+    df = read_csv_chunked(csv_path, chunksize=chunksize)
+    assert df["PolicyRef"].dtype == object
+    assert isinstance(df["Area"].dtype, pd.CategoricalDtype)
+    assert list(df["Area"].cat.categories) == list("ABCDEF")
+    assert len(df) == 2_001
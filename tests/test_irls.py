@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from actuariat.irls import ConvergenceWarning, fit_irls
+
+
+@pytest.fixture
+def design():
+    rng = np.random.default_rng(1)
+    n = 5_000
+    x = rng.exponential(1.0, size=n)
+    X = sp.csr_matrix(np.column_stack([np.ones(n), x]))
+    return X, rng.poisson(np.exp(-2 + 0.8 * x)).astype(float), rng.gamma(1.0, np.exp(2 + 0.5 * x))
+
+
+# Départs à chaud éloignés : sans demi-pas, Newton diverge ou déborde
+@pytest.mark.parametrize("start", [[-2.95, -0.12], [0.61, -6.37], [-3.72, -1.97], [20.0, -20.0]])
+@pytest.mark.parametrize("family", ["poisson", "gamma"])
+def test_step_halving_recovers_from_bad_start(design, family, start):
+    X, y_poisson, y_gamma = design
+    y = y_poisson if family == "poisson" else y_gamma
+    reference = fit_irls(X, y, family)
+    result = fit_irls(X, y, family, start_params=start)
+    assert result.converged
+    assert np.allclose(result.params, reference.params, atol=1e-6)
+
+
+def test_warns_when_not_converged(design):
+    X, y, _ = design
+    with pytest.warns(ConvergenceWarning, match="pas de convergence en 1 itérations"):
+        result = fit_irls(X, y, "poisson", max_iter=1)
+    assert not result.converged
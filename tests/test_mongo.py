@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from actuariat.cube import DIMENSIONS, _build_cube
+from actuariat.mongo import field_names, read_collection, read_cube
+from actuariat.portefeuille import add_derived_columns
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def collection(portfolio_frame):
+    collection = mongomock.MongoClient().db.contrats
+    collection.insert_many(portfolio_frame.to_dict("records"))
+    return collection
+
+
+def test_projection_and_filters(collection, portfolio_frame):
+    assert "_id" not in field_names(collection)
+    df = read_collection(collection, ["Region", "Exposure"], batch_size=1_000, areas=("A", "C"))
+    expected = portfolio_frame[portfolio_frame["Area"].isin(["A", "C"])]
+    assert list(df.columns) == ["Region", "Exposure"]
+    assert len(df) == len(expected)
+    assert np.isclose(df["Exposure"].sum(), expected["Exposure"].sum())
+
+
+def test_read_cube_matches_pandas(collection, portfolio_frame):
+    cube = read_cube(collection, regions=("R11", "R15", "R19"))
+    local = add_derived_columns(portfolio_frame[portfolio_frame["Region"].isin(["R11", "R15", "R19"])].copy())
+    expected = _build_cube(local)
+
+    merged = cube.astype({col: str for col in ["Region", "VehBrand", "Area"]}).merge(
+        expected.astype({col: str for col in ["Region", "VehBrand", "Area"]}), on=DIMENSIONS, suffixes=("", "_pandas"))
+    assert len(merged) == len(cube) == len(expected)
+    for col in cube.columns.difference(DIMENSIONS):
+        assert np.allclose(merged[col], merged[f"{col}_pandas"]), col
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from actuariat.optimisation import max_elasticity, optimize_adjustments
+
+
+@pytest.fixture
+def cells():
+    rng = np.random.default_rng(1)
+    n = 500
+    premium = rng.uniform(1_000, 20_000, n)
+    return pd.DataFrame({
+        "Exposition": rng.uniform(10, 200, n),
+        "Prime actuelle": premium,
+        # S/P par cellule entre 0.3 et 1.5 : des cellules très déficitaires
+        "Charge attendue": premium * rng.uniform(0.3, 1.5, n),
+    })
+
+
+# Élasticité 3 et hausse de 50 % : la rétention deviendrait négative
+def test_rejects_negative_retention(cells):
+    with pytest.raises(ValueError, match="rétention"):
+        optimize_adjustments(cells, target_loss_ratio=0.6, max_change=0.5, elasticity=3.0)
+
+
+def test_retention_stays_positive_at_max_elasticity(cells):
+    elasticity = max_elasticity(0.5)
+    assert elasticity * 0.5 < 1
+    proposal, kpis = optimize_adjustments(cells, target_loss_ratio=0.6, max_change=0.5, elasticity=elasticity)
+    assert (proposal["Rétention"] > 0).all()
+    assert (proposal["Prime projetée"] > 0).all()
+    assert kpis["Contrainte respectée"] == kpis["Convergence"]
+    if kpis["Convergence"]:
+        assert kpis["S/P projeté"] <= 0.6 + 1e-6
+
+
+def test_target_already_met(cells):
+    proposal, kpis = optimize_adjustments(cells, target_loss_ratio=2.0, max_change=0.15, elasticity=0.5)
+    assert kpis["Convergence"] and np.allclose(proposal["Ajustement (%)"], 0)
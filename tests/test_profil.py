@@ -0,0 +1,16 @@
+from actuariat.profil import cached_profile
+
+
+def test_cached_profile_selects_only_on_miss(portfolio_frame):
+    calls = []
+
+    def select():
+        calls.append(1)
+        return portfolio_frame[portfolio_frame["Area"] == "A"]
+
+    profil = cached_profile("test-profil", ("A",), select, histograms=["DrivAge"], totals_by="Area")
+    again = cached_profile("test-profil", ("A",), select, histograms=["DrivAge"], totals_by="Area")
+
+    assert again is profil and len(calls) == 1
+    assert profil["lignes"] == (portfolio_frame["Area"] == "A").sum()
+    assert profil["totaux"].loc["A", "ClaimNb"] == portfolio_frame.loc[portfolio_frame["Area"] == "A", "ClaimNb"].sum()
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from actuariat.rendu import scatter_pool
+
+COLUMNS = ["Region", "VehBrand", "VehPower", "VehAge", "ClaimAmount"]
+
+
+def test_pool_drawn_once_with_largest_claims(portfolio_frame):
+    df = pd.concat([portfolio_frame] * 4, ignore_index=True)
+    pool = scatter_pool(df, "test-reserve", COLUMNS, keep_top="ClaimAmount", stratify="VehBrand",
+                        size=2_000, extremes=300)
+    assert scatter_pool(df, "test-reserve", COLUMNS, keep_top="ClaimAmount", stratify="VehBrand",
+                        size=2_000, extremes=300) is pool
+    assert list(pool.columns) == COLUMNS and len(pool) <= 2_000
+    assert set(pool["VehBrand"]) == set(df["VehBrand"])
+    largest = np.sort(df["ClaimAmount"].to_numpy())[-300:]
+    assert np.isin(largest, pool["ClaimAmount"].to_numpy()).all()
+
+
+def test_small_portfolio_kept_whole(portfolio_frame):
+    pool = scatter_pool(portfolio_frame, "test-reserve-petite", COLUMNS, keep_top="ClaimAmount")
+    assert len(pool) == len(portfolio_frame)
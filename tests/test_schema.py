@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from actuariat.schema import SchemaError, apply_schema, missing_values
+
+
+def test_missing_optional_values_are_kept(portfolio_frame):
+    df = portfolio_frame.copy()
+    df.loc[:9, "VehAge"] = np.nan
+    df.loc[:4, "Density"] = np.nan
+    df.loc[5, "Density"] = 2 ** 24 + 1
+    df = apply_schema(df)
+
+    assert missing_values(df) == {"VehAge": 10, "Density": 5}
+    assert df["VehAge"].dtype == np.float32 and df["Density"].dtype == np.float64
+    assert df["DrivAge"].dtype == np.int8
+    assert (df.loc[10:, "VehAge"] == portfolio_frame.loc[10:, "VehAge"]).all()
+
+
+@pytest.mark.parametrize("col", ["Exposure", "ClaimNb"])
+def test_missing_required_values_are_rejected(portfolio_frame, col):
+    df = portfolio_frame.copy()
+    df.loc[:2, col] = np.nan
+    with pytest.raises(SchemaError, match=f"{col} : 3 valeurs manquantes"):
+        apply_schema(df)
+
+
+def test_decimals_rejected_despite_missing_values(portfolio_frame):
+    df = portfolio_frame.copy()
+    df["VehAge"] = df["VehAge"].astype(float)
+    df.loc[0, "VehAge"] = np.nan
+    df.loc[1, "VehAge"] = 2.5
+    with pytest.raises(SchemaError, match="VehAge : valeurs décimales"):
+        apply_schema(df)
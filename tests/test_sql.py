@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from sqlalchemy import Column, Float, MetaData, Table, select
+from sqlalchemy.dialects import mysql, postgresql
+
+from actuariat.cube import DIMENSIONS, _build_cube
+from actuariat.portefeuille import add_derived_columns
+from actuariat.sql import _age_band, connection_url, get_engine, read_cube, read_table, reflect_table
+
+
+def _sqlite_table(tmp_path, df):
+    engine = get_engine(connection_url("SQLite", database=str(tmp_path / "assurance.db")))
+    df.to_sql("contrats", engine, index=False)
+    return engine, reflect_table(engine, "contrats")
+
+
+def test_projection_and_filters(tmp_path, portfolio_frame):
+    engine, table = _sqlite_table(tmp_path, portfolio_frame)
+    df = read_table(engine, table, ["Region", "Area", "Exposure"], regions=("R11", "R15"), areas=("A",))
+    expected = portfolio_frame[portfolio_frame["Region"].isin(["R11", "R15"]) & (portfolio_frame["Area"] == "A")]
+    assert list(df.columns) == ["Region", "Area", "Exposure"]
+    assert len(df) == len(expected)
+    assert np.isclose(df["Exposure"].sum(), expected["Exposure"].sum())
+
+
+# DrivAge entier ou réel (âges fractionnaires)
+@pytest.mark.parametrize("fraction", [0.0, 0.7])
+def test_read_cube_matches_pandas(tmp_path, portfolio_frame, fraction):
+    portfolio_frame["DrivAge"] = portfolio_frame["DrivAge"] + fraction
+    engine, table = _sqlite_table(tmp_path, portfolio_frame)
+    cube = read_cube(engine, table, areas=("A", "B"))
+    local = add_derived_columns(portfolio_frame[portfolio_frame["Area"].isin(["A", "B"])].copy())
+    expected = _build_cube(local)
+
+    merged = cube.astype({col: str for col in ["Region", "VehBrand", "Area"]}).merge(
+        expected.astype({col: str for col in ["Region", "VehBrand", "Area"]}), on=DIMENSIONS, suffixes=("", "_pandas"))
+    assert len(merged) == len(cube) == len(expected)
+    for col in cube.columns.difference(DIMENSIONS):
+        assert np.allclose(merged[col], merged[f"{col}_pandas"]), col
+
+
+
+# Tranche d'âge sans opérateur % (absent pour les réels sous PostgreSQL)
+@pytest.mark.parametrize("dialect", [postgresql.dialect(), mysql.dialect()])
+def test_age_band_portable(dialect):
+    table = Table("contrats", MetaData(), Column("DrivAge", Float))
+    query = select(_age_band(table, dialect.name))
+    sql = str(query.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    assert "%" not in sql and "floor(" in sql and "INTEGER" in sql
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from actuariat.glm import fit_frequency, fit_severity
+from actuariat.portefeuille import add_derived_columns
+from actuariat.schema import apply_schema
+from actuariat.tarification import (build_tariff_grid, grid_size, lookup_prices, price_batch,
+                                    tariff_domains)
+
+FEATURES = ["VehPower", "Area", "VehAge", "DrivAge", "Region"]
+
+
+@pytest.fixture
+def models(portfolio_frame):
+    df = add_derived_columns(apply_schema(portfolio_frame.copy()))
+    options = dict(features=FEATURES, engine="irls")
+    return df, fit_frequency(df, "test-grille", **options), fit_severity(df, "test-grille", **options)
+
+
+def test_oversized_grid_falls_back_to_models(models):
+    df, model_freq, model_cout = models
+    domains = tariff_domains(df, model_freq, model_cout)
+    assert grid_size(domains) > 1_000_000
+
+    grid = build_tariff_grid(model_freq, model_cout, domains)
+    assert grid is None
+    profiles = df[FEATURES + ["Exposure"]].head(50)
+    assert np.allclose(lookup_prices(grid, profiles, model_freq, model_cout),
+                       price_batch(profiles, model_freq, model_cout))
+
+
+def test_grid_matches_models_under_cap(models):
+    df, model_freq, model_cout = models
+    domains = tariff_domains(df, model_freq, model_cout)
+    grid = build_tariff_grid(model_freq, model_cout, domains, max_cells=grid_size(domains))
+    profiles = df[FEATURES + ["Exposure"]].head(50)
+    assert np.allclose(lookup_prices(grid, profiles), price_batch(profiles, model_freq, model_cout))